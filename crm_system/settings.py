@@ -184,6 +184,25 @@ MESSAGE_QUEUE_CONFIG = {
     'RATE_LIMIT_PER_INSTANCE': 50,
 }
 
+# Data Import Settings (member / transaction uploads)
+DATA_IMPORT_CONFIG = {
+    'BATCH_SIZE': config('DATA_IMPORT_BATCH_SIZE', default=5000, cast=int),
+    'CHUNK_SIZE': config('DATA_IMPORT_CHUNK_SIZE', default=50000, cast=int),  # rows read from the file at a time
+    'RUN_ASYNC': config('DATA_IMPORT_RUN_ASYNC', default=True, cast=bool),  # False = run inline, no Celery worker
+    'TASK_TIME_LIMIT': 4 * 3600,
+    # Partitions for "parallel import" uploads (large CSV history loads)
+    'PARALLEL_PARTITIONS': config('DATA_IMPORT_PARALLEL_PARTITIONS', default=8, cast=int),
+    # Records accepted per request by the ingestion API
+    'INGEST_MAX_RECORDS': config('DATA_IMPORT_INGEST_MAX_RECORDS', default=10000, cast=int),
+    # Drop-directory ingestion (MEDIA_ROOT/drop/<tenant>/{member,transaction}/)
+    'DROP_SETTLE_SECONDS': config('DATA_IMPORT_DROP_SETTLE_SECONDS', default=60, cast=int),
+    'DROP_DUPLICATE_MODE': config('DATA_IMPORT_DROP_DUPLICATE_MODE', default='skip'),
+    # Multi-file / zip batch uploads
+    'MAX_BATCH_FILES': config('DATA_IMPORT_MAX_BATCH_FILES', default=100, cast=int),
+    # Chunked browser uploads: bytes per part; larger files are sent in parts
+    'UPLOAD_PART_SIZE': config('DATA_IMPORT_UPLOAD_PART_SIZE', default=8 * 1024 * 1024, cast=int),
+}
+
 # Celery Configuration
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://localhost:6379/0')
@@ -1,4 +1,5 @@
 from django import forms
+from .models import ImportJob
 
 class UploadFileForm(forms.Form):
     file = forms.FileField()
@@ -9,4 +10,89 @@ class UploadFileForm(forms.Form):
         ],
         widget=forms.RadioSelect, # This line adds the radio button widget
         label="File Type" # Add a label to ensure it displays correctly
-    )
\ No newline at end of file
+    )
+    duplicate_mode = forms.ChoiceField(
+        choices=ImportJob.DuplicateMode.choices,
+        initial=ImportJob.DuplicateMode.ERROR,
+        widget=forms.RadioSelect,
+        label="Existing Rows"
+    )
+    parallel = forms.BooleanField(
+        required=False,
+        label="Parallel import",
+        help_text="Split a large CSV across several workers (e.g. onboarding history)"
+    )
+    staging = forms.BooleanField(
+        required=False,
+        label="Database-side validation",
+        help_text=("Transaction CSVs only: load through a PostgreSQL staging table (fastest for very large files). "
+                   "Dates must be DD-MM-YYYY, DD/MM/YYYY or YYYY-MM-DD, optionally with HH:MM[:SS]; "
+                   "rows with other date formats are rejected")
+    )
+    reimport = forms.BooleanField(
+        required=False,
+        label="Import again",
+        help_text="Process the file even if this exact file or an earlier part of it was already imported"
+    )
+
+
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+
+class MultipleFileField(forms.FileField):
+    """FileField that accepts several files and cleans to a list"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', MultipleFileInput(attrs={'accept': '.csv,.xlsx,.zip'}))
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        if isinstance(data, (list, tuple)):
+            return [super(MultipleFileField, self).clean(item, initial) for item in data]
+        return [super().clean(data, initial)]
+
+
+class BatchUploadForm(forms.Form):
+    files = MultipleFileField(
+        label="Files",
+        help_text="Several CSV/XLSX files, or a .zip of them (e.g. a month of daily exports)"
+    )
+    file_type = forms.ChoiceField(
+        choices=[
+            ('member', 'Member'),
+            ('transaction', 'Transaction'),
+        ],
+        widget=forms.RadioSelect,
+        label="File Type"
+    )
+    duplicate_mode = forms.ChoiceField(
+        choices=ImportJob.DuplicateMode.choices,
+        initial=ImportJob.DuplicateMode.ERROR,
+        widget=forms.RadioSelect,
+        label="Existing Rows"
+    )
+    reimport = forms.BooleanField(
+        required=False,
+        label="Import again",
+        help_text="Process files even if the same file was already imported"
+    )
+
+
+class ChunkedUploadForm(forms.Form):
+    """Starts a chunked upload: the file's name and size and the upload options"""
+    file_name = forms.CharField(max_length=255)
+    file_size = forms.IntegerField(min_value=1)
+    file_type = forms.ChoiceField(
+        choices=[
+            ('member', 'Member'),
+            ('transaction', 'Transaction'),
+        ]
+    )
+    duplicate_mode = forms.ChoiceField(
+        choices=ImportJob.DuplicateMode.choices,
+        initial=ImportJob.DuplicateMode.ERROR
+    )
+    parallel = forms.BooleanField(required=False)
+    staging = forms.BooleanField(required=False)
+    reimport = forms.BooleanField(required=False)
@@ -0,0 +1,246 @@
+# data_management/management/commands/benchmark_reports.py
+
+import inspect
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from importlib import import_module
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Max, QuerySet
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from data_management.models import Member, Transaction
+from data_management.services.phones import normalize_phone
+from report_app import REPORTS
+from tenants.context import set_current_db, clear_current_db
+from tenants.models import Tenant
+
+SEED_BATCH_SIZE = 5000
+
+
+class _BenchmarkUser:
+    """Stands in for the logged-in operator; the report views only check is_authenticated"""
+    is_authenticated = True
+    is_active = True
+    username = 'benchmark'
+
+
+class Command(BaseCommand):
+    help = ('Time every report in report_app/reports/ against a tenant database and show the query plans, '
+            'optionally with and without the report indexes (--compare)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant_id', type=str, help='Tenant ID (e.g., pukul.com); use a copy of production data')
+        parser.add_argument('--days', type=int, default=30,
+                            help='Report period in days, ending at the latest transaction (default: 30)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per report; the median is shown (default: 3)')
+        parser.add_argument('--report', action='append', dest='reports', metavar='NAME',
+                            help='Only this report (by name, may be repeated)')
+        parser.add_argument('--explain', action='store_true',
+                            help="Show the plan of each report's slowest query (EXPLAIN ANALYZE on PostgreSQL)")
+        parser.add_argument('--compare', action='store_true',
+                            help='First run without the report indexes (dropped inside a transaction that is '
+                                 'rolled back; this locks the tables for the run), then with them')
+        parser.add_argument('--seed-members', type=int, default=0,
+                            help='Fill an EMPTY tenant database with this many synthetic members and their '
+                                 'transactions first, so runs are reproducible')
+        parser.add_argument('--random-seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Tenant.objects.using('default').get(tenant_id=options['tenant_id'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Tenant {options['tenant_id']} not found")
+
+        db_alias = tenant.db_alias
+        self.tenant_id = tenant.tenant_id
+        reports = [r for r in REPORTS if not options['reports'] or r['name'] in options['reports']]
+        if not reports:
+            raise CommandError(f"No report named {', '.join(options['reports'])}")
+
+        set_current_db(db_alias)
+        try:
+            if options['seed_members']:
+                self._seed(db_alias, options['seed_members'], random.Random(options['random_seed']))
+
+            latest = Transaction.objects.using(db_alias).aggregate(latest=Max('process_date'))['latest']
+            if latest is None:
+                raise CommandError(f"{tenant.tenant_id} has no transactions to report on")
+            end = latest.date()
+            start = end - timedelta(days=options['days'] - 1)
+            self.stdout.write(f"Benchmarking {len(reports)} reports on {db_alias}, {start} to {end}")
+
+            passes = ['without indexes', 'with indexes'] if options['compare'] else ['current']
+            timings = {}
+            for label in passes:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label}"))
+                if label == 'without indexes':
+                    with transaction.atomic(using=db_alias):
+                        self._drop_report_indexes(db_alias)
+                        timings[label] = self._run(db_alias, reports, start, end, options)
+                        transaction.set_rollback(True, using=db_alias)
+                else:
+                    timings[label] = self._run(db_alias, reports, start, end, options)
+        finally:
+            clear_current_db()
+
+        if options['compare']:
+            self.stdout.write(self.style.MIGRATE_HEADING('\nSummary'))
+            for report in reports:
+                before, after = timings['without indexes'][report['name']], timings['with indexes'][report['name']]
+                speedup = before / after if after else 0
+                self.stdout.write(f"  {report['name']:<40} {before:>10.1f} ms {after:>10.1f} ms  {speedup:6.1f}x")
+
+    def _run(self, db_alias, reports, start, end, options):
+        """Time each report; returns {report name: median ms}"""
+        connection = connections[db_alias]
+        factory = RequestFactory()
+        samples = list(Member.objects.using(db_alias).order_by('pk').values_list('username', 'handphone')[:100])
+        specs = self._report_requests(start, end, samples)
+
+        medians = {}
+        for report in reports:
+            view = getattr(import_module(report['view']), report['function_name'])
+            method, params = specs.get(report['function_name'], ('get', {}))
+            durations = []
+            for _ in range(max(1, options['repeat'])):
+                request = self._build_request(factory, report['name'], method, params)
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    self._evaluate(self._call(view, request))
+                    durations.append((time.perf_counter() - started) * 1000)
+
+            medians[report['name']] = statistics.median(durations)
+            self.stdout.write(
+                f"  {report['name']:<40} {medians[report['name']]:>10.1f} ms  {len(queries):>6} queries"
+            )
+            if options['explain'] and len(queries):
+                slowest = max(queries.captured_queries, key=lambda query: float(query['time']))
+                self._explain(connection, slowest['sql'])
+        return medians
+
+    @staticmethod
+    def _report_requests(start, end, samples):
+        """(method, params) per report view, covering the benchmark period"""
+        def iso(day):
+            return day.strftime('%Y-%m-%d')
+
+        period = {'start_date': iso(start), 'end_date': iso(end)}
+        first_week = iso(min(end, start + timedelta(days=6)))
+        usernames = '\n'.join(username for username, _ in samples)
+        phones = '\n'.join(handphone for _, handphone in samples)
+        return {
+            'report_daily_summary_view': ('get', period),
+            'report_daily_general_transaction_summary_view': ('get', period),
+            'report_user_engagement_view': ('get', period),
+            'report_top_deposit_users_view': ('get', dict(period, top_n=50)),
+            'report_top_withdrawal_users_view': ('get', dict(period, top_n=50)),
+            'report_duplicated_phone_number_view': ('get', period),
+            'report_inactive_depositors_view': ('post', {
+                'dep_start_date': iso(start), 'dep_end_date': iso(end), 'inactive_days': 7,
+            }),
+            'report_inactive_withdrawers_view': ('post', {
+                'wd_start_date': iso(start), 'wd_end_date': iso(end), 'inactive_days': 7,
+            }),
+            'report_new_member_deposit_activity_view': ('post', {
+                'reg_start_date': iso(start), 'reg_end_date': first_week,
+                'dep_start_date': iso(start), 'dep_end_date': iso(end),
+            }),
+            'report_new_member_deposit_tracking_days_view': ('post', {
+                'reg_start_date': iso(start), 'reg_end_date': first_week, 'days_to_track': 7,
+            }),
+            'report_user_phone_lookup_view': ('post', {'usernames': usernames}),
+            'report_phone_user_lookup_view': ('post', {'phone_numbers': phones}),
+            'report_user_management_view': ('post', {'action': 'search', 'usernames': usernames}),
+        }
+
+    @staticmethod
+    def _build_request(factory, report_name, method, params):
+        # The lookup reports only act on requests coming from the report hub
+        path = f"/?{urlencode({'report': report_name})}"
+        if method == 'post':
+            request = factory.post(path, params)
+        else:
+            request = factory.get(f"{path}&{urlencode(params)}" if params else path)
+        request.user = _BenchmarkUser()
+        return request
+
+    def _call(self, view, request):
+        # Same convention as report_hub_view: tenant-aware views take tenant_id
+        if 'tenant_id' in inspect.signature(view).parameters:
+            return view(request, tenant_id=self.tenant_id)
+        return view(request)
+
+    @staticmethod
+    def _evaluate(response):
+        """Run querysets the view left lazy in its context, as rendering would"""
+        context = dict(getattr(response, 'context_data', None) or {})
+        context.update(context.pop('context_data', None) or {})
+        for value in context.values():
+            if isinstance(value, QuerySet):
+                list(value)
+
+    def _explain(self, connection, sql):
+        if connection.vendor == 'postgresql':
+            statement = f"EXPLAIN (ANALYZE, BUFFERS) {sql}"
+        else:
+            statement = f"EXPLAIN QUERY PLAN {sql}"
+        with connection.cursor() as cursor:
+            cursor.execute(statement)
+            plan = [' | '.join(str(column) for column in row) for row in cursor.fetchall()]
+        self.stdout.write(f"      {sql[:200]}{'...' if len(sql) > 200 else ''}")
+        for line in plan:
+            self.stdout.write(f"        {line[:160]}{'...' if len(line) > 160 else ''}")
+
+    def _drop_report_indexes(self, db_alias):
+        connection = connections[db_alias]
+        with connection.cursor() as cursor:
+            for index in Transaction._meta.indexes + Member._meta.indexes:
+                cursor.execute(f"DROP INDEX IF EXISTS {connection.ops.quote_name(index.name)}")
+
+    def _seed(self, db_alias, member_count, rng):
+        """Deterministic synthetic members and transactions for the last 180 days"""
+        if Member.objects.using(db_alias).exists() or Transaction.objects.using(db_alias).exists():
+            raise CommandError('--seed-members only fills an empty tenant database')
+
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        events = ['Deposit', 'Deposit', 'Deposit', 'Manual Deposit', 'Withdraw', 'Withdraw', 'Manual Withdraw']
+        members, transactions = [], []
+        for i in range(member_count):
+            joined = today - timedelta(days=rng.randint(0, 179), seconds=rng.randint(0, 86399))
+            # A few accounts share a phone number, as in real exports
+            phone = f"628{1900000000 + rng.randint(0, member_count // 20) if i % 20 == 0 else 1000000000 + i}"
+            member = Member(
+                username=f"user{i:07d}", name=f"Member {i}", handphone=phone[:20],
+                phone_e164=normalize_phone(phone[:20]), join_date=joined,
+            )
+            members.append(member)
+            active_days = max(1, (today - joined).days)
+            for n in range(rng.choice([0, 1, 2, 5, 10, 20, 40])):
+                processed = joined + timedelta(days=rng.randint(0, active_days), seconds=rng.randint(0, 86399))
+                event = rng.choice(events)
+                transactions.append(Transaction(
+                    username=f"user{i:07d}", event=event, member=member, event_code=Transaction.EVENT_CODES[event],
+                    amount=Decimal(rng.randint(1, 500) * 1000), create_date=processed - timedelta(seconds=n),
+                    process_date=processed, process_by='benchmark',
+                ))
+            if len(transactions) >= SEED_BATCH_SIZE:
+                # Members first, so the transactions pick up their ids
+                Member.objects.using(db_alias).bulk_create(members)
+                Transaction.objects.using(db_alias).bulk_create(transactions, ignore_conflicts=True)
+                members, transactions = [], []
+        Member.objects.using(db_alias).bulk_create(members, batch_size=SEED_BATCH_SIZE)
+        Transaction.objects.using(db_alias).bulk_create(transactions, ignore_conflicts=True)
+
+        with connections[db_alias].cursor() as cursor:
+            if connections[db_alias].vendor == 'postgresql':
+                cursor.execute('ANALYZE')
+        self.stdout.write(
+            f"Seeded {member_count} members and {Transaction.objects.using(db_alias).count()} transactions"
+        )
@@ -0,0 +1,73 @@
+# data_management/management/commands/benchmark_upload_validation.py
+
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from data_management.services import BulkImporter
+
+
+class Command(BaseCommand):
+    help = 'Compare row-by-row and vectorized upload validation on synthetic data (no database writes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help='Number of synthetic rows')
+        parser.add_argument('--file-type', choices=['member', 'transaction'], default='transaction')
+        parser.add_argument('--bad-every', type=int, default=100,
+                            help='Make every Nth row invalid so the slow path is exercised')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        file_type = options['file_type']
+        df = self._build_dataframe(file_type, rows, options['bad_every'])
+
+        self.stdout.write(f"Benchmarking {file_type} validation on {rows} rows...")
+
+        timings = {}
+        results = {}
+        for label, vectorized in (('row-by-row', False), ('vectorized', True)):
+            importer = BulkImporter('default', file_type)
+            started = time.perf_counter()
+            valid = importer.validate_dataframe(df, vectorized=vectorized)
+            timings[label] = time.perf_counter() - started
+            results[label] = (len(valid), len(importer.errors))
+            self.stdout.write(
+                f"  {label:<11} {timings[label]:8.2f}s  "
+                f"{rows / timings[label]:>10,.0f} rows/s  "
+                f"valid={len(valid)} errors={len(importer.errors)}"
+            )
+
+        if results['row-by-row'] != results['vectorized']:
+            self.stdout.write(self.style.ERROR("Valid/error counts differ between the two paths"))
+            return
+
+        speedup = timings['row-by-row'] / timings['vectorized'] if timings['vectorized'] else 0
+        self.stdout.write(self.style.SUCCESS(f"Vectorized validation is {speedup:.1f}x faster"))
+
+    @staticmethod
+    def _build_dataframe(file_type, rows, bad_every):
+        events = ['Deposit', 'manual deposit', 'Withdraw', 'Manual Withdraw ']
+        data = []
+        for i in range(rows):
+            stamp = f"{(i % 28) + 1:02d}-09-2025 {(i % 23) + 1:02d}:{i % 60:02d}:{(i // 60) % 60:02d}"
+            bad = bad_every and i % bad_every == 0
+            if file_type == 'member':
+                data.append({
+                    'Username': f"user{i}",
+                    'Name': f"Member {i}",
+                    'Referral': '-',
+                    'Handphone': 6281200000000 + i,
+                    'Join Date': 'not a date' if bad else stamp,
+                    'Email': '',
+                })
+            else:
+                data.append({
+                    'CREATE DATE': stamp,
+                    'USERNAME': f"user{i % 5000}",
+                    'EVENT': 'Bonus' if bad else events[i % len(events)],
+                    'PROCESS DATE': stamp,
+                    'PROCESS BY': 'system',
+                    'AMOUNT': f"{(i % 1000) * 1000:,}.00",
+                })
+        return pd.DataFrame(data)
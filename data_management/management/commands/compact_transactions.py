@@ -0,0 +1,46 @@
+# data_management/management/commands/compact_transactions.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_management.services.compact import (
+    DEFAULT_BATCH_SIZE, compact_ready, compact_transactions, uncompacted_transactions,
+)
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = ('Backfill the compact transaction keys (member id and event code) from username and event; '
+            'reports switch to them once every transaction of a tenant is linked')
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant_id', type=str, nargs='?', help='Only this tenant (default: all active tenants)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f"Transaction ids per update statement (default: {DEFAULT_BATCH_SIZE})")
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.using('default').filter(is_active=True)
+        if options['tenant_id']:
+            tenants = tenants.filter(tenant_id=options['tenant_id'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant {options['tenant_id']} not found")
+
+        for tenant in tenants:
+            db_alias = tenant.db_alias
+            try:
+                linked, coded = compact_transactions(db_alias, batch_size=options['batch_size'])
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"{tenant.tenant_id}: backfill failed: {e}"))
+                continue
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{tenant.tenant_id}: {linked} transactions linked to members, {coded} event codes set"
+            ))
+            if compact_ready(db_alias):
+                self.stdout.write(f"{tenant.tenant_id}: compact keys complete, reports use them")
+            else:
+                orphans = uncompacted_transactions(db_alias).values('username').distinct()
+                self.stdout.write(self.style.WARNING(
+                    f"{tenant.tenant_id}: {orphans.count()} usernames have transactions but no member "
+                    f"(e.g. {', '.join(orphans.order_by('username').values_list('username', flat=True)[:5])}); "
+                    f"reports keep using usernames until their members are imported"
+                ))
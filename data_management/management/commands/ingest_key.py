@@ -0,0 +1,52 @@
+# data_management/management/commands/ingest_key.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_management.models import IngestKey
+from data_management.services.ingest_service import create_ingest_key
+from tenants.context import set_current_db, clear_current_db
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Create, list or revoke API keys for the streaming ingestion endpoint of a tenant'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant_id', type=str, help='Tenant ID (e.g., pukul.com)')
+        parser.add_argument('--create', metavar='NAME', help="Create a key, e.g. --create 'back office feed'")
+        parser.add_argument('--revoke', metavar='KEY_ID', type=int, help='Deactivate the key with this id')
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Tenant.objects.using('default').get(tenant_id=options['tenant_id'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Tenant {options['tenant_id']} not found")
+
+        db_alias = tenant.db_alias
+        set_current_db(db_alias)
+        try:
+            if options['create']:
+                ingest_key, key = create_ingest_key(db_alias, tenant.tenant_id, options['create'])
+                self.stdout.write(self.style.SUCCESS(f"Created ingest key {ingest_key.pk} ({ingest_key.name})"))
+                self.stdout.write(f"Key (shown only once): {key}")
+                self.stdout.write(
+                    f"POST NDJSON or JSON to /tenant/{tenant.tenant_id}/data/api/ingest/transaction/ "
+                    f"(or .../member/) with 'Authorization: Bearer <key>'"
+                )
+                return
+
+            keys = IngestKey.objects.using(db_alias).filter(tenant_id=tenant.tenant_id)
+            if options['revoke']:
+                if not keys.filter(pk=options['revoke']).update(is_active=False):
+                    raise CommandError(f"Ingest key {options['revoke']} not found")
+                self.stdout.write(self.style.SUCCESS(f"Ingest key {options['revoke']} revoked"))
+                return
+
+            for ingest_key in keys.order_by('created_at'):
+                self.stdout.write(
+                    f"{ingest_key.pk}: {ingest_key.name} ({ingest_key.key_prefix}...) "
+                    f"{'active' if ingest_key.is_active else 'revoked'}, "
+                    f"last used {ingest_key.last_used_at or 'never'}"
+                )
+        finally:
+            clear_current_db()
@@ -0,0 +1,92 @@
+# data_management/management/commands/manage_transaction_partitions.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_management.services.partitions import (
+    DEFAULT_MONTHS_AHEAD, archive_directory, create_transaction_partitions, detach_transaction_partitions,
+    is_partitioned, partition_transaction_table, transaction_partitions, unpartition_transaction_table,
+)
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = ('Create the upcoming monthly partitions of the transaction table and optionally detach or '
+            'archive old ones (PostgreSQL tenants converted with --partition)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant_id', type=str, nargs='?', help='Only this tenant (default: all active tenants)')
+        parser.add_argument('--months-ahead', type=int, default=DEFAULT_MONTHS_AHEAD,
+                            help=f"Partitions to keep ready after the current month (default: {DEFAULT_MONTHS_AHEAD})")
+        parser.add_argument('--keep-months', type=int, default=None,
+                            help='Detach partitions older than this many months, the current one included; '
+                                 'they stay in the database as plain tables unless --archive is given')
+        parser.add_argument('--archive', action='store_true',
+                            help='Write each detached partition to a gzip CSV and drop it')
+        parser.add_argument('--archive-dir', type=str, default=None,
+                            help='Archive root; each tenant gets a sub-directory (default: MEDIA_ROOT/partition_archive)')
+        convert = parser.add_mutually_exclusive_group()
+        convert.add_argument('--partition', action='store_true',
+                             help='First convert the transaction table to the partitioned layout. Rewrites every '
+                                  'row under an exclusive lock: run it in a maintenance window with imports stopped')
+        convert.add_argument('--unpartition', action='store_true',
+                             help='Copy a partitioned transaction table back into a plain one (same caveat)')
+
+    def handle(self, *args, **options):
+        if options['archive'] and options['keep_months'] is None:
+            raise CommandError('--archive needs --keep-months')
+
+        tenants = Tenant.objects.using('default').filter(is_active=True)
+        if options['tenant_id']:
+            tenants = tenants.filter(tenant_id=options['tenant_id'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant {options['tenant_id']} not found")
+
+        for tenant in tenants:
+            if options['partition'] or options['unpartition']:
+                try:
+                    self._convert(tenant, options)
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"{tenant.tenant_id}: conversion failed: {e}"))
+                    continue
+                if options['unpartition']:
+                    continue
+            if not is_partitioned(tenant.db_alias):
+                self.stdout.write(f"{tenant.tenant_id}: transaction table is not partitioned, skipped")
+                continue
+            try:
+                self._maintain(tenant, options)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"{tenant.tenant_id}: partition maintenance failed: {e}"))
+
+    def _convert(self, tenant, options):
+        db_alias = tenant.db_alias
+        if options['unpartition']:
+            if is_partitioned(db_alias):
+                unpartition_transaction_table(db_alias)
+                self.stdout.write(self.style.SUCCESS(f"{tenant.tenant_id}: transaction table unpartitioned"))
+            return
+        if not is_partitioned(db_alias):
+            count = partition_transaction_table(db_alias, months_ahead=options['months_ahead'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{tenant.tenant_id}: transaction table partitioned into {count} monthly partitions"
+            ))
+
+    def _maintain(self, tenant, options):
+        db_alias = tenant.db_alias
+        for name in create_transaction_partitions(db_alias, months_ahead=options['months_ahead']):
+            self.stdout.write(self.style.SUCCESS(f"{tenant.tenant_id}: created {name}"))
+
+        if options['keep_months'] is not None:
+            archive_dir = None
+            if options['archive']:
+                archive_dir = archive_directory(tenant.tenant_id, options['archive_dir'])
+            for name, path in detach_transaction_partitions(db_alias, options['keep_months'], archive_dir):
+                detail = f"archived to {path}" if path else 'left as a plain table'
+                self.stdout.write(self.style.SUCCESS(f"{tenant.tenant_id}: detached {name}, {detail}"))
+
+        if options['verbosity'] > 1:
+            months = list(transaction_partitions(db_alias))
+            self.stdout.write(
+                f"{tenant.tenant_id}: {len(months)} monthly partitions"
+                + (f", {months[0]:%Y-%m} to {months[-1]:%Y-%m}" if months else '')
+            )
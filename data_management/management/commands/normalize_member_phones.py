@@ -0,0 +1,35 @@
+# data_management/management/commands/normalize_member_phones.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_management.services.phones import backfill_phone_e164, tenant_phone_countries
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = ("Backfill Member.phone_e164 from handphone, reading numbers with the tenant's primary and supported "
+            "countries (migration 0013 fills it once; run with --all after the countries change)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant_id', type=str, nargs='?', help='Only this tenant (default: all active tenants)')
+        parser.add_argument('--all', action='store_true',
+                            help='Normalize every member again, e.g. after the supported countries changed '
+                                 '(default: only members without phone_e164)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.using('default').filter(is_active=True)
+        if options['tenant_id']:
+            tenants = tenants.filter(tenant_id=options['tenant_id'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant {options['tenant_id']} not found")
+
+        for tenant in tenants:
+            countries = tenant_phone_countries(tenant.db_alias)
+            updated, unreadable = backfill_phone_e164(
+                tenant.db_alias, countries, batch_size=options['batch_size'], everyone=options['all']
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"{tenant.tenant_id}: {updated} members updated ({', '.join(countries)}), "
+                f"{unreadable} phone numbers could not be read"
+            ))
@@ -0,0 +1,85 @@
+# data_management/management/commands/parallel_import.py
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_management.models import ImportJob
+from data_management.services import enqueue_import_job, register_import_file, run_partitioned_job
+from tenants.context import set_current_db, clear_current_db
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = ('Import a large member/transaction CSV (e.g. tenant onboarding history) by splitting it into '
+            'byte-range partitions written by parallel worker processes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant_id', type=str, help='Tenant ID (e.g., pukul.com)')
+        parser.add_argument('file_path', type=str, help='CSV file on this server; it is imported in place')
+        parser.add_argument('--file-type', choices=['member', 'transaction'], default='transaction')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default: number of CPUs)')
+        parser.add_argument('--partitions', type=int, default=None,
+                            help='Byte-range partitions (default: same as --workers)')
+        parser.add_argument('--duplicate-mode', choices=ImportJob.DuplicateMode.values,
+                            default=ImportJob.DuplicateMode.ERROR,
+                            help="How rows that already exist are handled ('skip' makes re-runs safe)")
+        parser.add_argument('--async', action='store_true', dest='run_async',
+                            help='Queue the partitions on Celery instead of a local process pool')
+        parser.add_argument('--reimport', action='store_true',
+                            help='Import even if the upload registry has already seen this file')
+
+    def handle(self, *args, **options):
+        file_path = os.path.abspath(options['file_path'])
+        if not os.path.isfile(file_path):
+            raise CommandError(f"{file_path} does not exist")
+        if not file_path.lower().endswith('.csv'):
+            raise CommandError("Only .csv files can be split into partitions")
+
+        try:
+            tenant = Tenant.objects.using('default').get(tenant_id=options['tenant_id'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Tenant {options['tenant_id']} not found")
+
+        db_alias = tenant.db_alias
+        workers = max(1, options['workers'])
+        partitions = max(1, options['partitions'] or workers)
+
+        set_current_db(db_alias)
+        try:
+            job = register_import_file(
+                db_alias, tenant.tenant_id, file_path, options['file_type'],
+                duplicate_mode=options['duplicate_mode'], partitions=partitions, reimport=options['reimport']
+            )
+            if job.status == ImportJob.Status.COMPLETED:
+                self.stdout.write(self.style.WARNING(
+                    f"{job.file_name} is identical to import job {job.summary.get('duplicate_of')}; nothing to do "
+                    f"(use --reimport to import it again)"
+                ))
+                return
+            self.stdout.write(
+                f"Import job {job.pk}: {job.file_name} ({job.file_size / 1024 / 1024:.1f} MB) "
+                f"in up to {partitions} partitions"
+            )
+            if job.skip_rows:
+                self.stdout.write(f"First {job.skip_rows} rows were imported by an earlier upload; skipping them")
+
+            if options['run_async']:
+                enqueue_import_job(job, db_alias, run_async=True)
+                self.stdout.write(self.style.SUCCESS(f"Import job {job.pk} queued"))
+                return
+
+            job = run_partitioned_job(job.pk, db_alias, workers=workers)
+
+            style = self.style.SUCCESS if job.status == ImportJob.Status.COMPLETED else self.style.ERROR
+            self.stdout.write(style(
+                f"Import job {job.pk} {job.status}: {job.rows_inserted} inserted, {job.rows_updated} updated, "
+                f"{job.rows_skipped} skipped, {job.rows_failed} failed, {job.rows_per_second:.0f} rows/s"
+            ))
+            if job.error_message:
+                self.stdout.write(self.style.ERROR(job.error_message))
+            if job.error_log_id:
+                self.stdout.write(f"Error log: {job.error_log.file_path}")
+        finally:
+            clear_current_db()
@@ -0,0 +1,30 @@
+# data_management/management/commands/rebuild_daily_rollups.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_management.services.rollups import rebuild_daily_rollups
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the daily transaction rollups from the transactions. Run once per tenant to switch the daily '
+            'reports to the rollups (imports keep them up to date from then on), and again to repair them')
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant_id', type=str, nargs='?', help='Only this tenant (default: all active tenants)')
+        parser.add_argument('--months', type=int, default=1, help='Months of transactions per query (default: 1)')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.using('default').filter(is_active=True)
+        if options['tenant_id']:
+            tenants = tenants.filter(tenant_id=options['tenant_id'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant {options['tenant_id']} not found")
+
+        for tenant in tenants:
+            try:
+                written = rebuild_daily_rollups(tenant.db_alias, months=options['months'])
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"{tenant.tenant_id}: rebuild failed: {e}"))
+                continue
+            self.stdout.write(self.style.SUCCESS(f"{tenant.tenant_id}: {written} daily rollup rows"))
@@ -0,0 +1,29 @@
+# data_management/management/commands/rebuild_member_stats.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_management.services.member_stats import rebuild_member_stats
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the per-member activity stats from the transactions. Run once per tenant to switch the '
+            'member reports to them (imports keep them up to date from then on), and again to repair them')
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant_id', type=str, nargs='?', help='Only this tenant (default: all active tenants)')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.using('default').filter(is_active=True)
+        if options['tenant_id']:
+            tenants = tenants.filter(tenant_id=options['tenant_id'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant {options['tenant_id']} not found")
+
+        for tenant in tenants:
+            try:
+                written = rebuild_member_stats(tenant.db_alias)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"{tenant.tenant_id}: rebuild failed: {e}"))
+                continue
+            self.stdout.write(self.style.SUCCESS(f"{tenant.tenant_id}: member stats of {written} users"))
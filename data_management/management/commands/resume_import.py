@@ -0,0 +1,71 @@
+# data_management/management/commands/resume_import.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_management.models import ImportJob
+from data_management.services import resume_import_job
+from tenants.context import set_current_db, clear_current_db
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'List or resume interrupted member/transaction imports for a tenant'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant_id', type=str, help='Tenant ID (e.g., pukul.com)')
+        parser.add_argument('job_id', type=int, nargs='?', help='Import job to resume (omit to list resumable jobs)')
+        parser.add_argument('--async', action='store_true', dest='run_async',
+                            help='Queue the resumed job on Celery instead of running it here')
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Tenant.objects.using('default').get(tenant_id=options['tenant_id'])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Tenant {options['tenant_id']} not found")
+
+        db_alias = tenant.db_alias
+        jobs = ImportJob.objects.using(db_alias).filter(tenant_id=tenant.tenant_id)
+
+        if not options['job_id']:
+            unfinished = jobs.filter(
+                status__in=[ImportJob.Status.FAILED, ImportJob.Status.RUNNING]
+            ).order_by('-created_at')
+            resumable = [job for job in unfinished if job.is_resumable]
+            if not resumable:
+                self.stdout.write("No resumable imports.")
+            for job in resumable:
+                state = 'stalled' if job.is_stale else job.status
+                self.stdout.write(
+                    f"#{job.pk}  {job.file_name}  [{state}]  {job.file_type}  "
+                    f"committed up to row {job.checkpoint_row}  {job.error_message}"
+                )
+            return
+
+        try:
+            job = jobs.get(pk=options['job_id'])
+        except ImportJob.DoesNotExist:
+            raise CommandError(f"Import job {options['job_id']} not found for {tenant.tenant_id}")
+
+        if job.partitions > 1:
+            self.stdout.write(f"Re-running partitioned import job {job.pk} ({job.file_name})...")
+        else:
+            self.stdout.write(f"Resuming import job {job.pk} ({job.file_name}) from row {job.checkpoint_row}...")
+
+        set_current_db(db_alias)
+        try:
+            resume_import_job(job, db_alias, run_async=options['run_async'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            clear_current_db()
+
+        if options['run_async']:
+            self.stdout.write(self.style.SUCCESS(f"Import job {job.pk} queued"))
+            return
+
+        job.refresh_from_db(using=db_alias)
+        style = self.style.SUCCESS if job.status == ImportJob.Status.COMPLETED else self.style.ERROR
+        self.stdout.write(style(
+            f"Import job {job.pk} {job.status}: {job.rows_inserted} inserted, {job.rows_updated} updated, "
+            f"{job.rows_skipped} skipped, {job.rows_failed} failed"
+        ))
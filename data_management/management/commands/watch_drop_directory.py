@@ -0,0 +1,65 @@
+# data_management/management/commands/watch_drop_directory.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_management.models import ImportJob
+from data_management.services.drop_directory import drop_directory, ingest_drop_directory
+from tenants.context import set_current_db, clear_current_db
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = ('Watch tenant drop directories (MEDIA_ROOT/drop/<tenant>/member|transaction/) and import new '
+            'export files in arrival order')
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant_id', type=str, nargs='?', help='Only this tenant (default: all active tenants)')
+        parser.add_argument('--interval', type=int, default=300,
+                            help='Seconds between scans (default: 300)')
+        parser.add_argument('--once', action='store_true', help='Scan once and exit, e.g. from cron')
+        parser.add_argument('--duplicate-mode', choices=ImportJob.DuplicateMode.values, default=None,
+                            help="How rows that already exist are handled (default: DATA_IMPORT_CONFIG "
+                                 "['DROP_DUPLICATE_MODE'])")
+        parser.add_argument('--settle-seconds', type=int, default=None,
+                            help='Ignore files modified more recently than this (still being written)')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.using('default').filter(is_active=True)
+        if options['tenant_id']:
+            tenants = tenants.filter(tenant_id=options['tenant_id'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant {options['tenant_id']} not found")
+
+        while True:
+            for tenant in tenants:
+                self._scan(tenant, options)
+            if options['once']:
+                return
+            time.sleep(options['interval'])
+
+    def _scan(self, tenant, options):
+        set_current_db(tenant.db_alias)
+        try:
+            jobs = ingest_drop_directory(
+                tenant, duplicate_mode=options['duplicate_mode'], settle_seconds=options['settle_seconds']
+            )
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f"{tenant.tenant_id}: drop directory scan failed: {e}"))
+            return
+        finally:
+            clear_current_db()
+
+        if not jobs and options['verbosity'] > 1:
+            self.stdout.write(f"{tenant.tenant_id}: nothing new in {drop_directory(tenant.tenant_id)}")
+        for job in jobs:
+            style = self.style.SUCCESS if job.status == ImportJob.Status.COMPLETED else self.style.ERROR
+            if job.summary.get('duplicate_of'):
+                detail = f"identical to import job {job.summary['duplicate_of']}, not imported again"
+            else:
+                detail = (f"{job.rows_inserted} inserted, {job.rows_updated} updated, {job.rows_skipped} skipped, "
+                          f"{job.rows_failed} failed")
+            self.stdout.write(style(f"{tenant.tenant_id}: import job {job.pk} {job.file_type} {job.status}: {detail}"))
+            if job.error_message:
+                self.stdout.write(self.style.ERROR(job.error_message))
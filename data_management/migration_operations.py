@@ -0,0 +1,38 @@
+# data_management/migration_operations.py
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class AddIndexConcurrentlyOnPostgres(AddIndexConcurrently):
+    """
+    Tenant member and transaction tables are large and imports write to
+    them all day: on PostgreSQL build the index without blocking writes.
+    Migrations using it must set ``atomic = False``. Other backends (local
+    SQLite) and partitioned tables, which cannot be indexed concurrently,
+    get a plain CREATE INDEX.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if self._concurrent(schema_editor, to_state.apps.get_model(app_label, self.model_name)):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if self._concurrent(schema_editor, from_state.apps.get_model(app_label, self.model_name)):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+    @staticmethod
+    def _concurrent(schema_editor, model):
+        connection = schema_editor.connection
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))",
+                [model._meta.db_table]
+            )
+            return cursor.fetchone()[0]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0 on 2026-10-17 00:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tenant_id', models.CharField(db_index=True, max_length=100, null=True)),
+                ('file_name', models.CharField(help_text='Original name of the uploaded file', max_length=255)),
+                ('file_path', models.CharField(help_text='Saved copy of the upload under MEDIA_ROOT/uploads', max_length=500)),
+                ('file_type', models.CharField(max_length=20)),
+                ('file_size', models.BigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('rows_processed', models.IntegerField(default=0)),
+                ('rows_failed', models.IntegerField(default=0)),
+                ('rows_per_second', models.FloatField(default=0)),
+                ('summary', models.JSONField(blank=True, default=dict)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('error_log', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='data_management.errorlog')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant_id', 'created_at'], name='data_manage_tenant__85783e_idx')],
+            },
+        ),
+    ]
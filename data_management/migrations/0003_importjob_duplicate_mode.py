@@ -0,0 +1,28 @@
+# Generated by Django 5.0 on 2026-10-17 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0002_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='duplicate_mode',
+            field=models.CharField(choices=[('error', 'Report as errors'), ('skip', 'Skip existing rows'), ('update', 'Update existing rows')], default='error', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_skipped',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_updated',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0 on 2026-10-17 00:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0003_importjob_duplicate_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='file_hash',
+            field=models.CharField(blank=True, help_text='SHA-256 of the saved upload', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last progress update from the worker', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-17 01:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0004_importjob_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='partitions',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Byte-range partitions imported by parallel workers (1 = sequential)'),
+        ),
+    ]
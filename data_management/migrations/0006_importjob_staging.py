@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-17 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0005_importjob_partitions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='staging',
+            field=models.BooleanField(default=False, help_text='Validate and insert in PostgreSQL through a COPY staging table'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0 on 2026-10-17 01:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0006_importjob_staging'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='skip_bytes',
+            field=models.BigIntegerField(default=0, help_text='Size of that already imported prefix'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='skip_rows',
+            field=models.IntegerField(default=0, help_text='Leading data rows already imported from an earlier upload of the same export'),
+        ),
+        migrations.CreateModel(
+            name='UploadRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tenant_id', models.CharField(max_length=100, null=True)),
+                ('file_type', models.CharField(max_length=20)),
+                ('file_hash', models.CharField(help_text='SHA-256 of the whole file', max_length=64)),
+                ('file_size', models.BigIntegerField()),
+                ('row_count', models.IntegerField(help_text='Data rows in the file, including rows skipped as a known prefix')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('error_log', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='data_management.errorlog')),
+                ('import_job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='data_management.importjob')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant_id', 'file_type', 'file_size'], name='data_manage_tenant__bbdad9_idx')],
+                'unique_together': {('tenant_id', 'file_type', 'file_hash')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0 on 2026-10-17 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0007_upload_registry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tenant_id', models.CharField(db_index=True, max_length=100, null=True)),
+                ('name', models.CharField(help_text="Who uses the key, e.g. 'back office feed'", max_length=100)),
+                ('key_prefix', models.CharField(help_text='First characters of the key, to tell keys apart', max_length=8)),
+                ('key_hash', models.CharField(max_length=64, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0 on 2026-10-17 01:27
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0009_importbatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkedUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('tenant_id', models.CharField(db_index=True, max_length=100, null=True)),
+                ('file_name', models.CharField(help_text='Original name of the uploaded file', max_length=255)),
+                ('file_path', models.CharField(help_text='File being assembled under MEDIA_ROOT/uploads', max_length=500)),
+                ('file_type', models.CharField(max_length=20)),
+                ('file_size', models.BigIntegerField()),
+                ('chunk_size', models.IntegerField(help_text='Size of every part but the last')),
+                ('duplicate_mode', models.CharField(choices=[('error', 'Report as errors'), ('skip', 'Skip existing rows'), ('update', 'Update existing rows')], default='error', max_length=10)),
+                ('partitions', models.PositiveSmallIntegerField(default=1)),
+                ('staging', models.BooleanField(default=False)),
+                ('reimport', models.BooleanField(default=False)),
+                ('received_parts', models.JSONField(blank=True, default=list, help_text='Numbers of the parts written so far')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('import_job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='data_management.importjob')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-17 01:31
+
+from django.db import migrations, models
+
+from data_management.migration_operations import AddIndexConcurrentlyOnPostgres
+
+
+class Migration(migrations.Migration):
+
+    atomic = False  # CREATE INDEX CONCURRENTLY cannot run in a transaction
+
+    dependencies = [
+        ('data_management', '0010_chunkedupload'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='member',
+            index=models.Index(fields=['join_date'], name='member_join_date_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='member',
+            index=models.Index(fields=['handphone'], name='member_handphone_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='transaction',
+            index=models.Index(fields=['process_date', 'event'], include=('username', 'amount'), name='transaction_date_event_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='transaction',
+            index=models.Index(fields=['username', 'process_date'], name='transaction_user_date_idx'),
+        ),
+    ]
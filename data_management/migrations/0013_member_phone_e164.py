@@ -0,0 +1,43 @@
+# Generated by Django 5.0 on 2026-10-17 01:53
+
+from django.db import migrations, models
+
+from data_management.migration_operations import AddIndexConcurrentlyOnPostgres
+
+
+def fill_phone_e164(apps, schema_editor):
+    """
+    Normalize the existing members' phone numbers, so the phone reports
+    (which match on phone_e164) find them straight after migrate
+    """
+    from data_management.services.phones import backfill_phone_e164, tenant_phone_countries
+
+    Member = apps.get_model('data_management', 'Member')
+    db_alias = schema_editor.connection.alias
+    if not Member.objects.using(db_alias).filter(phone_e164='').exists():
+        return
+    backfill_phone_e164(db_alias, tenant_phone_countries(db_alias), model=Member)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction, and the backfill
+    # commits batch by batch on large member tables
+    atomic = False
+
+    dependencies = [
+        ('data_management', '0011_report_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='phone_e164',
+            field=models.CharField(blank=True, default='', max_length=16),
+        ),
+        migrations.RunPython(fill_phone_e164, migrations.RunPython.noop, elidable=True),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='member',
+            index=models.Index(fields=['phone_e164'], name='member_phone_e164_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0 on 2026-10-17 01:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from data_management.migration_operations import AddIndexConcurrentlyOnPostgres
+
+
+class Migration(migrations.Migration):
+
+    atomic = False  # CREATE INDEX CONCURRENTLY cannot run in a transaction
+
+    dependencies = [
+        ('data_management', '0013_member_phone_e164'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='event_code',
+            field=models.SmallIntegerField(blank=True, choices=[(1, 'Deposit'), (2, 'Manual Deposit'), (3, 'Withdraw'), (4, 'Manual Withdraw')], null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='member',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='data_management.member'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='transaction',
+            index=models.Index(fields=['process_date', 'event_code'], include=('member', 'amount'), name='transaction_date_code_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='transaction',
+            index=models.Index(fields=['member', 'process_date'], name='transaction_member_date_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('member__isnull', True), ('event_code__isnull', True), _connector='OR'), fields=['id'], name='transaction_uncompacted_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0 on 2026-10-17 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0014_compact_transaction_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTransactionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('event', models.CharField(max_length=20)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('user_count', models.IntegerField(default=0, help_text='Distinct usernames')),
+                ('new_member_transaction_count', models.IntegerField(default=0)),
+                ('new_member_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('new_member_user_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('day', 'event')},
+            },
+        ),
+    ]
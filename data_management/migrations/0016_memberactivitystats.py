@@ -0,0 +1,39 @@
+# Generated by Django 5.0 on 2026-10-17 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0015_dailytransactionrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberActivityStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=100, unique=True)),
+                ('first_deposit', models.DateTimeField(blank=True, null=True)),
+                ('last_deposit', models.DateTimeField(blank=True, null=True)),
+                ('last_withdrawal', models.DateTimeField(blank=True, null=True)),
+                ('last_activity', models.DateTimeField(blank=True, help_text='Latest process_date of any event', null=True)),
+                ('deposit_count', models.IntegerField(default=0)),
+                ('deposit_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('largest_deposit', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('withdrawal_count', models.IntegerField(default=0)),
+                ('withdrawal_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('largest_withdrawal', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('recent_deposit_count', models.IntegerField(default=0)),
+                ('recent_deposit_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('recent_withdrawal_count', models.IntegerField(default=0)),
+                ('recent_withdrawal_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('window_end', models.DateField(help_text='Last day of the recent_* window')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['last_activity'], name='member_stats_activity_idx')],
+            },
+        ),
+    ]
@@ -1,14 +1,29 @@
 # data_management/models.py
+import uuid
+from datetime import timedelta
 from django.db import models
+from django.utils import timezone
 
 class Member(models.Model):
     username = models.CharField(max_length=100, unique=True)
     name = models.CharField(max_length=200)
     referral = models.CharField(max_length=100, blank=True)
     handphone = models.CharField(max_length=20)
+    # handphone in E.164 (+6281234567890), read with the tenant's countries;
+    # '' when it cannot be normalized. Filled on import (see services.phones)
+    phone_e164 = models.CharField(max_length=16, blank=True, default='')
     join_date = models.DateTimeField()
     email = models.EmailField(blank=True)
 
+    class Meta:
+        indexes = [
+            # New-member reports filter join_date by day; phone lookups and
+            # the duplicate phone report match or group on phone_e164
+            models.Index(fields=['join_date'], name='member_join_date_idx'),
+            models.Index(fields=['handphone'], name='member_handphone_idx'),
+            models.Index(fields=['phone_e164'], name='member_phone_e164_idx'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -19,19 +34,117 @@ class Transaction(models.Model):
         ('Withdraw', 'Withdraw'),
         ('Manual Withdraw', 'Manual Withdraw'),
     ]
+    # Compact stand-ins for event and username (see services.compact)
+    EVENT_CODES = {'Deposit': 1, 'Manual Deposit': 2, 'Withdraw': 3, 'Manual Withdraw': 4}
+
     username = models.CharField(max_length=100)
     event = models.CharField(max_length=20, choices=EVENT_CHOICES)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     create_date = models.DateTimeField()
     process_date = models.DateTimeField()
     process_by = models.CharField(max_length=100, blank=True)
+    # The Member with this username (NULL until it is imported) and
+    # EVENT_CODES[event]; filled on import and by compact_transactions
+    member = models.ForeignKey(Member, null=True, blank=True, on_delete=models.SET_NULL, db_constraint=False,
+                               db_index=False, related_name='transactions')
+    event_code = models.SmallIntegerField(null=True, blank=True,
+                                          choices=[(code, event) for event, code in EVENT_CODES.items()])
 
     class Meta:
+        # The natural key. A tenant whose table was converted with
+        # manage_transaction_partitions --partition only has it unique per
+        # process_date (a partitioned table's unique constraints must hold
+        # the partition key); its importers check the key themselves under
+        # services.partitions.lock_transaction_keys()
         unique_together = ('username', 'event', 'create_date', 'amount')
+        indexes = [
+            # Reports select a day or period of process_date, usually for some
+            # events, then count or sum per username; with username and amount
+            # included those queries are answered from the index alone
+            models.Index(fields=['process_date', 'event'], include=['username', 'amount'],
+                         name='transaction_date_event_idx'),
+            # Per-user history: period totals and last activity
+            models.Index(fields=['username', 'process_date'], name='transaction_user_date_idx'),
+            # The same two on the compact keys: 8-byte member ids and 2-byte
+            # event codes in place of the strings
+            models.Index(fields=['process_date', 'event_code'], include=['member', 'amount'],
+                         name='transaction_date_code_idx'),
+            models.Index(fields=['member', 'process_date'], name='transaction_member_date_idx'),
+            # Rows still waiting for their compact keys; empty once every
+            # transaction is linked, which is what compact_ready() checks
+            models.Index(fields=['id'], condition=models.Q(member__isnull=True) | models.Q(event_code__isnull=True),
+                         name='transaction_uncompacted_idx'),
+        ]
 
     def __str__(self):
         return f"{self.event} by {self.username}"
 
+
+class DailyTransactionRollup(models.Model):
+    """
+    Per day and event totals of the transactions, kept in step with every
+    import (see services.rollups) so the daily reports read a few rows per
+    day instead of the day's transactions. Besides the four events there is
+    an ALL_DEPOSITS row per day, counting each depositor once over Deposit
+    and Manual Deposit. "New members" joined on the day itself; figures for
+    older members are the totals minus the new-member ones.
+    """
+    ALL_DEPOSITS = 'All Deposits'
+
+    day = models.DateField()
+    event = models.CharField(max_length=20)
+    transaction_count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    user_count = models.IntegerField(default=0, help_text="Distinct usernames")
+    new_member_transaction_count = models.IntegerField(default=0)
+    new_member_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    new_member_user_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('day', 'event')
+
+    def __str__(self):
+        return f"{self.day} {self.event}: {self.transaction_count}"
+
+
+class MemberActivityStats(models.Model):
+    """
+    Lifetime activity of one username, kept in step with the transaction
+    imports (see services.member_stats) so reports read one row per user
+    instead of aggregating the user's history. Keyed by username rather
+    than Member: transactions may arrive before their member. The recent_*
+    figures cover the RECENT_DAYS days up to ``window_end``.
+    """
+    RECENT_DAYS = 30
+
+    username = models.CharField(max_length=100, unique=True)
+    first_deposit = models.DateTimeField(null=True, blank=True)
+    last_deposit = models.DateTimeField(null=True, blank=True)
+    last_withdrawal = models.DateTimeField(null=True, blank=True)
+    last_activity = models.DateTimeField(null=True, blank=True, help_text="Latest process_date of any event")
+    deposit_count = models.IntegerField(default=0)
+    deposit_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    largest_deposit = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    withdrawal_count = models.IntegerField(default=0)
+    withdrawal_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    largest_withdrawal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    recent_deposit_count = models.IntegerField(default=0)
+    recent_deposit_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    recent_withdrawal_count = models.IntegerField(default=0)
+    recent_withdrawal_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    window_end = models.DateField(help_text="Last day of the recent_* window")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Inactivity reports select users by last activity
+            models.Index(fields=['last_activity'], name='member_stats_activity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.username}: last active {self.last_activity}"
+
 # OPTION 1: Clean approach - Remove foreign key, use tenant_id string
 class ErrorLog(models.Model):
     tenant_id = models.CharField(max_length=100, db_index=True, null=True) # Store tenant domain (e.g., "pukul.com")
@@ -50,3 +163,207 @@ class ErrorLog(models.Model):
 
     def __str__(self):
         return f"{self.file_name} ({self.tenant_id})"
+
+
+class ImportBatch(models.Model):
+    """Several files, or the members of a zip archive, uploaded together; one ImportJob per file"""
+    tenant_id = models.CharField(max_length=100, db_index=True, null=True)  # Tenant domain, as on ErrorLog
+    name = models.CharField(max_length=255, help_text="Uploaded file name(s)")
+    file_type = models.CharField(max_length=20)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.tenant_id})"
+
+
+class ImportJob(models.Model):
+    """Background member/transaction upload processed by a Celery worker"""
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        COMPLETED = 'completed', 'Completed'
+        FAILED = 'failed', 'Failed'
+
+    # A running job with no progress for this long is assumed to have lost its worker
+    STALE_AFTER = timedelta(minutes=10)
+
+    tenant_id = models.CharField(max_length=100, db_index=True, null=True)  # Tenant domain, as on ErrorLog
+    file_name = models.CharField(max_length=255, help_text="Original name of the uploaded file")
+    file_path = models.CharField(max_length=500, help_text="Saved copy of the upload under MEDIA_ROOT/uploads")
+    file_type = models.CharField(max_length=20)
+    file_size = models.BigIntegerField(default=0)
+    file_hash = models.CharField(max_length=64, blank=True, help_text="SHA-256 of the saved upload")
+
+    class DuplicateMode(models.TextChoices):
+        ERROR = 'error', 'Report as errors'
+        SKIP = 'skip', 'Skip existing rows'
+        UPDATE = 'update', 'Update existing rows'
+
+    duplicate_mode = models.CharField(max_length=10, choices=DuplicateMode.choices, default=DuplicateMode.ERROR)
+    partitions = models.PositiveSmallIntegerField(
+        default=1, help_text="Byte-range partitions imported by parallel workers (1 = sequential)"
+    )
+    staging = models.BooleanField(
+        default=False, help_text="Validate and insert in PostgreSQL through a COPY staging table"
+    )
+    skip_rows = models.IntegerField(
+        default=0, help_text="Leading data rows already imported from an earlier upload of the same export"
+    )
+    skip_bytes = models.BigIntegerField(default=0, help_text="Size of that already imported prefix")
+    batch = models.ForeignKey(ImportBatch, null=True, blank=True, on_delete=models.SET_NULL, related_name='jobs')
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    rows_processed = models.IntegerField(default=0)
+    rows_failed = models.IntegerField(default=0)
+    rows_updated = models.IntegerField(default=0)
+    rows_skipped = models.IntegerField(default=0)
+    rows_per_second = models.FloatField(default=0)
+    summary = models.JSONField(default=dict, blank=True)
+    error_message = models.TextField(blank=True)
+    error_log = models.ForeignKey(ErrorLog, null=True, blank=True, on_delete=models.SET_NULL)
+
+    # Last committed batch: {'row': <last file row handled>, 'inserted': ..., ...}
+    # written in the same transaction as the batch, so a resumed job continues
+    # exactly where the previous run stopped
+    checkpoint = models.JSONField(default=dict, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last progress update from the worker")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant_id', 'created_at']),
+        ]
+
+    @property
+    def rows_succeeded(self):
+        """Rows written to the tenant DB (inserted or updated)"""
+        return self.rows_processed - self.rows_failed - self.rows_skipped
+
+    @property
+    def rows_inserted(self):
+        return self.rows_succeeded - self.rows_updated
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.COMPLETED, self.Status.FAILED)
+
+    @property
+    def is_stale(self):
+        last_seen = self.heartbeat_at or self.started_at
+        return (
+            self.status == self.Status.RUNNING
+            and last_seen is not None
+            and timezone.now() - last_seen > self.STALE_AFTER
+        )
+
+    @property
+    def is_resumable(self):
+        """
+        Failed jobs and jobs whose worker died mid-file can be resumed.
+        Partitioned jobs keep no single checkpoint; resuming one re-runs
+        the whole file (see resume_import_job).
+        """
+        return self.status == self.Status.FAILED or self.is_stale
+
+    @property
+    def checkpoint_row(self):
+        return self.checkpoint.get('row', 0)
+
+    def __str__(self):
+        return f"{self.file_name} [{self.status}] ({self.tenant_id})"
+
+
+class UploadRecord(models.Model):
+    """
+    Content-addressed registry of completed imports. An upload with the
+    same SHA-256 is answered from the earlier import without parsing it,
+    and a CSV that starts with a registered file (an append-only export)
+    only imports the rows after it.
+    """
+    tenant_id = models.CharField(max_length=100, null=True)  # Tenant domain, as on ErrorLog
+    file_type = models.CharField(max_length=20)
+    file_hash = models.CharField(max_length=64, help_text="SHA-256 of the whole file")
+    file_size = models.BigIntegerField()
+    row_count = models.IntegerField(help_text="Data rows in the file, including rows skipped as a known prefix")
+    import_job = models.ForeignKey(ImportJob, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    error_log = models.ForeignKey(ErrorLog, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('tenant_id', 'file_type', 'file_hash')
+        indexes = [
+            models.Index(fields=['tenant_id', 'file_type', 'file_size']),
+        ]
+
+    def __str__(self):
+        return f"{self.file_hash[:12]} {self.file_type} ({self.tenant_id})"
+
+
+class IngestKey(models.Model):
+    """
+    API key for the streaming ingestion endpoint. Only a SHA-256 of the
+    key is stored; the key itself is shown once when it is created.
+    """
+    tenant_id = models.CharField(max_length=100, db_index=True, null=True)  # Tenant domain, as on ErrorLog
+    name = models.CharField(max_length=100, help_text="Who uses the key, e.g. 'back office feed'")
+    key_prefix = models.CharField(max_length=8, help_text="First characters of the key, to tell keys apart")
+    key_hash = models.CharField(max_length=64, unique=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.key_prefix}...) [{self.tenant_id}]"
+
+
+class ChunkedUpload(models.Model):
+    """
+    A large file uploaded from the browser in numbered parts. Each part is
+    written at its offset in ``file_path``; once every part has arrived
+    the file is handed to a background ImportJob. An interrupted upload
+    continues by sending only the parts missing from ``received_parts``.
+    """
+    # An upload that receives no parts for this long is abandoned
+    EXPIRE_AFTER = timedelta(days=1)
+
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    tenant_id = models.CharField(max_length=100, db_index=True, null=True)  # Tenant domain, as on ErrorLog
+    file_name = models.CharField(max_length=255, help_text="Original name of the uploaded file")
+    file_path = models.CharField(max_length=500, help_text="File being assembled under MEDIA_ROOT/uploads")
+    file_type = models.CharField(max_length=20)
+    file_size = models.BigIntegerField()
+    chunk_size = models.IntegerField(help_text="Size of every part but the last")
+    duplicate_mode = models.CharField(
+        max_length=10, choices=ImportJob.DuplicateMode.choices, default=ImportJob.DuplicateMode.ERROR
+    )
+    partitions = models.PositiveSmallIntegerField(default=1)
+    staging = models.BooleanField(default=False)
+    reimport = models.BooleanField(default=False)
+    received_parts = models.JSONField(default=list, blank=True, help_text="Numbers of the parts written so far")
+    import_job = models.ForeignKey(ImportJob, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def part_count(self):
+        return max(1, -(-self.file_size // self.chunk_size))
+
+    def part_size(self, number):
+        """Expected length of part ``number`` (0-based)"""
+        return min(self.chunk_size, self.file_size - number * self.chunk_size)
+
+    @property
+    def missing_parts(self):
+        received = set(self.received_parts)
+        return [number for number in range(self.part_count) if number not in received]
+
+    @property
+    def is_complete(self):
+        return not self.missing_parts
+
+    def __str__(self):
+        return f"{self.file_name} [{len(self.received_parts)}/{self.part_count} parts] ({self.tenant_id})"
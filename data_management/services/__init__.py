@@ -0,0 +1,12 @@
+# data_management/services/__init__.py
+
+from .import_service import BulkImporter
+from .job_service import (
+    create_import_job, enqueue_import_job, register_import_file, resume_import_job, run_import_job
+)
+from .parallel_import import run_partitioned_job
+
+__all__ = [
+    'BulkImporter', 'create_import_job', 'enqueue_import_job', 'register_import_file', 'resume_import_job',
+    'run_import_job', 'run_partitioned_job',
+]
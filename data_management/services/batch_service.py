@@ -0,0 +1,132 @@
+# data_management/services/batch_service.py
+
+import logging
+import os
+import zipfile
+
+from django.db.models import Sum
+
+from data_management.models import ImportBatch, ImportJob
+from .import_service import get_import_config
+from .job_service import create_import_job, enqueue_import_job
+
+logger = logging.getLogger(__name__)
+
+BATCH_EXTENSIONS = ('.csv', '.xlsx')  # importable files, on their own or inside a zip
+DEFAULT_MAX_BATCH_FILES = 100
+ZIP_READ_SIZE = 1024 * 1024
+
+
+class _ZipMember:
+    """One file inside an uploaded zip, readable in chunks like an UploadedFile"""
+
+    def __init__(self, archive, info):
+        self.archive = archive
+        self.info = info
+        self.name = os.path.basename(info.filename)
+
+    def chunks(self):
+        with self.archive.open(self.info) as member:
+            for block in iter(lambda: member.read(ZIP_READ_SIZE), b''):
+                yield block
+
+
+def _zip_members(archive):
+    """Importable members of ``archive`` in name order (daily exports sort by date)"""
+    members = []
+    for info in archive.infolist():
+        name = os.path.basename(info.filename)
+        if (info.is_dir() or info.filename.startswith('__MACOSX/') or name.startswith('.')
+                or os.path.splitext(name)[1].lower() not in BATCH_EXTENSIONS):
+            continue
+        members.append(_ZipMember(archive, info))
+    return sorted(members, key=lambda member: member.info.filename)
+
+
+def create_import_batch(db_alias, tenant_id, uploaded_files, file_type, duplicate_mode=ImportJob.DuplicateMode.ERROR,
+                        reimport=False):
+    """
+    Save a multi-file upload as an ImportBatch with one queued ImportJob
+    per CSV/XLSX file. Zip archives are unpacked member by member (each
+    streamed straight to disk). Raises ValueError for an unusable upload.
+    """
+    max_files = get_import_config().get('MAX_BATCH_FILES', DEFAULT_MAX_BATCH_FILES)
+    batch = ImportBatch.objects.using(db_alias).create(
+        tenant_id=tenant_id or 'default',
+        name=', '.join(uploaded_file.name for uploaded_file in uploaded_files)[:255],
+        file_type=file_type,
+    )
+
+    def add_job(uploaded_file):
+        if batch.jobs.using(db_alias).count() >= max_files:
+            raise ValueError(f"A batch can hold at most {max_files} files")
+        create_import_job(
+            db_alias, tenant_id, uploaded_file, file_type, duplicate_mode, reimport=reimport, batch=batch
+        )
+
+    try:
+        for uploaded_file in uploaded_files:
+            extension = os.path.splitext(uploaded_file.name)[1].lower()
+            if extension == '.zip':
+                try:
+                    with zipfile.ZipFile(uploaded_file) as archive:
+                        for member in _zip_members(archive):
+                            add_job(member)
+                except zipfile.BadZipFile:
+                    raise ValueError(f"{uploaded_file.name} is not a valid zip archive")
+            elif extension in BATCH_EXTENSIONS:
+                add_job(uploaded_file)
+            else:
+                raise ValueError(f"{uploaded_file.name}: only .csv, .xlsx and .zip files can be uploaded")
+
+        if not batch.jobs.using(db_alias).exists():
+            raise ValueError('The upload contains no .csv or .xlsx files')
+    except Exception:
+        _discard_batch(batch, db_alias)
+        raise
+
+    logger.info(f"Import batch {batch.pk}: {batch.jobs.using(db_alias).count()} {file_type} files from {batch.name}")
+    return batch
+
+
+def _discard_batch(batch, db_alias):
+    """Remove a half-created batch: its saved files, jobs and the batch itself"""
+    for job in batch.jobs.using(db_alias).filter(status=ImportJob.Status.QUEUED):
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
+    batch.jobs.using(db_alias).all().delete()
+    batch.delete(using=db_alias)
+
+
+def enqueue_import_batch(batch, db_alias, run_async=None):
+    """
+    Queue every file of the batch as its own Celery task, so the files
+    are imported in parallel across the available workers (inline one
+    after another when RUN_ASYNC is off).
+    """
+    for job in batch.jobs.using(db_alias).order_by('pk'):
+        enqueue_import_job(job, db_alias, run_async=run_async)
+
+
+def summarize_import_batch(batch, db_alias):
+    """Per-file results and batch totals for the batch summary page"""
+    jobs = list(batch.jobs.using(db_alias).select_related('error_log').order_by('pk'))
+    totals = batch.jobs.using(db_alias).aggregate(
+        rows_processed=Sum('rows_processed'),
+        rows_failed=Sum('rows_failed'),
+        rows_updated=Sum('rows_updated'),
+        rows_skipped=Sum('rows_skipped'),
+    )
+    totals = {key: value or 0 for key, value in totals.items()}
+    totals['rows_succeeded'] = totals['rows_processed'] - totals['rows_failed'] - totals['rows_skipped']
+    totals['rows_inserted'] = totals['rows_succeeded'] - totals['rows_updated']
+
+    statuses = [job.status for job in jobs]
+    return {
+        'jobs': jobs,
+        'totals': totals,
+        'file_count': len(jobs),
+        'completed_count': statuses.count(ImportJob.Status.COMPLETED),
+        'failed_count': statuses.count(ImportJob.Status.FAILED),
+        'is_finished': all(job.is_finished for job in jobs),
+    }
@@ -0,0 +1,138 @@
+# data_management/services/chunked_upload.py
+
+import logging
+import os
+
+from django.db import transaction
+from django.utils import timezone
+
+from data_management.models import ChunkedUpload, ImportJob
+from .import_service import get_import_config
+from .job_service import register_import_file, upload_path
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_EXTENSIONS = ('.csv', '.xlsx')
+DEFAULT_UPLOAD_PART_SIZE = 8 * 1024 * 1024  # bytes per part sent by the browser
+PART_SUFFIX = '.part'  # the file keeps it until every part has arrived
+WRITE_BLOCK_SIZE = 1024 * 1024
+
+
+def start_chunked_upload(db_alias, tenant_id, file_name, file_size, file_type,
+                         duplicate_mode=ImportJob.DuplicateMode.ERROR, partitions=1, staging=False, reimport=False):
+    """
+    Open a ChunkedUpload and reserve its file on disk. Raises ValueError
+    for a file that cannot be imported. Abandoned uploads of the tenant
+    are cleaned up on the way.
+    """
+    if os.path.splitext(file_name)[1].lower() not in UPLOAD_EXTENSIONS:
+        raise ValueError('Please upload a file with .csv or .xlsx extension.')
+    if file_size <= 0:
+        raise ValueError('Uploaded file is empty')
+
+    discard_expired_uploads(db_alias, tenant_id)
+
+    file_path = f"{upload_path(tenant_id, file_name)}{PART_SUFFIX}"
+    with open(file_path, 'wb') as f:
+        f.truncate(file_size)  # sparse; parts fill it in at their offsets
+
+    upload = ChunkedUpload.objects.using(db_alias).create(
+        tenant_id=tenant_id or 'default',
+        file_name=file_name,
+        file_path=file_path,
+        file_type=file_type,
+        file_size=file_size,
+        chunk_size=get_import_config().get('UPLOAD_PART_SIZE', DEFAULT_UPLOAD_PART_SIZE),
+        duplicate_mode=duplicate_mode,
+        partitions=partitions,
+        staging=staging,
+        reimport=reimport,
+    )
+    logger.info(f"Chunked upload {upload.upload_id}: {file_name} ({file_size} bytes in {upload.part_count} parts)")
+    return upload
+
+
+def write_part(upload, db_alias, number, stream):
+    """
+    Write part ``number`` (0-based) read from ``stream`` at its offset and
+    record it as received. Parts may arrive in any order, in parallel,
+    and more than once (a retry simply overwrites the same bytes).
+    Raises ValueError for an unknown part or one of the wrong length.
+    """
+    if upload.import_job_id:
+        raise ValueError('This upload is already complete')
+    if not 0 <= number < upload.part_count:
+        raise ValueError(f"Part {number} is out of range; this upload has parts 0 to {upload.part_count - 1}")
+
+    expected = upload.part_size(number)
+    written = 0
+    with open(upload.file_path, 'r+b') as f:
+        f.seek(number * upload.chunk_size)
+        while written <= expected:
+            block = stream.read(min(WRITE_BLOCK_SIZE, expected + 1 - written))
+            if not block:
+                break
+            f.write(block[:expected - written])
+            written += len(block)
+    if written != expected:
+        # Truncated by a dropped connection (or too long): not recorded,
+        # so the client sends the part again
+        raise ValueError(f"Part {number} should be {expected} bytes, received {written}")
+
+    with transaction.atomic(using=db_alias):
+        upload = ChunkedUpload.objects.using(db_alias).select_for_update().get(pk=upload.pk)
+        if number not in upload.received_parts:
+            upload.received_parts = sorted(upload.received_parts + [number])
+            upload.save(using=db_alias, update_fields=['received_parts', 'updated_at'])
+    return upload
+
+
+def finish_chunked_upload(upload, db_alias):
+    """
+    Turn a fully received upload into a queued ImportJob (the caller
+    enqueues it). Calling it again returns the same job, so a client
+    whose first request timed out can simply retry. Raises ValueError
+    while parts are still missing.
+    """
+    with transaction.atomic(using=db_alias):
+        upload = ChunkedUpload.objects.using(db_alias).select_for_update().get(pk=upload.pk)
+        if upload.import_job_id:
+            return ImportJob.objects.using(db_alias).get(pk=upload.import_job_id)
+        if not upload.is_complete:
+            raise ValueError(f"{len(upload.missing_parts)} of {upload.part_count} parts are still missing")
+
+        file_path = upload.file_path[:-len(PART_SUFFIX)]
+        os.replace(upload.file_path, file_path)
+        job = register_import_file(
+            db_alias, upload.tenant_id, file_path, upload.file_type, upload.duplicate_mode,
+            partitions=upload.partitions, reimport=upload.reimport, staging=upload.staging,
+            file_name=upload.file_name
+        )
+        if job.file_path != file_path:
+            os.remove(file_path)  # identical to an earlier upload; the job points at that copy
+
+        upload.file_path = file_path
+        upload.import_job = job
+        upload.save(using=db_alias, update_fields=['file_path', 'import_job', 'updated_at'])
+
+    logger.info(f"Chunked upload {upload.upload_id} complete: import job {job.pk}")
+    return job
+
+
+def discard_expired_uploads(db_alias, tenant_id=None):
+    """Delete unfinished uploads that received nothing for EXPIRE_AFTER, and their files"""
+    expired = ChunkedUpload.objects.using(db_alias).filter(
+        import_job__isnull=True, updated_at__lt=timezone.now() - ChunkedUpload.EXPIRE_AFTER
+    )
+    if tenant_id:
+        expired = expired.filter(tenant_id=tenant_id)
+
+    count = 0
+    for upload in expired:
+        if os.path.exists(upload.file_path):
+            os.remove(upload.file_path)
+        upload.delete(using=db_alias)
+        count += 1
+    if count:
+        logger.info(f"Discarded {count} abandoned chunked uploads in {db_alias}")
+    return count
@@ -0,0 +1,118 @@
+# data_management/services/compact.py
+
+import logging
+
+from django.db import router
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When, Window
+from django.db.models.functions import Rank
+
+from data_management.models import Member, Transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50000  # transaction ids per backfill statement
+
+
+def event_codes(events):
+    """Transaction.event_code values of ``events`` (event names)"""
+    return [Transaction.EVENT_CODES[event] for event in events]
+
+
+def uncompacted_transactions(using):
+    """Transactions still missing their member link or event code"""
+    return Transaction.objects.using(using).filter(Q(member__isnull=True) | Q(event_code__isnull=True))
+
+
+def compact_ready(using=None):
+    """
+    True when every transaction of the tenant DB (the current tenant's by
+    default) carries its member id and event code, so reports can group
+    and filter on those instead of username and event. One probe of the
+    partial transaction_uncompacted_idx index.
+    """
+    using = using or router.db_for_read(Transaction)
+    return not uncompacted_transactions(using).exists()
+
+
+def usernames_by_member(member_ids, using=None):
+    """{member id: username} for ``member_ids`` (one query)"""
+    using = using or router.db_for_read(Member)
+    return dict(Member.objects.using(using).filter(pk__in=member_ids).values_list('pk', 'username'))
+
+
+def link_members(db_alias, usernames=None, id_range=None):
+    """
+    Point unlinked transactions at the Member with their username, e.g.
+    after the member import caught up with a transaction import. Limited to
+    ``usernames`` and/or an (first id, last id) ``id_range`` when given.
+    Returns the number of transactions linked.
+    """
+    transactions = Transaction.objects.using(db_alias).filter(member__isnull=True)
+    if usernames is not None:
+        transactions = transactions.filter(username__in=usernames)
+    if id_range is not None:
+        transactions = transactions.filter(pk__range=id_range)
+    member_id = Member.objects.using(db_alias).filter(username=OuterRef('username')).values('pk')[:1]
+    # Only rows whose member exists, so a missing one is not rewritten as NULL
+    return transactions.filter(username__in=Member.objects.using(db_alias).values('username')).update(
+        member_id=Subquery(member_id)
+    )
+
+
+def fill_event_codes(db_alias, id_range=None):
+    """Set event_code from event where it is missing; returns the number of transactions updated"""
+    transactions = Transaction.objects.using(db_alias).filter(event_code__isnull=True)
+    if id_range is not None:
+        transactions = transactions.filter(pk__range=id_range)
+    return transactions.update(event_code=Case(
+        *[When(event=event, then=Value(code)) for event, code in Transaction.EVENT_CODES.items()]
+    ))
+
+
+def compact_transactions(db_alias, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Backfill member and event_code on every transaction of ``db_alias`` in
+    id ranges of ``batch_size``, each its own short statement, so a large
+    table is never locked or rewritten in one go. Returns (linked, coded).
+    """
+    pending = uncompacted_transactions(db_alias).order_by('pk').values_list('pk', flat=True)
+    linked = coded = 0
+    start = pending.first()
+    while start is not None:
+        end = start + batch_size - 1
+        linked += link_members(db_alias, id_range=(start, end))
+        coded += fill_event_codes(db_alias, id_range=(start, end))
+        # Rows left behind (no member yet) are skipped over, not retried
+        start = pending.filter(pk__gt=end).first()
+    logger.info(f"Compacted transactions on {db_alias}: {linked} linked to members, {coded} event codes")
+    return linked, coded
+
+
+def event_filter(events, compact):
+    """Q matching transactions with one of ``events``: on event_code when ``compact``, else on event"""
+    return Q(event_code__in=event_codes(events)) if compact else Q(event__in=events)
+
+
+def top_users(transactions, top_n, compact):
+    """
+    The ``top_n`` users with the largest total amount in ``transactions``
+    as [(user key, username)], largest first and ties broken by username.
+    The key is the member id when ``compact``, else the username; either
+    way the same users come back in the same order.
+    """
+    user_field = 'member' if compact else 'username'
+    totals = transactions.values(user_field).annotate(total=Sum('amount'))
+    if compact:
+        # Member ids do not sort like usernames: take every user tied at the
+        # cut-off (equal totals share a rank) and choose among them by
+        # username below
+        top = list(totals.annotate(rank=Window(Rank(), order_by=F('total').desc())).filter(
+            rank__lte=top_n
+        ).values_list(user_field, 'total'))
+    else:
+        top = list(totals.order_by('-total', user_field)[:top_n].values_list(user_field, 'total'))
+
+    keys = [key for key, _ in top]
+    usernames = usernames_by_member(keys, transactions.db) if compact else {key: key for key in keys}
+    top.sort(key=lambda row: (-row[1], usernames[row[0]]))
+    return [(key, usernames[key]) for key, _ in top[:top_n]]
@@ -0,0 +1,118 @@
+# data_management/services/drop_directory.py
+
+import fcntl
+import logging
+import os
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from data_management.models import ImportJob
+from .import_service import get_import_config
+from .job_service import ERROR_FILE_SUFFIX, register_import_file, run_import_job
+
+logger = logging.getLogger(__name__)
+
+DROP_FILE_TYPES = ('member', 'transaction')  # one sub-directory per file type
+DROP_EXTENSIONS = ('.csv', '.xlsx')
+DEFAULT_SETTLE_SECONDS = 60  # files modified more recently may still be being written
+
+
+def drop_directory(tenant_id):
+    """
+    MEDIA_ROOT/drop/<tenant>/: the upstream system writes exports to its
+    member/ and transaction/ sub-directories. processing/, archive/ and
+    failed/ next to them are managed by ``ingest_drop_directory``.
+    """
+    tenant_id_clean = re.sub(r'[^\w\.-]', '', tenant_id or 'default')
+    return os.path.join(settings.MEDIA_ROOT, 'drop', tenant_id_clean)
+
+
+def pending_drop_files(tenant_id, settle_seconds=None):
+    """
+    (file_type, path) of files waiting in the tenant's drop directory, in
+    arrival order (modification time, then name). Hidden and partial
+    files, and files changed within ``settle_seconds``, are left alone.
+    """
+    if settle_seconds is None:
+        settle_seconds = get_import_config().get('DROP_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS)
+    cutoff = time.time() - settle_seconds
+    base = drop_directory(tenant_id)
+
+    pending = []
+    for file_type in DROP_FILE_TYPES:
+        directory = os.path.join(base, file_type)
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if (not entry.is_file() or entry.name.startswith('.')
+                    or os.path.splitext(entry.name)[1].lower() not in DROP_EXTENSIONS):
+                continue
+            modified = entry.stat().st_mtime
+            if modified <= cutoff:
+                pending.append((modified, entry.name, file_type, entry.path))
+    return [(file_type, path) for _, _, file_type, path in sorted(pending)]
+
+
+def _move(path, directory, name=None):
+    """Move ``path`` into ``directory`` (as ``name``); returns the new path"""
+    os.makedirs(directory, exist_ok=True)
+    target = os.path.join(directory, name or os.path.basename(path))
+    os.replace(path, target)
+    return target
+
+
+def ingest_drop_directory(tenant, duplicate_mode=None, settle_seconds=None):
+    """
+    Import every settled file in the tenant's drop directory, one at a
+    time in arrival order, through the regular import pipeline (ImportJob,
+    checkpoints, ErrorLog, upload registry). Each file is first claimed
+    by moving it to processing/, then moved to archive/<date>/ when its
+    job completes or to failed/ when it fails; the job's file_path follows
+    it so a failed job can still be resumed.
+
+    Returns the jobs run. A scan that is still running for the tenant
+    (e.g. a slow file while the next beat fires) is not overlapped.
+    """
+    duplicate_mode = duplicate_mode or get_import_config().get('DROP_DUPLICATE_MODE', ImportJob.DuplicateMode.SKIP)
+    base = drop_directory(tenant.tenant_id)
+    if not os.path.isdir(base):
+        return []
+
+    jobs = []
+    with open(os.path.join(base, '.lock'), 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info(f"Drop directory of {tenant.tenant_id} is already being ingested; skipping")
+            return []
+
+        for file_type, path in pending_drop_files(tenant.tenant_id, settle_seconds):
+            # Unique name, so a later export with the same name never
+            # overwrites this one in processing/ or archive/
+            claimed = _move(path, os.path.join(base, 'processing'),
+                            f"{timezone.now().strftime('%H%M%S')}_{uuid.uuid4().hex[:8]}_{os.path.basename(path)}")
+            logger.info(f"Drop directory {tenant.tenant_id}: importing {file_type} file {os.path.basename(path)}")
+
+            job = register_import_file(
+                tenant.db_alias, tenant.tenant_id, claimed, file_type, duplicate_mode=duplicate_mode
+            )
+            if job.status == ImportJob.Status.QUEUED:
+                job = run_import_job(job.pk, tenant.db_alias)
+
+            if job.status == ImportJob.Status.COMPLETED:
+                destination = os.path.join(base, 'archive', timezone.now().strftime('%Y-%m-%d'))
+            else:
+                destination = os.path.join(base, 'failed')
+            moved = _move(claimed, destination)
+            if os.path.exists(f"{claimed}{ERROR_FILE_SUFFIX}"):
+                # A failed job's streamed errors; a resume continues them
+                os.replace(f"{claimed}{ERROR_FILE_SUFFIX}", f"{moved}{ERROR_FILE_SUFFIX}")
+            if job.file_path == claimed:
+                ImportJob.objects.using(tenant.db_alias).filter(pk=job.pk).update(file_path=moved)
+                job.file_path = moved
+            jobs.append(job)
+    return jobs
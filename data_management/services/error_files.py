@@ -0,0 +1,106 @@
+# data_management/services/error_files.py
+
+import csv
+import gzip
+import os
+
+ERROR_LOG_HEADER = ['Row', 'Error', 'Row Data']
+
+
+def open_error_log(file_path):
+    """
+    Open an error log for reading as text. New logs are gzip-compressed
+    CSV (.csv.gz); logs written before that are plain CSV.
+    """
+    if file_path.endswith('.gz'):
+        return gzip.open(file_path, 'rt', newline='', encoding='utf-8')
+    return open(file_path, 'r', newline='', encoding='utf-8')
+
+
+def iter_error_log_bytes(file_path, block_size=64 * 1024):
+    """Yield the decompressed CSV in blocks, for streaming responses"""
+    opener = gzip.open if file_path.endswith('.gz') else open
+    with opener(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            yield block
+
+
+class ErrorFile:
+    """
+    Append-only, gzip-compressed CSV of failed rows (Row, Error, Row Data).
+
+    Every ``write`` appends a complete gzip member, so whatever has been
+    written survives a crash and the file stays readable with gzip.open.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def write(self, errors):
+        """Append ``errors`` ({'row', 'error', 'data'} dicts) to the file"""
+        if not errors:
+            return
+        new_file = not os.path.exists(self.file_path)
+        with gzip.open(self.file_path, 'at', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(ERROR_LOG_HEADER)
+            for error in errors:
+                writer.writerow([error['row'], error['error'], str(error['data'])])
+
+    def truncate(self, last_row):
+        """
+        Drop entries after ``last_row``, i.e. errors from a batch whose
+        transaction rolled back. Returns the number of entries kept.
+        """
+        if not os.path.exists(self.file_path):
+            return 0
+        kept = 0
+        tmp_path = f"{self.file_path}.tmp"
+        try:
+            with open_error_log(self.file_path) as source, \
+                    gzip.open(tmp_path, 'wt', newline='', encoding='utf-8') as target:
+                reader = csv.reader(source)
+                writer = csv.writer(target)
+                writer.writerow(next(reader, ERROR_LOG_HEADER))
+                for entry in reader:
+                    if int(entry[0]) <= last_row:
+                        writer.writerow(entry)
+                        kept += 1
+        except EOFError:
+            # A member cut short by a crash; everything before it is kept
+            pass
+        os.replace(tmp_path, self.file_path)
+        return kept
+
+
+class ErrorLogRows:
+    """
+    Read-only sequence over the entries of an error log file, sized from
+    the ErrorLog record so it can be handed to a Paginator. Slicing reads
+    forward through the file and only keeps the requested page.
+    """
+
+    def __init__(self, file_path, count):
+        self.file_path = file_path
+        self.total = count
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('ErrorLogRows only supports slicing')
+        start, stop, _ = index.indices(self.total)
+        rows = []
+        if start >= stop or not os.path.exists(self.file_path):
+            return rows
+        with open_error_log(self.file_path) as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            for position, entry in enumerate(reader):
+                if position >= stop:
+                    break
+                if position >= start:
+                    rows.append({'row': entry[0], 'error': entry[1], 'data': entry[2]})
+        return rows
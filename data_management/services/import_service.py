@@ -0,0 +1,809 @@
+# data_management/services/import_service.py
+
+import logging
+import os
+import re
+from datetime import date
+from decimal import Decimal
+from functools import cached_property
+
+import pandas as pd
+import pytz
+from pandas.tseries.api import guess_datetime_format
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+
+from data_management.models import Member, Transaction, ErrorLog
+from .compact import link_members
+from .error_files import ErrorFile
+from .partitions import is_partitioned, lock_transaction_keys
+from .phones import normalize_phone, tenant_phone_countries
+from .member_stats import member_stats_ready, refresh_member_stats
+from .rollups import local_day, refresh_daily_rollups, rollups_ready
+
+logger = logging.getLogger(__name__)
+
+# Hardcoded standard event types
+STANDARD_EVENTS = ['Deposit', 'Manual Deposit', 'Withdraw', 'Manual Withdraw']
+EVENT_LOOKUP = {event.lower(): event for event in STANDARD_EVENTS}
+
+MEMBER_REQUIRED_FIELDS = ['Username', 'Name', 'Handphone', 'Join Date']
+TRANSACTION_REQUIRED_FIELDS = ['USERNAME', 'EVENT', 'AMOUNT', 'CREATE DATE', 'PROCESS DATE', 'PROCESS BY']
+
+DEFAULT_BATCH_SIZE = 5000
+AMOUNT_QUANTUM = Decimal('0.01')
+
+# How rows that already exist in the tenant DB are handled
+DUPLICATE_ERROR = 'error'    # report each one as a row error (original behaviour)
+DUPLICATE_SKIP = 'skip'      # ON CONFLICT DO NOTHING
+DUPLICATE_UPDATE = 'update'  # ON CONFLICT DO UPDATE
+DUPLICATE_MODES = [DUPLICATE_ERROR, DUPLICATE_SKIP, DUPLICATE_UPDATE]
+
+# Natural keys (matching the model unique constraints) and the columns an
+# upsert overwrites
+UNIQUE_FIELDS = {
+    'member': ['username'],
+    'transaction': ['username', 'event', 'create_date', 'amount'],
+}
+UPDATE_FIELDS = {
+    'member': ['name', 'referral', 'handphone', 'phone_e164', 'join_date', 'email'],
+    'transaction': ['process_date', 'process_by', 'member', 'event_code'],
+}
+# The date that places a row in the daily rollups (see services.rollups)
+ROLLUP_DATE_FIELDS = {'member': 'join_date', 'transaction': 'process_date'}
+
+
+def get_import_config():
+    """Return the DATA_IMPORT_CONFIG settings dict (empty if not configured)"""
+    return getattr(settings, 'DATA_IMPORT_CONFIG', {})
+
+
+def json_safe(value):
+    """
+    Convert a row dict / error dict into something JSONField and the JSON
+    session serializer accept: NaN becomes None, numpy scalars become
+    Python scalars.
+    """
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def store_error_log(db_alias, tenant_id, upload_time, file_type, source_path, error_count, success_count):
+    """
+    Create an ErrorLog for an upload. ``source_path`` (a finished .csv.gz
+    error file) is moved to MEDIA_ROOT/error_logs/<tenant>/; with None the
+    caller writes the file at the returned record's ``file_path``.
+    """
+    tenant_id = tenant_id or 'default'
+    tenant_id_clean = re.sub(r'[^\w\.-]', '', tenant_id)
+
+    timestamp = upload_time.strftime('%Y%m%d_%H%M%S')
+    file_name = f"{timestamp}_{file_type}_{error_count}error{success_count}success_log.csv.gz"
+    tenant_dir = os.path.join(settings.MEDIA_ROOT, 'error_logs', tenant_id_clean)
+    os.makedirs(tenant_dir, exist_ok=True)
+    file_path = os.path.join(tenant_dir, file_name)
+
+    if source_path:
+        os.replace(source_path, file_path)
+
+    return ErrorLog.objects.using(db_alias).create(
+        tenant_id=tenant_id,
+        file_name=file_name,
+        file_path=file_path,
+        upload_time=upload_time,
+        file_type=file_type,
+        error_count=error_count,
+        success_count=success_count
+    )
+
+
+class BulkImporter:
+    """
+    Validates uploaded member/transaction rows in memory and writes them
+    to the tenant database in batches with bulk_create.
+
+    Rows that fail validation, or that the database rejects, are collected
+    in ``errors`` with the same shape the upload view has always produced:
+    {'row': <csv line number>, 'error': <message>, 'data': <row dict>}
+
+    With an ``error_path`` the errors only stay in memory until their rows
+    are checkpointed; they are then appended to a compressed error file
+    and just the count and first/last error are kept.
+    """
+
+    def __init__(self, db_alias, file_type, batch_size=None, on_checkpoint=None, duplicate_mode=DUPLICATE_ERROR,
+                 error_path=None, defer_refresh=False):
+        """
+        Args:
+            db_alias: Tenant database alias (e.g., 'crm_db_pukul_com')
+            file_type: 'member' or 'transaction'
+            batch_size: Rows per bulk_create call (defaults to DATA_IMPORT_CONFIG['BATCH_SIZE'])
+            on_checkpoint: Optional callable(importer, last_row) invoked inside each
+                batch's transaction once every row up to ``last_row`` is either
+                written or recorded as an error; used by background jobs to
+                persist progress and resume points atomically with the data
+            duplicate_mode: 'error', 'skip' or 'update' for rows whose natural
+                key already exists (see DUPLICATE_MODES)
+            error_path: Optional path of a gzip-compressed CSV that errors are
+                streamed to at each checkpoint (see ErrorFile)
+            defer_refresh: Leave the daily rollup and member stats refresh to
+                the caller (partitions of a parallel import, which refresh once
+                for the whole job); the pending days and users stay in
+                ``rollup_days`` and ``stats_usernames``
+        """
+        if file_type not in ('member', 'transaction'):
+            raise ValueError(f"Unsupported file type: {file_type}")
+        if duplicate_mode not in DUPLICATE_MODES:
+            raise ValueError(f"Unsupported duplicate mode: {duplicate_mode}")
+
+        self.db_alias = db_alias
+        self.file_type = file_type
+        self.batch_size = batch_size or get_import_config().get('BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.model = Member if file_type == 'member' else Transaction
+        self.required_fields = MEMBER_REQUIRED_FIELDS if file_type == 'member' else TRANSACTION_REQUIRED_FIELDS
+
+        self.duplicate_mode = duplicate_mode
+
+        self.errors = []  # not yet written to the error file
+        self.error_file = ErrorFile(error_path) if error_path else None
+        self.written_error_count = 0
+        self.first_error = None
+        self.last_error = None
+        self.success_count = 0  # inserted + updated
+        self.inserted_count = 0
+        self.updated_count = 0
+        self.skipped_count = 0
+        self.first_record = None
+        self.last_record = None
+
+        self.on_checkpoint = on_checkpoint
+        self.defer_refresh = defer_refresh
+        self.checkpoint_row = 0  # every row up to here is committed or in errors
+        self.last_row_seen = 0
+        self.rollup_days = set()  # days whose daily rollups the written rows change
+        self.stats_usernames = set()  # users whose member stats the written transactions change
+
+        # Pending (row_number, row_dict, model_instance) tuples waiting for a flush
+        self._pending = []
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def resume_from(self, state):
+        """
+        Restore counters saved by a checkpoint (see ``checkpoint_state``);
+        rows up to ``state['row']`` are then skipped by ``process_dataframe``.
+        The error file is cut back to the checkpoint, dropping errors from
+        a batch that never committed.
+        """
+        self.checkpoint_row = self.last_row_seen = state.get('row', 0)
+        self.inserted_count = state.get('inserted', 0)
+        self.updated_count = state.get('updated', 0)
+        self.skipped_count = state.get('skipped', 0)
+        self.success_count = self.inserted_count + self.updated_count
+        self.first_record = state.get('first_record')
+        self.last_record = state.get('last_record')
+        self.first_error = state.get('first_error')
+        self.last_error = state.get('last_error')
+        self.rollup_days = {date.fromisoformat(day) for day in state.get('rollup_days', [])}
+        self.stats_usernames = set(state.get('stats_usernames', []))
+        self.errors = []
+        if self.error_file:
+            self.written_error_count = self.error_file.truncate(self.checkpoint_row)
+
+    def checkpoint_state(self):
+        """JSON-safe counters describing progress up to ``checkpoint_row``"""
+        return {
+            'row': self.checkpoint_row,
+            'inserted': self.inserted_count,
+            'updated': self.updated_count,
+            'skipped': self.skipped_count,
+            'failed': self.written_error_count + len([error for error in self.errors
+                                                      if error['row'] <= self.checkpoint_row]),
+            'first_record': json_safe(self.first_record),
+            'last_record': json_safe(self.last_record),
+            'first_error': json_safe(self.first_error),
+            'rollup_days': sorted(day.isoformat() for day in self.rollup_days),
+            'stats_usernames': sorted(self.stats_usernames),
+            'last_error': json_safe(self.last_error),
+        }
+
+    def process_dataframe(self, df):
+        """Validate every row of ``df`` and queue valid ones for insert"""
+        if self.checkpoint_row:
+            # Resuming: rows up to the checkpoint are already handled
+            df = df[df.index + 2 > self.checkpoint_row]
+        if df.empty:
+            return
+        self.last_row_seen = max(self.last_row_seen, int(df.index[-1]) + 2)
+
+        valid = self.validate_dataframe(df)
+        if self.file_type == 'member':
+            for _, _, member in valid:
+                member.phone_e164 = normalize_phone(member.handphone, self.phone_countries)
+
+        for item in valid:
+            self._pending.append(item)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def validate_dataframe(self, df, vectorized=True):
+        """
+        Validate ``df`` and return (row_number, row_dict, model_instance)
+        tuples for the valid rows. Invalid rows are appended to ``errors``.
+
+        The vectorized path checks whole columns at once and only sends the
+        rows it rejects through the per-row builders, so error messages stay
+        exactly the same as the row-by-row path (vectorized=False).
+        """
+        if not vectorized or df.empty:
+            return self._validate_rows(df)
+
+        if self.file_type == 'member':
+            parsed, ok = self._vectorize_members(df)
+        else:
+            parsed, ok = self._vectorize_transactions(df)
+
+        records = df.to_dict('records')
+        row_numbers = (df.index + 2).tolist()  # header is line 1
+        build = self._member_from_parsed if self.file_type == 'member' else self._transaction_from_parsed
+
+        valid = []
+        slow_positions = []
+        for position, is_ok in enumerate(ok.tolist()):
+            if is_ok:
+                valid.append((row_numbers[position], records[position], build(records[position], parsed, position)))
+            else:
+                slow_positions.append(position)
+
+        if slow_positions:
+            # Rows flagged by any mask get the original per-row treatment,
+            # which produces the error message (or accepts the odd row the
+            # inferred date format could not parse)
+            valid.extend(self._validate_rows(df.iloc[slow_positions]))
+            valid.sort(key=lambda item: item[0])
+
+        return valid
+
+    def flush(self):
+        """Write all pending rows to the tenant database"""
+        if not self._pending:
+            return
+
+        batch = self._pending
+        self._pending = []
+        # Evaluated (and cached) before the first write
+        self.maintain_rollups
+        self.maintain_member_stats
+
+        with transaction.atomic(using=self.db_alias):
+            try:
+                with transaction.atomic(using=self.db_alias):
+                    outcome = self._write_batch(batch)
+            except DatabaseError:
+                # At least one row was rejected (e.g. a duplicate in 'error' mode);
+                # fall back to row-by-row writes for this batch so each failure
+                # is reported against its own row
+                logger.info(
+                    f"Batch of {len(batch)} {self.file_type} rows hit a database error on {self.db_alias}, "
+                    f"retrying row by row"
+                )
+                outcome = self._write_rows_individually(batch)
+
+            if self.file_type == 'member' and outcome['inserted']:
+                # Transactions imported before their member was
+                link_members(self.db_alias, usernames=[str(member.username) for _, _, member in outcome['inserted']])
+            self._record_outcome(outcome)
+            self._checkpoint(batch[-1][0])
+
+    def finish(self):
+        """Flush any remaining rows; call once after the last dataframe"""
+        self.flush()
+        if self.last_row_seen > self.checkpoint_row:
+            # Trailing rows that all failed validation never reach a flush
+            with transaction.atomic(using=self.db_alias):
+                self._checkpoint(self.last_row_seen)
+        # Rows rejected by the database are reported after later validation
+        # failures, so restore file order for the summary and error log
+        self.errors.sort(key=lambda error: error['row'])
+        refresh_rollups = self.rollup_days and self.maintain_rollups
+        refresh_stats = self.stats_usernames and self.maintain_member_stats
+        if self.defer_refresh or not (refresh_rollups or refresh_stats):
+            return
+        # Once per import rather than per batch: a day spread over many
+        # batches is only re-aggregated once. The refresh commits with a
+        # checkpoint that clears the pending days and users; until then the
+        # last checkpoint lists them and resuming the job redoes the refresh
+        with transaction.atomic(using=self.db_alias):
+            if refresh_rollups:
+                refresh_daily_rollups(self.db_alias, self.rollup_days)
+            if refresh_stats:
+                refresh_member_stats(self.db_alias, self.stats_usernames)
+            self.rollup_days = set()
+            self.stats_usernames = set()
+            self._checkpoint(self.checkpoint_row)
+
+    @cached_property
+    def phone_countries(self):
+        """Countries member phone numbers are normalized with (looked up on first use)"""
+        return tenant_phone_countries(self.db_alias)
+
+    @cached_property
+    def maintain_rollups(self):
+        """
+        True when the tenant's daily rollups were built before this import
+        wrote anything (an import into an empty tenant builds them)
+        """
+        return rollups_ready(self.db_alias)
+
+    @cached_property
+    def maintain_member_stats(self):
+        """As ``maintain_rollups``, for the member activity stats (transaction imports only)"""
+        return self.file_type == 'transaction' and member_stats_ready(self.db_alias)
+
+    @cached_property
+    def check_keys(self):
+        """
+        True when the natural key must be checked here: a partitioned
+        transaction table only enforces it per process_date, so _write_batch
+        checks it under lock_transaction_keys()
+        """
+        return self.file_type == 'transaction' and is_partitioned(self.db_alias)
+
+    @property
+    def error_count(self):
+        return self.written_error_count + len(self.errors)
+
+    @property
+    def rows_processed(self):
+        return self.success_count + self.skipped_count + self.error_count
+
+    def add_error(self, row_number, message, row_data):
+        self.errors.append({
+            'row': row_number,
+            'error': message,
+            'data': row_data
+        })
+
+    def summary(self):
+        """JSON-safe result counts plus first/last record and error"""
+        return {
+            'record_count': self.success_count,
+            'error_count': self.error_count,
+            'duplicate_mode': self.duplicate_mode,
+            'inserted_count': self.inserted_count,
+            'updated_count': self.updated_count,
+            'skipped_count': self.skipped_count,
+            'first_record': json_safe(self.first_record),
+            'last_record': json_safe(self.last_record),
+            'first_error': json_safe(self.first_error or (self.errors[0] if self.errors else None)),
+            'last_error': json_safe(self.errors[-1] if self.errors else self.last_error),
+        }
+
+    def write_error_log(self, tenant_id, upload_time):
+        """
+        Store the errors as a gzip-compressed CSV under
+        MEDIA_ROOT/error_logs/<tenant>/ and create the matching ErrorLog
+        record, which is returned. A streamed error file is moved into
+        place rather than rewritten.
+        """
+        if self.error_file:
+            self._write_errors(self.error_file, self.errors)
+            self.errors = []
+            source_path = self.error_file.file_path
+            self.error_file = None
+        else:
+            source_path = None
+
+        error_log = store_error_log(
+            self.db_alias, tenant_id, upload_time, self.file_type,
+            source_path, self.error_count, self.success_count
+        )
+        if source_path is None:
+            ErrorFile(error_log.file_path).write(self.errors)
+        return error_log
+
+    # ------------------------------------------------------------------
+    # Row builders (raise ValueError with a user-facing message)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def build_member(row):
+        join_date_str = str(row['Join Date']).strip()
+        join_date = pd.to_datetime(join_date_str, dayfirst=True, errors='coerce')
+        if pd.isna(join_date):
+            raise ValueError(f"Invalid date format: {join_date_str}")
+
+        if join_date.hour == 0 and join_date.minute == 0 and join_date.second == 0:
+            raise ValueError(f"Missing time component: {join_date_str}")
+
+        if join_date.second == 0 and join_date.minute > 0:
+            join_date = join_date.replace(second=0)
+
+        join_date = timezone.make_aware(join_date, timezone.get_current_timezone()).astimezone(pytz.UTC)
+
+        return Member(
+            username=row['Username'],
+            name=row['Name'],
+            referral=row.get('Referral', ''),
+            handphone=row['Handphone'],
+            join_date=join_date,
+            email=row.get('Email', '')
+        )
+
+    @staticmethod
+    def build_transaction(row):
+        create_date = pd.to_datetime(str(row['CREATE DATE']).strip(), dayfirst=True, errors='coerce')
+        process_date = pd.to_datetime(str(row['PROCESS DATE']).strip(), dayfirst=True, errors='coerce')
+
+        if pd.isna(create_date):
+            raise ValueError(f"Invalid CREATE DATE: {row['CREATE DATE']}")
+        if pd.isna(process_date):
+            raise ValueError(f"Invalid PROCESS DATE: {row['PROCESS DATE']}")
+
+        if create_date.hour == 0 and create_date.minute == 0 and create_date.second == 0:
+            raise ValueError("Missing time in CREATE DATE")
+        if process_date.hour == 0 and process_date.minute == 0 and process_date.second == 0:
+            raise ValueError("Missing time in PROCESS DATE")
+
+        create_date = timezone.make_aware(create_date, timezone.get_current_timezone()).astimezone(pytz.UTC)
+        process_date = timezone.make_aware(process_date, timezone.get_current_timezone()).astimezone(pytz.UTC)
+
+        # Validate event
+        event = str(row['EVENT']).strip()
+        standardized_event = EVENT_LOOKUP.get(event.lower())
+        if standardized_event is None:
+            raise ValueError(f"Invalid event: {event}")
+
+        # Process amount
+        amount_str = str(row['AMOUNT']).strip('"')
+        cleaned_amount = re.sub(r'[^\d.]', '', amount_str)
+        if not cleaned_amount:
+            raise ValueError(f"Invalid amount: {amount_str}")
+
+        amount = Decimal(cleaned_amount)
+
+        return Transaction(
+            username=row['USERNAME'],
+            event=standardized_event,
+            event_code=Transaction.EVENT_CODES[standardized_event],
+            amount=amount,
+            create_date=create_date,
+            process_date=process_date,
+            process_by=row['PROCESS BY']
+        )
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _validate_rows(self, df):
+        """Row-by-row validation; the slow path for rows the masks reject"""
+        valid = []
+        for index, row in df.iterrows():
+            row_number = index + 2  # header is line 1
+            missing_field = self._find_missing_field(row)
+            if missing_field is not False:
+                self.add_error(
+                    row_number,
+                    f"Missing field: {missing_field}" if missing_field else 'Missing mandatory fields',
+                    row.to_dict()
+                )
+                continue
+
+            try:
+                if self.file_type == 'member':
+                    instance = self.build_member(row)
+                else:
+                    instance = self.build_transaction(row)
+            except Exception as e:
+                self.add_error(row_number, str(e), row.to_dict())
+                continue
+
+            valid.append((row_number, row.to_dict(), instance))
+        return valid
+
+    def _required_mask(self, df):
+        """Boolean Series: True where every required field has a value"""
+        ok = pd.Series(True, index=df.index)
+        for field in self.required_fields:
+            if field not in df.columns:
+                return pd.Series(False, index=df.index)
+            column = df[field]
+            ok &= column.notna() & (column.astype(str).str.strip() != '')
+        return ok
+
+    @staticmethod
+    def _parse_datetime_column(column):
+        """
+        Parse a date column in one pass and convert it to UTC.
+        Returns (utc_series, ok_mask); rows that fail to parse, have no time
+        component, or fall on a DST gap/overlap are marked not ok.
+        """
+        values = column.astype(str).str.strip()
+        # Infer the export's format from the first few values rather than
+        # only the first one, so a single bad leading row does not force
+        # element-by-element parsing for the whole column
+        date_format = next(
+            (fmt for fmt in (guess_datetime_format(v, dayfirst=True) for v in values.head(20)) if fmt),
+            'mixed'
+        )
+        parsed = pd.to_datetime(values, format=date_format, dayfirst=True, errors='coerce')
+        has_time = (parsed.dt.hour != 0) | (parsed.dt.minute != 0) | (parsed.dt.second != 0)
+        aware = parsed.dt.tz_localize(
+            timezone.get_current_timezone(), ambiguous='NaT', nonexistent='NaT'
+        ).dt.tz_convert(pytz.UTC)
+        return aware, aware.notna() & has_time
+
+    def _vectorize_members(self, df):
+        ok = self._required_mask(df)
+        parsed = {}
+        if not ok.any():
+            return parsed, ok
+
+        join_date, date_ok = self._parse_datetime_column(df['Join Date'])
+        ok &= date_ok
+        parsed['join_date'] = join_date.tolist()
+        return parsed, ok
+
+    def _vectorize_transactions(self, df):
+        ok = self._required_mask(df)
+        parsed = {}
+        if not ok.any():
+            return parsed, ok
+
+        create_date, create_ok = self._parse_datetime_column(df['CREATE DATE'])
+        process_date, process_ok = self._parse_datetime_column(df['PROCESS DATE'])
+
+        events = df['EVENT'].astype(str).str.strip().str.lower().map(EVENT_LOOKUP)
+
+        cleaned_amount = df['AMOUNT'].astype(str).str.strip('"').str.replace(r'[^\d.]', '', regex=True)
+        amount_ok = cleaned_amount.str.fullmatch(r'\d+(\.\d*)?|\.\d+').fillna(False).astype(bool)
+
+        ok &= create_ok & process_ok & events.notna() & amount_ok
+        parsed['create_date'] = create_date.tolist()
+        parsed['process_date'] = process_date.tolist()
+        parsed['event'] = events.tolist()
+        parsed['amount'] = cleaned_amount.tolist()
+        return parsed, ok
+
+    @staticmethod
+    def _member_from_parsed(record, parsed, position):
+        return Member(
+            username=record['Username'],
+            name=record['Name'],
+            referral=record.get('Referral', ''),
+            handphone=record['Handphone'],
+            join_date=parsed['join_date'][position],
+            email=record.get('Email', '')
+        )
+
+    @staticmethod
+    def _transaction_from_parsed(record, parsed, position):
+        return Transaction(
+            username=record['USERNAME'],
+            event=parsed['event'][position],
+            event_code=Transaction.EVENT_CODES[parsed['event'][position]],
+            amount=Decimal(parsed['amount'][position]),
+            create_date=parsed['create_date'][position],
+            process_date=parsed['process_date'][position],
+            process_by=record['PROCESS BY']
+        )
+
+    def _find_missing_field(self, row):
+        """
+        Return False when all required fields are present, otherwise the
+        first missing field name (or None if it cannot be pinpointed).
+        """
+        if all(row.get(field) is not None and not pd.isna(row[field]) and str(row[field]).strip() != ''
+               for field in self.required_fields):
+            return False
+        return next(
+            (field for field in self.required_fields
+             if not row.get(field) or pd.isna(row[field]) or str(row[field]).strip() == ''),
+            None
+        )
+
+    def _write_batch(self, batch):
+        """
+        Insert one batch according to ``duplicate_mode`` and return
+        {'inserted': [...], 'updated': [...], 'skipped': [...]} lists of the
+        batch items. Must run inside a transaction.
+        """
+        manager = self.model.objects.using(self.db_alias)
+        if self.file_type == 'transaction':
+            self._set_members(batch)
+        if self.check_keys:
+            # Held until the import's transaction commits, so no other writer
+            # can add one of these keys between the check and the insert
+            lock_transaction_keys(self.db_alias)
+
+        if self.duplicate_mode == DUPLICATE_ERROR:
+            if self.check_keys:
+                self._check_new_keys(batch)
+            manager.bulk_create([instance for _, _, instance in batch], batch_size=self.batch_size)
+            return {'inserted': batch, 'updated': [], 'skipped': []}
+
+        existing = self._existing_keys(batch)
+        if self.duplicate_mode == DUPLICATE_UPDATE and existing:
+            # Updated rows may leave the day they were on
+            date_field = ROLLUP_DATE_FIELDS[self.file_type]
+            previous = manager.filter(pk__in=existing.values()).values_list(date_field, flat=True)
+            self.rollup_days.update(local_day(value) for value in previous)
+
+        # Collapse repeats of the same key inside the batch; ON CONFLICT
+        # DO UPDATE cannot touch the same row twice in one statement
+        by_key = {}
+        skipped = []
+        for item in batch:
+            key = self._natural_key(item[2])
+            if key in by_key:
+                if self.duplicate_mode == DUPLICATE_UPDATE:
+                    skipped.append(by_key[key])  # the later row wins
+                    by_key[key] = item
+                else:
+                    skipped.append(item)
+            else:
+                by_key[key] = item
+
+        if self.duplicate_mode == DUPLICATE_SKIP:
+            to_write = [item for key, item in by_key.items() if key not in existing]
+            skipped.extend(item for key, item in by_key.items() if key in existing)
+            manager.bulk_create(
+                [instance for _, _, instance in to_write],
+                batch_size=self.batch_size,
+                ignore_conflicts=True
+            )
+            return {'inserted': to_write, 'updated': [], 'skipped': skipped}
+
+        if self.check_keys:
+            # No unique index to upsert against: insert the new keys and
+            # update the existing rows by id (moving them to another
+            # partition when process_date changes)
+            manager.bulk_create(
+                [instance for key, (_, _, instance) in by_key.items() if key not in existing],
+                batch_size=self.batch_size
+            )
+            updates = []
+            for key, (_, _, instance) in by_key.items():
+                if key in existing:
+                    instance.pk = existing[key]
+                    updates.append(instance)
+            manager.bulk_update(updates, UPDATE_FIELDS[self.file_type], batch_size=self.batch_size)
+        else:
+            manager.bulk_create(
+                [instance for _, _, instance in by_key.values()],
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=UNIQUE_FIELDS[self.file_type],
+                update_fields=UPDATE_FIELDS[self.file_type]
+            )
+        return {
+            'inserted': [item for key, item in by_key.items() if key not in existing],
+            'updated': [item for key, item in by_key.items() if key in existing],
+            'skipped': skipped,
+        }
+
+    def _set_members(self, batch):
+        """Link the batch's transactions to their members (one query); unknown usernames stay unlinked"""
+        usernames = {str(instance.username) for _, _, instance in batch}
+        member_ids = dict(
+            Member.objects.using(self.db_alias).filter(username__in=usernames).values_list('username', 'pk')
+        )
+        for _, _, instance in batch:
+            instance.member_id = member_ids.get(str(instance.username))
+
+    def _existing_keys(self, batch):
+        """
+        Natural keys from ``batch`` that are already in the tenant DB, mapped
+        to their row's primary key (one query). May include a few keys of
+        other rows that share a username and create_date with the batch.
+        """
+        manager = self.model.objects.using(self.db_alias)
+        usernames = {str(instance.username) for _, _, instance in batch}
+
+        if self.file_type == 'member':
+            rows = manager.filter(username__in=usernames).values_list('username', 'pk')
+            return {(username,): pk for username, pk in rows}
+
+        create_dates = {instance.create_date for _, _, instance in batch}
+        rows = manager.filter(
+            username__in=usernames,
+            create_date__in=create_dates
+        ).values_list('username', 'event', 'create_date', 'amount', 'pk')
+        return {self._transaction_key(*row[:4]): row[4] for row in rows}
+
+    def _check_new_keys(self, batch):
+        """
+        Raise IntegrityError, as the unique constraint would, when a key of
+        ``batch`` is already imported or repeated in the batch
+        """
+        keys = [self._natural_key(instance) for _, _, instance in batch]
+        if len(set(keys)) < len(keys):
+            raise IntegrityError('Duplicate transaction: repeated earlier in the file')
+        if set(keys) & self._existing_keys(batch).keys():
+            raise IntegrityError('Duplicate transaction: already imported')
+
+    def _natural_key(self, instance):
+        if self.file_type == 'member':
+            return (str(instance.username),)
+        return self._transaction_key(instance.username, instance.event, instance.create_date, instance.amount)
+
+    @staticmethod
+    def _transaction_key(username, event, create_date, amount):
+        # Compare datetimes in UTC and amounts at the column's 2 decimal places
+        # so values read back from the DB match freshly parsed ones
+        if timezone.is_naive(create_date):
+            create_date = timezone.make_aware(create_date, timezone.get_current_timezone())
+        return (
+            str(username),
+            event,
+            create_date.astimezone(pytz.UTC).replace(tzinfo=None),
+            Decimal(amount).quantize(AMOUNT_QUANTUM),
+        )
+
+    def _write_rows_individually(self, batch):
+        """Write ``batch`` one row per savepoint; returns the merged outcome"""
+        merged = {'inserted': [], 'updated': [], 'skipped': []}
+        for item in batch:
+            row_number, row_data, _ = item
+            try:
+                with transaction.atomic(using=self.db_alias):
+                    outcome = self._write_batch([item])
+            except Exception as e:
+                self.add_error(row_number, str(e), row_data)
+                continue
+            for key in merged:
+                merged[key].extend(outcome[key])
+        return merged
+
+    def _checkpoint(self, last_row):
+        self.checkpoint_row = last_row
+        if self.error_file:
+            # Everything up to the checkpoint is final; later rows may still
+            # be rejected by a batch that has not been flushed yet
+            done = [error for error in self.errors if error['row'] <= last_row]
+            self.errors = [error for error in self.errors if error['row'] > last_row]
+            self._write_errors(self.error_file, sorted(done, key=lambda error: error['row']))
+        if self.on_checkpoint:
+            self.on_checkpoint(self, last_row)
+
+    def _write_errors(self, error_file, errors):
+        if not errors:
+            return
+        error_file.write(errors)
+        self.written_error_count += len(errors)
+        if self.first_error is None:
+            self.first_error = errors[0]
+        self.last_error = errors[-1]
+
+    def _record_outcome(self, outcome):
+        date_field = ROLLUP_DATE_FIELDS[self.file_type]
+        self.rollup_days.update(
+            local_day(getattr(instance, date_field)) for _, _, instance in outcome['inserted'] + outcome['updated']
+        )
+        if self.file_type == 'transaction':
+            # The natural key includes the username, so an update never moves a row to another user
+            self.stats_usernames.update(
+                str(instance.username) for _, _, instance in outcome['inserted'] + outcome['updated']
+            )
+        self.inserted_count += len(outcome['inserted'])
+        self.updated_count += len(outcome['updated'])
+        self.skipped_count += len(outcome['skipped'])
+        for _, row_data, _ in sorted(outcome['inserted'] + outcome['updated'], key=lambda item: item[0]):
+            self._record_success(row_data)
+
+    def _record_success(self, row_data):
+        if self.first_record is None:
+            self.first_record = row_data
+        self.last_record = row_data
+        self.success_count += 1
@@ -0,0 +1,195 @@
+# data_management/services/ingest_service.py
+
+import datetime
+import hashlib
+import json
+import logging
+import secrets
+
+import pandas as pd
+from django.utils import timezone
+
+from data_management.models import IngestKey
+from .import_service import BulkImporter, get_import_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_RECORDS = 10000  # records accepted per request
+
+# JSON field names accepted by the API and the CSV columns they stand for.
+# The CSV header names themselves are accepted too.
+INGEST_FIELDS = {
+    'member': {
+        'username': 'Username',
+        'name': 'Name',
+        'referral': 'Referral',
+        'handphone': 'Handphone',
+        'join_date': 'Join Date',
+        'email': 'Email',
+    },
+    'transaction': {
+        'username': 'USERNAME',
+        'event': 'EVENT',
+        'amount': 'AMOUNT',
+        'create_date': 'CREATE DATE',
+        'process_date': 'PROCESS DATE',
+        'process_by': 'PROCESS BY',
+    },
+}
+DATE_FIELDS = {'Join Date', 'CREATE DATE', 'PROCESS DATE'}
+OPTIONAL_FIELDS = {'Referral', 'Email'}  # stored as '' when left out
+
+
+def _hash_key(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def create_ingest_key(db_alias, tenant_id, name):
+    """Create an IngestKey; returns (ingest_key, key). Only the hash is stored"""
+    key = secrets.token_urlsafe(32)
+    ingest_key = IngestKey.objects.using(db_alias).create(
+        tenant_id=tenant_id,
+        name=name,
+        key_prefix=key[:8],
+        key_hash=_hash_key(key),
+    )
+    return ingest_key, key
+
+
+def authenticate_ingest_key(db_alias, tenant_id, key):
+    """The active IngestKey of this tenant matching ``key``, or None"""
+    if not key:
+        return None
+    ingest_key = IngestKey.objects.using(db_alias).filter(
+        tenant_id=tenant_id, key_hash=_hash_key(key), is_active=True
+    ).first()
+    if ingest_key is not None:
+        IngestKey.objects.using(db_alias).filter(pk=ingest_key.pk).update(last_used_at=timezone.now())
+    return ingest_key
+
+
+def iter_ndjson(lines):
+    """
+    Parse newline-delimited JSON as it is read, yielding one record (or
+    the ValueError of an unparsable line) per non-blank line.
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"Invalid JSON: {e}")
+
+
+def parse_json_batch(body):
+    """Records of a JSON body: a list, or an object with a 'records' list"""
+    payload = json.loads(body)
+    if isinstance(payload, dict):
+        payload = payload.get('records')
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON array of records or an object with a 'records' array")
+    return payload
+
+
+def _field_text(column, value):
+    """
+    Spell a JSON value the way the CSV export would, so the importer's
+    string validation applies unchanged. ISO 8601 timestamps (with or
+    without an offset) become the export's day-first local time.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str) and column in DATE_FIELDS:
+        try:
+            moment = datetime.datetime.fromisoformat(value.strip())
+        except ValueError:
+            return value  # e.g. already DD-MM-YYYY HH:MM:SS
+        if timezone.is_aware(moment):
+            moment = timezone.make_naive(moment, timezone.get_current_timezone())
+        return moment.strftime('%d-%m-%Y %H:%M:%S')
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid value for {column}: {value}")
+    return str(value)
+
+
+def normalize_record(file_type, record):
+    """Map a JSON record onto the CSV columns; raises ValueError if it is not an object"""
+    if not isinstance(record, dict):
+        raise ValueError('Record must be a JSON object')
+    fields = INGEST_FIELDS[file_type]
+    row = {column: None for column in fields.values()}
+    for key, value in record.items():
+        column = fields.get(key, key if key in row else None)
+        if column is not None:
+            row[column] = _field_text(column, value)
+    for column in OPTIONAL_FIELDS & row.keys():
+        if row[column] is None:
+            row[column] = ''
+    return row
+
+
+class _OutcomeImporter(BulkImporter):
+    """BulkImporter that also remembers what happened to every row"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.outcomes = {}  # row number -> 'inserted' / 'updated' / 'skipped'
+
+    def _record_outcome(self, outcome):
+        super()._record_outcome(outcome)
+        for status, items in outcome.items():
+            for row_number, _, _ in items:
+                self.outcomes[row_number] = status
+
+
+def ingest_records(db_alias, file_type, records, duplicate_mode):
+    """
+    Validate and bulk-write a batch of API records with the upload rules.
+
+    ``records`` is an iterable of parsed JSON values (a ValueError item
+    marks a line that could not be parsed). Returns the acknowledgement:
+    counts plus one {'index', 'status', 'error'} entry per record, in
+    order, where status is inserted, updated, skipped or failed.
+    Raises ValueError if the batch holds more than INGEST_MAX_RECORDS.
+    """
+    max_records = get_import_config().get('INGEST_MAX_RECORDS', DEFAULT_MAX_RECORDS)
+    importer = _OutcomeImporter(db_alias, file_type, duplicate_mode=duplicate_mode)
+
+    rows, positions, results = [], [], []
+    for index, record in enumerate(records):
+        if index >= max_records:
+            raise ValueError(f"Too many records; send at most {max_records} per request")
+        results.append({'index': index, 'status': 'failed', 'error': None})
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            rows.append(normalize_record(file_type, record))
+            positions.append(index)
+        except ValueError as e:
+            results[index]['error'] = str(e)
+
+    if rows:
+        # The DataFrame index carries each record's position; the importer
+        # reports rows as index + 2 (the CSV header offset)
+        importer.process_dataframe(pd.DataFrame(rows, index=positions))
+        importer.finish()
+
+    errors = {error['row'] - 2: error['error'] for error in importer.errors}
+    for position in positions:
+        result = results[position]
+        if position in errors:
+            result['error'] = errors[position]
+        else:
+            result['status'] = importer.outcomes.get(position + 2, 'failed')
+
+    counts = {status: 0 for status in ('inserted', 'updated', 'skipped', 'failed')}
+    for result in results:
+        counts[result['status']] += 1
+    logger.info(
+        f"Ingested {len(results)} {file_type} records into {db_alias}: {counts['inserted']} inserted, "
+        f"{counts['updated']} updated, {counts['skipped']} skipped, {counts['failed']} failed"
+    )
+    return dict(received=len(results), results=results, **counts)
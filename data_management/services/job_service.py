@@ -0,0 +1,344 @@
+# data_management/services/job_service.py
+
+import hashlib
+import logging
+import os
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from data_management.models import ImportJob
+from .import_service import BulkImporter, get_import_config
+from .parallel_import import run_partitioned_job
+from .readers import iter_file_chunks
+from .staging_import import StagingImporter, staging_supported
+from .upload_registry import find_previous_upload, record_upload
+
+logger = logging.getLogger(__name__)
+
+ERROR_FILE_SUFFIX = '.errors.csv.gz'  # appended to the job's file_path
+
+
+def upload_path(tenant_id, name):
+    """A new, unique path under MEDIA_ROOT/uploads/<tenant>/ for an upload called ``name``"""
+    tenant_id_clean = re.sub(r'[^\w\.-]', '', tenant_id or 'default')
+    upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads', tenant_id_clean)
+    os.makedirs(upload_dir, exist_ok=True)
+
+    safe_name = re.sub(r'[^\w\.-]', '_', os.path.basename(name))
+    file_name = f"{timezone.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}_{safe_name}"
+    return os.path.join(upload_dir, file_name)
+
+
+def save_upload(uploaded_file, tenant_id):
+    """
+    Copy an uploaded file to MEDIA_ROOT/uploads/<tenant>/ in chunks and
+    return (saved_path, sha256_hex). The web worker never holds the whole
+    body, and the hash is computed on the same pass.
+
+    ``uploaded_file`` is anything with ``name`` and ``chunks()``, such as
+    a Django UploadedFile or a member of a zip archive.
+    """
+    file_path = upload_path(tenant_id, uploaded_file.name)
+    digest = hashlib.sha256()
+    with open(file_path, 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            digest.update(chunk)
+            destination.write(chunk)
+    return file_path, digest.hexdigest()
+
+
+def hash_file(file_path):
+    """SHA-256 of a file on disk, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def create_import_job(db_alias, tenant_id, uploaded_file, file_type, duplicate_mode=ImportJob.DuplicateMode.ERROR,
+                      partitions=1, staging=False, reimport=False, batch=None):
+    """
+    Save the upload to disk and record a queued ImportJob in the tenant DB.
+    A file identical to an earlier import gives an already completed job
+    (see ``_create_job``) and its saved copy is removed again.
+    """
+    file_path, file_hash = save_upload(uploaded_file, tenant_id)
+    job = _create_job(
+        db_alias, reimport,
+        tenant_id=tenant_id or 'default',
+        file_name=uploaded_file.name,
+        file_path=file_path,
+        file_type=file_type,
+        file_size=os.path.getsize(file_path),
+        file_hash=file_hash,
+        duplicate_mode=duplicate_mode,
+        partitions=_usable_partitions(file_path, partitions),
+        staging=staging,
+        batch=batch,
+    )
+    if job.file_path != file_path:
+        os.remove(file_path)
+    return job
+
+
+def register_import_file(db_alias, tenant_id, file_path, file_type, duplicate_mode=ImportJob.DuplicateMode.ERROR,
+                         partitions=1, reimport=False, staging=False, file_name=None):
+    """
+    Record a queued ImportJob for a file that is already on the server
+    (e.g. a multi-GB onboarding export); the file is imported in place.
+    ``file_name`` is the name shown for it (default: the file's own).
+    """
+    return _create_job(
+        db_alias, reimport,
+        tenant_id=tenant_id or 'default',
+        file_name=file_name or os.path.basename(file_path),
+        file_path=file_path,
+        file_type=file_type,
+        file_size=os.path.getsize(file_path),
+        file_hash=hash_file(file_path),
+        duplicate_mode=duplicate_mode,
+        partitions=_usable_partitions(file_path, partitions),
+        staging=staging,
+    )
+
+
+def _create_job(db_alias, reimport, **fields):
+    """
+    Create the ImportJob after checking the upload registry. A byte-
+    identical earlier upload short-circuits to its result: the job is
+    created completed with that import's counts, summary and error log.
+    A CSV that extends an earlier upload skips the rows it already had.
+    ``reimport`` bypasses the registry.
+    """
+    record, identical = (None, False) if reimport else find_previous_upload(
+        db_alias, fields['tenant_id'], fields['file_type'], fields['file_path'], fields['file_hash']
+    )
+    if record is None:
+        return ImportJob.objects.using(db_alias).create(**fields)
+
+    if not identical:
+        logger.info(f"{fields['file_name']} extends an earlier upload; its first {record.row_count} rows "
+                    f"are already imported")
+        return ImportJob.objects.using(db_alias).create(
+            skip_rows=record.row_count, skip_bytes=record.file_size, **fields
+        )
+
+    previous = ImportJob.objects.using(db_alias).filter(pk=record.import_job_id).first()
+    logger.info(f"{fields['file_name']} is identical to the upload of import job {record.import_job_id}; "
+                f"not importing it again")
+    now = timezone.now()
+    fields.update(
+        status=ImportJob.Status.COMPLETED,
+        started_at=now,
+        finished_at=now,
+        error_log_id=record.error_log_id,
+        summary=dict(previous.summary if previous else {}, duplicate_of=record.import_job_id),
+    )
+    if previous is not None:
+        fields.update(
+            file_path=previous.file_path,
+            skip_rows=previous.skip_rows,
+            rows_processed=previous.rows_processed,
+            rows_failed=previous.rows_failed,
+            rows_updated=previous.rows_updated,
+            rows_skipped=previous.rows_skipped,
+        )
+    return ImportJob.objects.using(db_alias).create(**fields)
+
+
+def _usable_partitions(file_path, partitions):
+    # Only CSV can be split on line boundaries; XLSX is always sequential
+    if os.path.splitext(file_path)[1].lower() != '.csv':
+        return 1
+    return max(1, partitions or 1)
+
+
+def enqueue_import_job(job, db_alias, run_async=None):
+    """
+    Hand the job to Celery. With DATA_IMPORT_CONFIG['RUN_ASYNC'] = False
+    (local development without a worker), or run_async=False, it runs
+    inline instead; a partitioned job's partitions then run one after
+    another, since forking a pool from a threaded web worker is unsafe.
+    """
+    if job.status != ImportJob.Status.QUEUED:
+        return  # e.g. answered from the upload registry
+    if run_async is None:
+        run_async = get_import_config().get('RUN_ASYNC', True)
+    if job.partitions > 1:
+        if run_async:
+            from data_management.tasks import process_partitioned_import_job
+            process_partitioned_import_job.delay(job.pk, db_alias)
+        else:
+            run_partitioned_job(job.pk, db_alias, workers=1)
+    elif run_async:
+        from data_management.tasks import process_import_job
+        process_import_job.delay(job.pk, db_alias)
+    else:
+        run_import_job(job.pk, db_alias)
+
+
+def resume_import_job(job, db_alias, run_async=None):
+    """
+    Re-queue a failed or stalled job so it continues from its last
+    checkpoint. A partitioned job has none and is re-run from the start;
+    rows its partitions already committed are then skipped rather than
+    reported as duplicates ('error' mode becomes 'skip').
+    Raises ValueError if the job cannot be resumed.
+    """
+    if not job.is_resumable:
+        raise ValueError(f"Import job {job.pk} is {job.status} and cannot be resumed")
+    if not os.path.exists(job.file_path):
+        raise ValueError(f"Uploaded file for import job {job.pk} no longer exists")
+    if job.file_hash and hash_file(job.file_path) != job.file_hash:
+        raise ValueError(f"Uploaded file for import job {job.pk} changed since the upload; start a new import")
+
+    rerun = {}
+    if job.partitions > 1 and job.duplicate_mode == ImportJob.DuplicateMode.ERROR:
+        rerun['duplicate_mode'] = ImportJob.DuplicateMode.SKIP
+    updated = ImportJob.objects.using(db_alias).filter(pk=job.pk, status=job.status).update(
+        status=ImportJob.Status.QUEUED,
+        error_message='',
+        finished_at=None,
+        **rerun
+    )
+    if not updated:
+        raise ValueError(f"Import job {job.pk} changed state, please retry")
+
+    if job.partitions > 1:
+        logger.info(f"Re-running partitioned import job {job.pk} on {db_alias}")
+    else:
+        logger.info(f"Resuming import job {job.pk} on {db_alias} from row {job.checkpoint_row}")
+    job.refresh_from_db(using=db_alias)
+    enqueue_import_job(job, db_alias, run_async=run_async)
+    return job
+
+
+def _error_file_path(job):
+    """Compressed error file the job streams failed rows to while it runs"""
+    return f"{job.file_path}{ERROR_FILE_SUFFIX}"
+
+
+def run_import_job(job_id, db_alias):
+    """
+    Process a queued ImportJob end to end: parse, validate, bulk insert,
+    write the ErrorLog and store the upload summary on the job.
+
+    Every batch commits together with a checkpoint on the job, so a job
+    that is resumed after a crash picks up at the first uncommitted row.
+    """
+    claimed = ImportJob.objects.using(db_alias).filter(pk=job_id, status=ImportJob.Status.QUEUED).update(
+        status=ImportJob.Status.RUNNING,
+        started_at=timezone.now(),
+        heartbeat_at=timezone.now(),
+    )
+    job = ImportJob.objects.using(db_alias).get(pk=job_id)
+    if not claimed:
+        logger.warning(f"Import job {job_id} on {db_alias} is {job.status}, not queued; skipping")
+        return job
+
+    started = time.monotonic()
+    resumed_rows = job.rows_processed if job.checkpoint_row else 0
+    error_path = _error_file_path(job)
+
+    def save_checkpoint(importer, last_row):
+        # Runs inside the batch transaction. Errors up to last_row are
+        # already in the error file; a resume cuts it back to the
+        # committed checkpoint
+        elapsed = time.monotonic() - started
+        state = importer.checkpoint_state()
+        # Count only rows up to the checkpoint; validation errors further
+        # into the current chunk are not committed yet
+        rows_done = state['inserted'] + state['updated'] + state['skipped'] + state['failed']
+        ImportJob.objects.using(db_alias).filter(pk=job.pk).update(
+            checkpoint=state,
+            rows_processed=rows_done,
+            rows_failed=state['failed'],
+            rows_updated=state['updated'],
+            rows_skipped=state['skipped'],
+            rows_per_second=(rows_done - resumed_rows) / elapsed if elapsed > 0 else 0,
+            heartbeat_at=timezone.now(),
+        )
+
+    try:
+        if os.path.getsize(job.file_path) == 0:
+            raise ValueError('Uploaded file is empty')
+
+        if not job.checkpoint_row and os.path.exists(error_path):
+            os.remove(error_path)
+
+        fresh_start = not job.checkpoint_row and not job.skip_rows
+        if job.staging and fresh_start and staging_supported(db_alias, job.file_type, job.file_path):
+            # COPY into a staging table and let PostgreSQL validate and
+            # insert; the checkpoint commits with the INSERT ... SELECT
+            importer = StagingImporter(
+                db_alias, job.pk,
+                duplicate_mode=job.duplicate_mode,
+                error_path=error_path,
+                on_progress=lambda phase: ImportJob.objects.using(db_alias).filter(pk=job.pk).update(
+                    heartbeat_at=timezone.now()
+                )
+            )
+            importer.run(
+                job.file_path,
+                on_committed=lambda importer: save_checkpoint(importer, importer.checkpoint_state()['row'])
+            )
+        else:
+            if job.staging and fresh_start:
+                logger.warning(f"Import job {job.pk}: staging import needs PostgreSQL and a transaction CSV, "
+                               f"using the standard importer")
+            # Stream the file chunk by chunk; each chunk is validated, written
+            # and dropped before the next one is read
+            importer = BulkImporter(
+                db_alias, job.file_type,
+                on_checkpoint=save_checkpoint,
+                duplicate_mode=job.duplicate_mode,
+                error_path=error_path
+            )
+            if job.checkpoint_row:
+                importer.resume_from(job.checkpoint)
+                logger.info(f"Import job {job.pk}: resuming after row {job.checkpoint_row}")
+            elif job.skip_rows:
+                # Header plus the rows an earlier upload of this export covered
+                importer.resume_from({'row': job.skip_rows + 1})
+
+            for chunk in iter_file_chunks(job.file_path):
+                importer.process_dataframe(chunk)
+            importer.finish()
+        logger.info(f"Import job {job.pk}: {job.file_type} file {job.file_name} had {importer.rows_processed} rows")
+
+        if importer.error_count:
+            job.error_log = importer.write_error_log(job.tenant_id, job.created_at)
+
+        elapsed = time.monotonic() - started
+        job.checkpoint = importer.checkpoint_state()
+        job.rows_processed = importer.rows_processed
+        job.rows_failed = importer.error_count
+        job.rows_updated = importer.updated_count
+        job.rows_skipped = importer.skipped_count
+        job.rows_per_second = (importer.rows_processed - resumed_rows) / elapsed if elapsed > 0 else 0
+        job.summary = importer.summary()
+        job.status = ImportJob.Status.COMPLETED
+        job.finished_at = timezone.now()
+        job.save(using=db_alias)
+        record_upload(job, db_alias)
+    except Exception as e:
+        logger.exception(f"Import job {job.pk} on {db_alias} failed")
+        # Only touch the status columns; the checkpoint and counters saved
+        # with the last committed batch are what a resume starts from
+        ImportJob.objects.using(db_alias).filter(pk=job.pk).update(
+            status=ImportJob.Status.FAILED,
+            error_message=str(e),
+            finished_at=timezone.now(),
+        )
+        job.refresh_from_db(using=db_alias)
+
+    logger.info(
+        f"Import job {job.pk} {job.status}: {job.rows_inserted} inserted, {job.rows_updated} updated, "
+        f"{job.rows_skipped} skipped, {job.rows_failed} failed, {job.rows_per_second:.0f} rows/s"
+    )
+    return job
@@ -0,0 +1,198 @@
+# data_management/services/member_stats.py
+
+import logging
+from datetime import date, timedelta
+
+from django.db import connections, router, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+
+from data_management.models import Member, MemberActivityStats, Transaction
+
+logger = logging.getLogger(__name__)
+
+DEPOSIT_EVENTS = ['Deposit', 'Manual Deposit']
+WITHDRAWAL_EVENTS = ['Withdraw', 'Manual Withdraw']
+CHUNK_SIZE = 2000  # usernames per refresh query
+
+STAT_FIELDS = [
+    'first_deposit', 'last_deposit', 'last_withdrawal', 'last_activity',
+    'deposit_count', 'deposit_total', 'largest_deposit',
+    'withdrawal_count', 'withdrawal_total', 'largest_withdrawal',
+    'recent_deposit_count', 'recent_deposit_total', 'recent_withdrawal_count', 'recent_withdrawal_total',
+    'window_end',
+]
+
+
+def member_stats_ready(using=None):
+    """
+    True once the tenant's member stats (the current tenant's by default)
+    have been built, or there are no transactions yet. Until then reports
+    aggregate the transactions and imports leave the table alone.
+    """
+    using = using or router.db_for_read(MemberActivityStats)
+    return (
+        MemberActivityStats.objects.using(using).exists()
+        or not Transaction.objects.using(using).exists()
+    )
+
+
+def _stats_rows(transactions, window_end):
+    """Grouped query: one dict of MemberActivityStats values per username of ``transactions``"""
+    deposits = Q(event__in=DEPOSIT_EVENTS)
+    withdrawals = Q(event__in=WITHDRAWAL_EVENTS)
+    recent = Q(
+        process_date__gte=window_end - timedelta(days=MemberActivityStats.RECENT_DAYS - 1),
+        process_date__lt=window_end + timedelta(days=1),
+    )
+    return transactions.values('username').annotate(
+        first_deposit=Min('process_date', filter=deposits),
+        last_deposit=Max('process_date', filter=deposits),
+        last_withdrawal=Max('process_date', filter=withdrawals),
+        last_activity=Max('process_date'),
+        deposit_count=Count('id', filter=deposits),
+        deposit_total=Sum('amount', filter=deposits),
+        largest_deposit=Max('amount', filter=deposits),
+        withdrawal_count=Count('id', filter=withdrawals),
+        withdrawal_total=Sum('amount', filter=withdrawals),
+        largest_withdrawal=Max('amount', filter=withdrawals),
+        recent_deposit_count=Count('id', filter=deposits & recent),
+        recent_deposit_total=Sum('amount', filter=deposits & recent),
+        recent_withdrawal_count=Count('id', filter=withdrawals & recent),
+        recent_withdrawal_total=Sum('amount', filter=withdrawals & recent),
+    ).order_by()
+
+
+def _stats(row, window_end):
+    amounts = ['deposit_total', 'largest_deposit', 'withdrawal_total', 'largest_withdrawal',
+               'recent_deposit_total', 'recent_withdrawal_total']
+    return MemberActivityStats(window_end=window_end, **{
+        field: (value or 0) if field in amounts else value for field, value in row.items()
+    })
+
+
+def refresh_member_stats(using, usernames, today=None):
+    """
+    Recompute the stats of ``usernames`` (e.g. the users an import wrote
+    transactions for), CHUNK_SIZE users per grouped query. Writers check
+    member_stats_ready() before they change anything and only refresh when
+    it was True. Returns the number of users refreshed.
+    """
+    window_end = today or date.today()
+    usernames = sorted({str(username) for username in usernames})
+    for start in range(0, len(usernames), CHUNK_SIZE):
+        chunk = usernames[start:start + CHUNK_SIZE]
+        rows = [
+            _stats(row, window_end)
+            for row in _stats_rows(Transaction.objects.using(using).filter(username__in=chunk), window_end)
+        ]
+        with transaction.atomic(using=using):
+            MemberActivityStats.objects.using(using).bulk_create(
+                rows, update_conflicts=True, unique_fields=['username'], update_fields=STAT_FIELDS + ['updated_at']
+            )
+            # Users left without transactions (e.g. an update moved them away)
+            gone = set(chunk) - {row.username for row in rows}
+            MemberActivityStats.objects.using(using).filter(username__in=gone).delete()
+    if usernames:
+        logger.debug(f"Refreshed member stats of {len(usernames)} users on {using}")
+    return len(usernames)
+
+
+def rebuild_member_stats(using, today=None, batch_size=5000):
+    """Rebuild every user's stats with one grouped query over the transactions; returns the number of users"""
+    window_end = today or date.today()
+    written = 0
+    with transaction.atomic(using=using):
+        MemberActivityStats.objects.using(using).all().delete()
+        batch = []
+        for row in _stats_rows(Transaction.objects.using(using).all(), window_end).iterator(chunk_size=batch_size):
+            batch.append(_stats(row, window_end))
+            if len(batch) >= batch_size:
+                MemberActivityStats.objects.using(using).bulk_create(batch)
+                written += len(batch)
+                batch = []
+        MemberActivityStats.objects.using(using).bulk_create(batch)
+        written += len(batch)
+    logger.info(f"Rebuilt member stats of {written} users on {using}")
+    return written
+
+
+def refresh_recent_windows(using, today=None):
+    """
+    Move every user's recent_* window to end ``today``. Only users with
+    something in their old window can change (an empty window stays empty
+    until an import refreshes the user), so only they are recomputed.
+    Returns the number of users recomputed.
+    """
+    window_end = today or date.today()
+    stale = MemberActivityStats.objects.using(using).filter(window_end__lt=window_end)
+    usernames = list(stale.filter(
+        Q(recent_deposit_count__gt=0) | Q(recent_withdrawal_count__gt=0)
+    ).values_list('username', flat=True))
+    refreshed = refresh_member_stats(using, usernames, today=window_end)
+    stale.update(window_end=window_end)
+    return refreshed
+
+
+def last_activity(usernames, before=None, using=None):
+    """
+    {username: latest process_date of any event} for ``usernames``, only
+    users last active before ``before`` when given. One indexed read of
+    the member stats once they are built, else one grouped query over the
+    transactions.
+    """
+    using = using or router.db_for_read(MemberActivityStats)
+    if member_stats_ready(using):
+        rows = MemberActivityStats.objects.using(using).filter(
+            username__in=usernames, last_activity__isnull=False
+        ).values_list('username', 'last_activity')
+        if before is not None:
+            rows = rows.filter(last_activity__lt=before)
+    else:
+        rows = Transaction.objects.using(using).filter(username__in=usernames).values('username').annotate(
+            last=Max('process_date')
+        ).order_by().values_list('username', 'last')
+        if before is not None:
+            rows = rows.filter(last__lt=before)
+    return dict(rows)
+
+
+def inactive_members(events, start_date, end_date, inactive_before, using=None):
+    """
+    Members with a transaction of ``events`` processed from ``start_date``
+    to ``end_date`` inclusive whose last activity (any event) is before
+    ``inactive_before``, least recently active first, as dicts of
+    username, name, handphone, join_date, window_count and last_in_window
+    (their ``events`` transactions in the window) and last_activity.
+
+    One query: the window's per-user aggregate joined to Member and to the
+    users' last activity (the member stats once built, else a grouped
+    query over those users' transactions), the cutoff applied in SQL.
+    """
+    using = using or router.db_for_read(Transaction)
+    window = Transaction.objects.using(using).filter(
+        event__in=events, process_date__gte=start_date, process_date__lt=end_date + timedelta(days=1)
+    ).values('username').annotate(window_count=Count('id'), last_in_window=Max('process_date')).order_by()
+    if member_stats_ready(using):
+        activity = MemberActivityStats.objects.using(using).filter(
+            last_activity__lt=inactive_before
+        ).values('username', 'last_activity')
+    else:
+        activity = Transaction.objects.using(using).filter(
+            username__in=window.values('username')
+        ).values('username').annotate(last_activity=Max('process_date')).filter(
+            last_activity__lt=inactive_before
+        ).order_by()
+
+    connection = connections[using]
+    window_sql, window_params = window.query.get_compiler(using).as_sql()
+    activity_sql, activity_params = activity.query.get_compiler(using).as_sql()
+    columns = ['username', 'name', 'handphone', 'join_date', 'window_count', 'last_in_window', 'last_activity']
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT w.username, m.name, m.handphone, m.join_date, w.window_count, w.last_in_window, a.last_activity
+            FROM ({window_sql}) AS w
+            JOIN {connection.ops.quote_name(Member._meta.db_table)} m ON m.username = w.username
+            JOIN ({activity_sql}) AS a ON a.username = w.username
+            ORDER BY a.last_activity, w.username
+        """, window_params + activity_params)
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
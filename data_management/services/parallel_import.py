@@ -0,0 +1,365 @@
+# data_management/services/parallel_import.py
+
+import csv
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from data_management.models import ImportJob
+from tenants.context import set_current_db, clear_current_db
+from .error_files import ErrorFile, open_error_log
+from .import_service import BulkImporter, json_safe, store_error_log
+from .member_stats import member_stats_ready, refresh_member_stats
+from .readers import detect_encoding, iter_csv_range_chunks
+from .rollups import refresh_daily_rollups, rollups_ready
+from .upload_registry import record_upload
+
+logger = logging.getLogger(__name__)
+
+MIN_PARTITION_BYTES = 8 * 1024 * 1024  # smaller slices are not worth a worker
+MERGE_BATCH = 10000                     # error lines rewritten per ErrorFile.write
+
+
+def plan_partitions(file_path, partitions, start=0):
+    """
+    Split the CSV body into at most ``partitions`` byte ranges that start
+    and end on line boundaries. Returns JSON-safe dicts (they travel as
+    Celery task arguments): {'index', 'start', 'end', 'encoding'}.
+    ``start`` skips a prefix already imported (ImportJob.skip_bytes).
+
+    Lines are assumed not to contain quoted newlines, which holds for the
+    back-office exports this is meant for.
+    """
+    encoding = detect_encoding(file_path)
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        f.readline()  # header
+        body_start = max(f.tell(), start)
+        partitions = max(1, min(partitions, (size - body_start) // MIN_PARTITION_BYTES or 1))
+        step = (size - body_start) // partitions
+
+        boundaries = [body_start]
+        for i in range(1, partitions):
+            f.seek(max(body_start + step * i, boundaries[-1]))
+            f.readline()  # move to the start of the next line
+            position = f.tell()
+            if position >= size:
+                break
+            boundaries.append(position)
+        boundaries.append(size)
+
+    return [
+        {'index': index, 'start': start, 'end': end, 'encoding': encoding}
+        for index, (start, end) in enumerate(zip(boundaries, boundaries[1:]))
+        if end > start
+    ]
+
+
+def _partition_error_path(job, partition):
+    return f"{job.file_path}.part{partition['index']}.errors.csv.gz"
+
+
+def import_partition(job_id, db_alias, partition):
+    """
+    Parse, validate and write one byte range of the job's file. Runs in a
+    worker process (pool or Celery). Row numbers in the result are
+    relative to the partition; ``finish_partitioned_job`` shifts them.
+    The days and users each batch wrote are added to the job's checkpoint
+    in that batch's transaction, for the refresh at the end of the job.
+
+    Failures are returned rather than raised so the merge step always
+    runs and can mark the job failed.
+    """
+    job = ImportJob.objects.using(db_alias).get(pk=job_id)
+    error_path = _partition_error_path(job, partition)
+    reported = {'rows': 0, 'rollup_days': set(), 'stats_usernames': set()}
+
+    def report_progress(importer, last_row):
+        # Job-wide progress for the upload page; each partition adds the
+        # rows it committed since its previous checkpoint
+        state = importer.checkpoint_state()
+        rows_done = state['inserted'] + state['updated'] + state['skipped'] + state['failed']
+        ImportJob.objects.using(db_alias).filter(pk=job_id).update(
+            rows_processed=F('rows_processed') + (rows_done - reported['rows']),
+            heartbeat_at=timezone.now(),
+        )
+        reported['rows'] = rows_done
+        _add_pending_refresh(job_id, db_alias, importer, reported)
+
+    try:
+        if os.path.exists(error_path):
+            os.remove(error_path)
+        importer = BulkImporter(
+            db_alias, job.file_type,
+            on_checkpoint=report_progress,
+            duplicate_mode=job.duplicate_mode,
+            error_path=error_path,
+            defer_refresh=True,
+        )
+        rows = 0
+        for chunk in iter_csv_range_chunks(job.file_path, partition['start'], partition['end'], partition['encoding']):
+            rows += len(chunk)
+            importer.process_dataframe(chunk)
+        importer.finish()  # the final checkpoint writes any remaining errors
+    except Exception as e:
+        logger.exception(f"Import job {job_id} partition {partition['index']} failed")
+        return {'index': partition['index'], 'error': str(e)}
+
+    return {
+        'index': partition['index'],
+        'rows': rows,
+        'inserted': importer.inserted_count,
+        'updated': importer.updated_count,
+        'skipped': importer.skipped_count,
+        'failed': importer.error_count,
+        'error_path': error_path if importer.error_count else None,
+        'summary': importer.summary(),
+    }
+
+
+def _add_pending_refresh(job_id, db_alias, importer, reported):
+    """
+    Union the days and users the partition wrote since its last report into
+    the job checkpoint's ``rollup_days`` / ``stats_usernames``. The job row
+    is locked, so partitions committing at the same time do not drop each
+    other's entries.
+    """
+    days = {day.isoformat() for day in importer.rollup_days} - reported['rollup_days']
+    usernames = importer.stats_usernames - reported['stats_usernames']
+    if not days and not usernames:
+        return
+    checkpoint = ImportJob.objects.using(db_alias).select_for_update().values_list(
+        'checkpoint', flat=True
+    ).get(pk=job_id)
+    checkpoint['rollup_days'] = sorted(days.union(checkpoint.get('rollup_days', [])))
+    checkpoint['stats_usernames'] = sorted(usernames.union(checkpoint.get('stats_usernames', [])))
+    ImportJob.objects.using(db_alias).filter(pk=job_id).update(checkpoint=checkpoint)
+    reported['rollup_days'] |= days
+    reported['stats_usernames'] |= usernames
+
+
+def _refresh_pending(job, db_alias):
+    """
+    Refresh the daily rollups and member stats for the days and users in
+    the job checkpoint, including those of earlier failed runs, and clear
+    them from it in the same transaction
+    """
+    checkpoint = dict(job.checkpoint)
+    days = [date.fromisoformat(day) for day in checkpoint.pop('rollup_days', [])]
+    usernames = checkpoint.pop('stats_usernames', [])
+    if not days and not usernames:
+        return
+    with transaction.atomic(using=db_alias):
+        if days and rollups_ready(db_alias):
+            refresh_daily_rollups(db_alias, days)
+        if usernames and member_stats_ready(db_alias):
+            refresh_member_stats(db_alias, usernames)
+        ImportJob.objects.using(db_alias).filter(pk=job.pk).update(checkpoint=checkpoint)
+    job.checkpoint = checkpoint
+
+
+def _shift_error(error, offset):
+    if not error:
+        return None
+    return dict(error, row=error['row'] + offset)
+
+
+def _merge_error_files(results, target_path, offset=0):
+    """
+    Concatenate the partition error files into one, in file order, with
+    row numbers shifted to whole-file line numbers. ``offset`` counts the
+    rows before the first partition.
+    """
+    target = ErrorFile(target_path)
+    for result in results:
+        if result['error_path']:
+            with open_error_log(result['error_path']) as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                batch = []
+                for entry in reader:
+                    batch.append({'row': int(entry[0]) + offset, 'error': entry[1], 'data': entry[2]})
+                    if len(batch) >= MERGE_BATCH:
+                        target.write(batch)
+                        batch = []
+                target.write(batch)
+            os.remove(result['error_path'])
+        offset += result['rows']
+
+
+def start_partitioned_job(job_id, db_alias):
+    """
+    Claim a queued partitioned job and plan its byte ranges. Returns the
+    partitions, or None if the job was not queued.
+    """
+    claimed = ImportJob.objects.using(db_alias).filter(pk=job_id, status=ImportJob.Status.QUEUED).update(
+        status=ImportJob.Status.RUNNING,
+        started_at=timezone.now(),
+        heartbeat_at=timezone.now(),
+        rows_processed=0,
+    )
+    if not claimed:
+        logger.warning(f"Import job {job_id} on {db_alias} is not queued; skipping")
+        return None
+
+    job = ImportJob.objects.using(db_alias).get(pk=job_id)
+    try:
+        if os.path.getsize(job.file_path) == 0:
+            raise ValueError('Uploaded file is empty')
+        partitions = plan_partitions(job.file_path, job.partitions, start=job.skip_bytes)
+    except Exception as e:
+        logger.exception(f"Import job {job_id} on {db_alias} could not be partitioned")
+        _fail_job(job_id, db_alias, str(e))
+        return None
+
+    logger.info(f"Import job {job_id}: {job.file_name} split into {len(partitions)} partitions")
+    return partitions
+
+
+def finish_partitioned_job(job_id, db_alias, results):
+    """Merge partition results into one ErrorLog and the job's summary"""
+    job = ImportJob.objects.using(db_alias).get(pk=job_id)
+    results = sorted(results, key=lambda result: result['index'])
+
+    failures = [f"partition {result['index']}: {result['error']}" for result in results if 'error' in result]
+    if failures:
+        # Rows from the partitions that finished are committed; re-running
+        # with duplicate mode 'skip' completes the import
+        for result in results:
+            if result.get('error_path') and os.path.exists(result['error_path']):
+                os.remove(result['error_path'])
+        return _fail_job(job_id, db_alias, '; '.join(failures))
+
+    try:
+        _refresh_pending(job, db_alias)
+    except Exception as e:
+        # The pending days and users stay in the checkpoint; a re-run refreshes them
+        logger.exception(f"Import job {job_id}: refreshing the rollups and member stats failed")
+        return _fail_job(job_id, db_alias, f"Refreshing the rollups and member stats failed: {e}")
+
+    inserted = sum(result['inserted'] for result in results)
+    updated = sum(result['updated'] for result in results)
+    skipped = sum(result['skipped'] for result in results)
+    failed = sum(result['failed'] for result in results)
+    rows = inserted + updated + skipped + failed
+
+    first_error = last_error = first_record = last_record = None
+    offset = job.skip_rows
+    for result in results:
+        summary = result['summary']
+        if first_error is None:
+            first_error = _shift_error(summary['first_error'], offset)
+        last_error = _shift_error(summary['last_error'], offset) or last_error
+        first_record = first_record or summary['first_record']
+        last_record = summary['last_record'] or last_record
+        offset += result['rows']
+
+    if failed:
+        merged_path = f"{job.file_path}.errors.csv.gz"
+        _merge_error_files(results, merged_path, offset=job.skip_rows)
+        job.error_log = store_error_log(
+            db_alias, job.tenant_id, job.created_at, job.file_type,
+            merged_path, failed, inserted + updated
+        )
+
+    elapsed = (timezone.now() - job.started_at).total_seconds() if job.started_at else 0
+    job.rows_processed = rows
+    job.rows_failed = failed
+    job.rows_updated = updated
+    job.rows_skipped = skipped
+    job.rows_per_second = rows / elapsed if elapsed > 0 else 0
+    job.summary = json_safe({
+        'record_count': inserted + updated,
+        'error_count': failed,
+        'duplicate_mode': job.duplicate_mode,
+        'inserted_count': inserted,
+        'updated_count': updated,
+        'skipped_count': skipped,
+        'first_record': first_record,
+        'last_record': last_record,
+        'first_error': first_error,
+        'last_error': last_error,
+        'partitions': len(results),
+    })
+    job.status = ImportJob.Status.COMPLETED
+    job.finished_at = timezone.now()
+    job.save(using=db_alias)
+    record_upload(job, db_alias)
+
+    logger.info(
+        f"Import job {job.pk} completed over {len(results)} partitions: {job.rows_inserted} inserted, "
+        f"{updated} updated, {skipped} skipped, {failed} failed, {job.rows_per_second:.0f} rows/s"
+    )
+    return job
+
+
+def fail_partitioned_job(job_id, db_alias, message):
+    """
+    Mark a running partitioned job failed when its merge step cannot run
+    (a partition task died). The job can then be re-run, see
+    resume_import_job.
+    """
+    failed = ImportJob.objects.using(db_alias).filter(pk=job_id, status=ImportJob.Status.RUNNING).update(
+        status=ImportJob.Status.FAILED,
+        error_message=message,
+        finished_at=timezone.now(),
+    )
+    if failed:
+        logger.error(f"Import job {job_id} on {db_alias} failed: {message}")
+    return ImportJob.objects.using(db_alias).get(pk=job_id)
+
+
+def _fail_job(job_id, db_alias, message):
+    ImportJob.objects.using(db_alias).filter(pk=job_id).update(
+        status=ImportJob.Status.FAILED,
+        error_message=message,
+        finished_at=timezone.now(),
+    )
+    return ImportJob.objects.using(db_alias).get(pk=job_id)
+
+
+def _run_partition_in_worker(job_id, db_alias, partition):
+    # Forked workers must not reuse the parent's database connections
+    connections.close_all()
+    set_current_db(db_alias)
+    try:
+        return import_partition(job_id, db_alias, partition)
+    finally:
+        clear_current_db()
+        connections.close_all()
+
+
+def run_partitioned_job(job_id, db_alias, workers=None):
+    """
+    Import a partitioned job with a local process pool, one partition per
+    task. Used by the ``parallel_import`` command; Celery fans the
+    partitions out as separate tasks instead. With ``workers=1`` the
+    partitions run one after another in this process, nothing is forked
+    (how a web request runs a job when RUN_ASYNC is off).
+    """
+    partitions = start_partitioned_job(job_id, db_alias)
+    if partitions is None:
+        return ImportJob.objects.using(db_alias).get(pk=job_id)
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(partitions)))
+    started = time.monotonic()
+    if workers == 1:
+        results = [import_partition(job_id, db_alias, partition) for partition in partitions]
+    else:
+        # Children are forked from this process, so close our connections
+        # first rather than sharing sockets with them
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            futures = [pool.submit(_run_partition_in_worker, job_id, db_alias, partition) for partition in partitions]
+            results = [future.result() for future in futures]
+    logger.info(f"Import job {job_id}: {len(partitions)} partitions on {workers} workers "
+                f"in {time.monotonic() - started:.1f}s")
+
+    return finish_partitioned_job(job_id, db_alias, results)
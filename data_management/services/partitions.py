@@ -0,0 +1,322 @@
+# data_management/services/partitions.py
+
+import gzip
+import logging
+import os
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from data_management.models import Transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MONTHS_AHEAD = 3  # empty partitions kept ready for upcoming imports
+PARTITION_PATTERN = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def _table():
+    return Transaction._meta.db_table
+
+
+def partition_name(month):
+    """data_management_transaction_pYYYYMM for the month starting at ``month``"""
+    return f"{_table()}_p{month:%Y%m}"
+
+
+def default_partition_name():
+    """Catches rows outside every monthly partition, so an insert never fails for lack of one"""
+    return f"{_table()}_default"
+
+
+def add_months(month, count):
+    """First day of the month ``count`` months after ``month``"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def is_partitioned(db_alias):
+    """True when the tenant's transaction table is range partitioned by process_date (PostgreSQL only)"""
+    connection = connections[db_alias]
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [_table()]
+        )
+        return cursor.fetchone()[0]
+
+
+def lock_transaction_keys(db_alias):
+    """
+    Take the tenant's natural-key lock for the rest of the current
+    transaction. A partitioned table only enforces the natural key per
+    process_date, so every writer checks it itself and holds this lock
+    from the check until it commits; two imports of the same row can then
+    no longer both see it missing. Must run inside a transaction.
+    """
+    with connections[db_alias].cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [f"{_table()} natural key"])
+
+
+def transaction_partitions(db_alias):
+    """{month: partition name} of the monthly partitions attached to the transaction table"""
+    with connections[db_alias].cursor() as cursor:
+        cursor.execute("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+        """, [_table()])
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        match = PARTITION_PATTERN.search(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return dict(sorted(partitions.items()))
+
+
+def _bound(month):
+    # Read as a timestamptz in the connection's time zone (TIME_ZONE), so
+    # partitions split on the same local midnight the reports filter on
+    return f"{month:%Y-%m-%d} 00:00:00"
+
+
+def partition_transaction_table(db_alias, months_ahead=DEFAULT_MONTHS_AHEAD, today=None):
+    """
+    Turn the transaction table into one range partitioned by process_date,
+    one partition per month from the oldest transaction to ``months_ahead``
+    months ahead plus the default partition, and copy the rows across.
+    Reports filter on process_date, so PostgreSQL only scans the months a
+    report covers. The table keeps its name, columns, indexes and id
+    sequence, so the model and its migrations do not change.
+
+    PostgreSQL only allows unique constraints that contain the partition
+    key, so the primary key becomes (id, process_date) and the natural key
+    (username, event, create_date, amount) is only unique per process_date;
+    the importers check it themselves under lock_transaction_keys().
+
+    Every row is rewritten in one transaction under an exclusive lock on
+    the table: run it in a maintenance window, with imports stopped.
+    Returns the number of partitions created.
+    """
+    connection = connections[db_alias]
+    if connection.vendor != 'postgresql':
+        raise ValueError(f"{db_alias} is not a PostgreSQL database")
+    if is_partitioned(db_alias):
+        raise ValueError(f"The transaction table of {db_alias} is already partitioned")
+
+    table = _table()
+    old = f"{table}_unpartitioned"
+    quote = connection.ops.quote_name
+    with transaction.atomic(using=db_alias):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(old)}")
+            # Index and constraint names are schema wide; the new table takes them over
+            cursor.execute(f"ALTER TABLE {quote(old)} RENAME CONSTRAINT {quote(table + '_pkey')} "
+                           f"TO {quote(old + '_pkey')}")
+            for index in Transaction._meta.indexes:
+                cursor.execute(f"DROP INDEX IF EXISTS {quote(index.name)}")
+            cursor.execute(f"""
+                CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS)
+                PARTITION BY RANGE (process_date)
+            """)
+
+            # In the connection's time zone, like the partition bounds
+            cursor.execute(f"SELECT min(process_date)::date, max(id) FROM {quote(old)}")
+            oldest, max_id = cursor.fetchone()
+            current = month_start(today or date.today())
+            month = month_start(oldest) if oldest else current
+            months = []
+            while month <= add_months(current, months_ahead):
+                months.append(month)
+                month = add_months(month, 1)
+            for month in months:
+                cursor.execute(
+                    f"CREATE TABLE {quote(partition_name(month))} PARTITION OF {quote(table)} "
+                    f"FOR VALUES FROM (%s) TO (%s)", [_bound(month), _bound(add_months(month, 1))]
+                )
+            cursor.execute(f"CREATE TABLE {quote(default_partition_name())} PARTITION OF {quote(table)} DEFAULT")
+
+            cursor.execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(old)}")
+            cursor.execute(f"DROP TABLE {quote(old)}")  # takes its id sequence along
+
+            sequence = f"{table}_id_seq"
+            cursor.execute(f"CREATE SEQUENCE {quote(sequence)} OWNED BY {quote(table)}.id")
+            cursor.execute("SELECT setval(%s, %s, %s)", [sequence, max_id or 1, max_id is not None])
+            cursor.execute(f"ALTER TABLE {quote(table)} ALTER COLUMN id SET DEFAULT nextval(%s)", [sequence])
+
+            # Built after the copy (faster than maintaining them row by row)
+            cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(table + '_pkey')} "
+                           f"PRIMARY KEY (id, process_date)")
+            cursor.execute(f"""
+                ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(table + '_natural_key_uniq')}
+                UNIQUE (username, event, create_date, amount, process_date)
+            """)
+        with connection.schema_editor(atomic=False) as schema_editor:
+            for index in Transaction._meta.indexes:
+                schema_editor.add_index(Transaction, index)
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {quote(table)}")
+    logger.info(f"Partitioned the transaction table of {db_alias} into {len(months)} monthly partitions")
+    return len(months)
+
+
+def unpartition_transaction_table(db_alias):
+    """
+    Copy the rows of a partitioned transaction table back into a plain
+    table built from the model, with the natural key unique again. Like
+    partition_transaction_table(), a maintenance window job.
+    """
+    if not is_partitioned(db_alias):
+        raise ValueError(f"The transaction table of {db_alias} is not partitioned")
+
+    connection = connections[db_alias]
+    table = _table()
+    old = f"{table}_partitioned"
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in Transaction._meta.local_fields)
+    with transaction.atomic(using=db_alias):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(old)}")
+            cursor.execute(f"ALTER TABLE {quote(old)} DROP CONSTRAINT {quote(table + '_pkey')}")
+            cursor.execute(f"ALTER TABLE {quote(old)} DROP CONSTRAINT {quote(table + '_natural_key_uniq')}")
+            for index in Transaction._meta.indexes:
+                cursor.execute(f"DROP INDEX IF EXISTS {quote(index.name)}")
+            # The rebuilt table's identity sequence takes the name back
+            cursor.execute(f"ALTER TABLE {quote(old)} ALTER COLUMN id DROP DEFAULT")
+            cursor.execute(f"DROP SEQUENCE {quote(table + '_id_seq')}")
+
+        with connection.schema_editor(atomic=False) as schema_editor:
+            schema_editor.create_model(Transaction)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {quote(table)} ({columns}) SELECT {columns} FROM {quote(old)}")
+            cursor.execute(f"DROP TABLE {quote(old)}")  # and its partitions
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), coalesce(max(id), 1), max(id) IS NOT NULL) "
+                f"FROM {quote(table)}", [table]
+            )
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {quote(table)}")
+    logger.info(f"Copied the transaction table of {db_alias} back into a plain table")
+
+
+def create_transaction_partitions(db_alias, months_ahead=DEFAULT_MONTHS_AHEAD, today=None):
+    """
+    Make sure the transaction table has a partition for the current month
+    and the next ``months_ahead`` ones. Months whose rows ended up in the
+    default partition (e.g. a backfill of old exports) get their own
+    partition as well and the rows are moved into it.
+
+    Returns the names of the partitions created.
+    """
+    if not is_partitioned(db_alias):
+        raise ValueError(f"The transaction table of {db_alias} is not partitioned")
+
+    current = month_start(today or date.today())
+    wanted = {add_months(current, offset) for offset in range(months_ahead + 1)}
+
+    connection = connections[db_alias]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT DISTINCT date_trunc('month', process_date)::date
+            FROM {quote(default_partition_name())}
+        """)
+        stray = {row[0] for row in cursor.fetchall()}
+
+    existing = transaction_partitions(db_alias)
+    created = []
+    for month in sorted((wanted | stray) - set(existing)):
+        _create_partition(connection, month)
+        created.append(partition_name(month))
+    if created:
+        logger.info(f"Created transaction partitions on {db_alias}: {', '.join(created)}")
+    return created
+
+
+def _create_partition(connection, month):
+    """
+    Build the month's partition next to the table, move matching rows out
+    of the default partition into it and attach it, in one transaction
+    (attaching straight away would fail while the default partition still
+    holds rows for the month).
+    """
+    quote = connection.ops.quote_name
+    name = quote(partition_name(month))
+    start, end = _bound(month), _bound(add_months(month, 1))
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TABLE {name} (LIKE {quote(_table())} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            cursor.execute(f"""
+                WITH moved AS (
+                    DELETE FROM {quote(default_partition_name())}
+                    WHERE process_date >= %s AND process_date < %s
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            """, [start, end])
+            cursor.execute(
+                f"ALTER TABLE {quote(_table())} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", [start, end]
+            )
+
+
+def archive_directory(tenant_id, root=None):
+    """<root>/<tenant>/ (root defaults to MEDIA_ROOT/partition_archive): gzip CSVs of archived partitions"""
+    tenant_id_clean = re.sub(r'[^\w\.-]', '', tenant_id or 'default')
+    return os.path.join(root or os.path.join(settings.MEDIA_ROOT, 'partition_archive'), tenant_id_clean)
+
+
+def detach_transaction_partitions(db_alias, keep_months, archive_dir=None, today=None):
+    """
+    Detach the monthly partitions that end before the last ``keep_months``
+    months (the current one included). A detached partition stays in the
+    database as a plain table, out of every report; with ``archive_dir``
+    it is written there as <partition>.csv.gz and dropped instead.
+
+    Returns [(partition name, archive path or None)].
+    """
+    if keep_months < 1:
+        raise ValueError('At least the current month must be kept')
+    if not is_partitioned(db_alias):
+        raise ValueError(f"The transaction table of {db_alias} is not partitioned")
+
+    cutoff = add_months(month_start(today or date.today()), 1 - keep_months)
+    connection = connections[db_alias]
+    quote = connection.ops.quote_name
+
+    detached = []
+    for month, name in transaction_partitions(db_alias).items():
+        if month >= cutoff:
+            continue
+        with transaction.atomic(using=db_alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {quote(_table())} DETACH PARTITION {quote(name)}")
+                # A detached table no longer draws ids from the table's sequence
+                cursor.execute(f"ALTER TABLE {quote(name)} ALTER COLUMN id DROP DEFAULT")
+        detached.append((name, _archive_partition(connection, name, archive_dir) if archive_dir else None))
+        logger.info(f"Detached transaction partition {name} from {db_alias}")
+    return detached
+
+
+def _archive_partition(connection, name, archive_dir):
+    """COPY a detached partition to <archive_dir>/<name>.csv.gz, then drop it"""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        with gzip.open(f"{path}.tmp", 'wt', encoding='utf-8', newline='') as f:
+            cursor.copy_expert(f"COPY {quote(name)} TO STDOUT WITH (FORMAT csv, HEADER true)", f)
+        os.replace(f"{path}.tmp", path)
+        # Only dropped once the archive is complete on disk
+        cursor.execute(f"DROP TABLE {quote(name)}")
+    return path
@@ -0,0 +1,119 @@
+# data_management/services/phones.py
+
+import logging
+import re
+
+from django.db import DatabaseError, transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COUNTRIES = ['ID']  # when the tenant has no campaign settings
+
+# Calling code, national number lengths (without the trunk prefix) and
+# whether numbers are dialled nationally with a leading 0
+PHONE_COUNTRIES = {
+    'ID': ('62', range(9, 13), True),   # Indonesia
+    'MY': ('60', range(9, 11), True),   # Malaysia
+    'TH': ('66', range(8, 10), True),   # Thailand
+    'SG': ('65', (8,), False),          # Singapore
+    'PH': ('63', (10,), True),          # Philippines
+    'KH': ('855', (8, 9), True),        # Cambodia
+    'VN': ('84', (9,), True),           # Vietnam
+    'LA': ('856', range(8, 11), True),  # Laos
+    'MM': ('95', range(7, 11), True),   # Myanmar
+    'BN': ('673', (7,), False),         # Brunei
+}
+E164_DIGITS = range(8, 16)
+
+
+def normalize_phone(raw, countries=DEFAULT_COUNTRIES):
+    """
+    E.164 form (+<calling code><number>) of a phone number as exported,
+    or '' when it cannot be read as one. Numbers written with + or 00 are
+    taken as international; otherwise the first of ``countries`` whose
+    calling code or national format fits wins (so list the primary
+    country first).
+    """
+    if raw is None:
+        return ''
+    # pandas reads an all-digit column as numbers (floats when some are missing)
+    if isinstance(raw, float):
+        raw = int(raw) if raw.is_integer() else ''
+    text = re.sub(r'\.0$', '', str(raw).strip())
+    digits = re.sub(r'\D', '', text)
+    if not digits:
+        return ''
+
+    if text.startswith('+') or digits.startswith('00'):
+        international = digits if text.startswith('+') else digits[2:]
+        return f"+{international}" if len(international) in E164_DIGITS else ''
+
+    known = [PHONE_COUNTRIES[country] for country in countries if country in PHONE_COUNTRIES]
+    for code, lengths, _ in known:
+        # International number without the +, e.g. 6281234567890
+        if digits.startswith(code) and len(digits) - len(code) in lengths:
+            return f"+{digits}"
+    for code, lengths, trunk in known:
+        national = digits[1:] if trunk and digits.startswith('0') else digits
+        if len(national) in lengths and not national.startswith('0'):
+            return f"+{code}{national}"
+    return ''
+
+
+def tenant_phone_countries(db_alias):
+    """
+    Countries the tenant's members' phone numbers are read as: the primary
+    and supported countries of its campaign settings, primary first
+    """
+    from marketing_campaigns.models import TenantCampaignSettings
+    from tenants.models import Tenant
+
+    tenant = Tenant.objects.using('default').filter(db_alias=db_alias).first()
+    if tenant is None:
+        return DEFAULT_COUNTRIES
+    try:
+        # Savepoint: a tenant DB without the table must not break the caller's transaction
+        with transaction.atomic(using=db_alias):
+            settings = TenantCampaignSettings.objects.using(db_alias).filter(tenant_id=tenant.pk).first()
+    except DatabaseError:
+        logger.warning(f"No campaign settings table on {db_alias}; reading phone numbers as {DEFAULT_COUNTRIES}")
+        return DEFAULT_COUNTRIES
+    if settings is None:
+        return DEFAULT_COUNTRIES
+
+    countries = [settings.primary_country_code] + list(settings.supported_countries or [])
+    return [country for country in dict.fromkeys(countries) if country in PHONE_COUNTRIES] or DEFAULT_COUNTRIES
+
+
+def backfill_phone_e164(db_alias, countries, batch_size=5000, everyone=False, model=None):
+    """
+    Fill Member.phone_e164 from handphone, ``batch_size`` members per
+    query and bulk update (each its own transaction, so a large table is
+    never locked as a whole). Only members without one unless
+    ``everyone``; ``model`` is the Member class to use (a migration's
+    historical model). Returns (members updated, unreadable numbers).
+    """
+    if model is None:
+        from data_management.models import Member as model
+
+    members = model.objects.using(db_alias).order_by('pk').only('pk', 'handphone', 'phone_e164')
+    if not everyone:
+        members = members.filter(phone_e164='')
+
+    updated = unreadable = 0
+    last_pk = 0
+    while True:
+        batch = list(members.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return updated, unreadable
+        last_pk = batch[-1].pk
+
+        changed = []
+        for member in batch:
+            phone = normalize_phone(member.handphone, countries)
+            unreadable += not phone
+            if phone != member.phone_e164:
+                member.phone_e164 = phone
+                changed.append(member)
+        model.objects.using(db_alias).bulk_update(changed, ['phone_e164'])
+        updated += len(changed)
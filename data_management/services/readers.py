@@ -0,0 +1,182 @@
+# data_management/services/readers.py
+
+import codecs
+import datetime
+import io
+import logging
+import os
+from decimal import Decimal
+
+import openpyxl
+import pandas as pd
+
+from .import_service import get_import_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 50000        # rows per DataFrame chunk
+ENCODING_SCAN_BLOCK = 1024 * 1024  # bytes read per step while sniffing the encoding
+
+
+def detect_encoding(file_path):
+    """
+    Return 'utf-8-sig' if the whole file decodes as UTF-8, otherwise
+    'latin-1' (the same fallback the upload view has always used).
+    The file is scanned block by block with an incremental decoder, so
+    memory use does not depend on file size.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    with open(file_path, 'rb') as f:
+        try:
+            while True:
+                block = f.read(ENCODING_SCAN_BLOCK)
+                if not block:
+                    decoder.decode(b'', final=True)
+                    return 'utf-8-sig'
+                decoder.decode(block)
+        except UnicodeDecodeError:
+            return 'latin-1'
+
+
+def iter_csv_chunks(file_path, chunksize=None):
+    """
+    Yield the CSV at ``file_path`` as DataFrames of ``chunksize`` rows.
+
+    Uses the C parser and lets pandas decode the stream incrementally,
+    so only one chunk is in memory at a time. The chunk index keeps
+    counting across chunks, so ``index + 2`` is still the file line number.
+    """
+    chunksize = chunksize or get_import_config().get('CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    encoding = detect_encoding(file_path)
+    logger.debug(f"Reading {file_path} as {encoding} in chunks of {chunksize} rows")
+
+    try:
+        reader = pd.read_csv(
+            file_path,
+            sep=',',
+            quotechar='"',
+            encoding=encoding,
+            chunksize=chunksize,
+        )
+    except pd.errors.EmptyDataError:
+        raise ValueError('CSV file is empty')
+
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+
+class _ByteRange(io.RawIOBase):
+    """
+    Raw stream over ``prefix`` followed by bytes [start, end) of an open
+    binary file, so pandas can parse one slice of a CSV under the file's
+    header line without the slice being copied into memory.
+    """
+
+    def __init__(self, f, start, end, prefix=b''):
+        self._file = f
+        self._file.seek(start)
+        self._remaining = end - start
+        self._prefix = prefix
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            size = min(len(buffer), len(self._prefix))
+            buffer[:size] = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+            return size
+        if self._remaining <= 0:
+            return 0
+        data = self._file.read(min(len(buffer), self._remaining))
+        self._remaining -= len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def iter_csv_range_chunks(file_path, start, end, encoding, chunksize=None):
+    """
+    Like ``iter_csv_chunks`` for the bytes [start, end) of the CSV, which
+    must begin and end on line boundaries. The file's header line is put
+    in front, so the chunk index restarts at 0 for every range.
+    """
+    chunksize = chunksize or get_import_config().get('CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        stream = io.BufferedReader(_ByteRange(f, start, end, prefix=header), buffer_size=ENCODING_SCAN_BLOCK)
+        reader = pd.read_csv(stream, sep=',', quotechar='"', encoding=encoding, chunksize=chunksize)
+        with reader:
+            for chunk in reader:
+                yield chunk
+
+
+def _xlsx_cell_text(value):
+    """
+    Render an XLSX cell the way the CSV export would spell it, so both
+    formats go through the same string validation. Date cells are
+    written day-first (DD-MM-YYYY HH:MM:SS) to match the day-first
+    parser, and integral floats lose their trailing ``.0``.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%d-%m-%Y %H:%M:%S')
+    if isinstance(value, datetime.date):
+        return value.strftime('%d-%m-%Y')
+    if isinstance(value, datetime.time):
+        return value.isoformat()
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        return format(Decimal(repr(value)), 'f')
+    return str(value)
+
+
+def iter_xlsx_chunks(file_path, chunksize=None):
+    """
+    Yield the first worksheet of the workbook at ``file_path`` as
+    DataFrames of ``chunksize`` rows, like ``iter_csv_chunks``.
+
+    openpyxl's read-only mode streams rows from the sheet XML instead of
+    building the whole workbook. Blank rows are dropped but the index
+    still follows the sheet, so ``index + 2`` is the Excel row number.
+    """
+    chunksize = chunksize or get_import_config().get('CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    logger.debug(f"Reading {file_path} as XLSX in chunks of {chunksize} rows")
+
+    try:
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    except Exception as e:
+        raise ValueError(f'Could not open Excel file: {e}')
+
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None or all(cell is None for cell in header):
+            raise ValueError('Excel file is empty')
+        columns = [str(cell).strip() if cell is not None else '' for cell in header]
+
+        records, index = [], []
+        for position, row in enumerate(rows):
+            if all(cell is None for cell in row):
+                continue
+            cells = [_xlsx_cell_text(cell) for cell in row[:len(columns)]]
+            records.append(cells + [None] * (len(columns) - len(cells)))
+            index.append(position)
+            if len(records) >= chunksize:
+                yield pd.DataFrame(records, columns=columns, index=index, dtype=object)
+                records, index = [], []
+        if records:
+            yield pd.DataFrame(records, columns=columns, index=index, dtype=object)
+    finally:
+        # Read-only workbooks keep the archive open until closed
+        workbook.close()
+
+
+def iter_file_chunks(file_path, chunksize=None):
+    """Stream an upload as DataFrame chunks, picking the reader by extension"""
+    if os.path.splitext(file_path)[1].lower() == '.xlsx':
+        return iter_xlsx_chunks(file_path, chunksize)
+    return iter_csv_chunks(file_path, chunksize)
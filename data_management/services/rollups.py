@@ -0,0 +1,186 @@
+# data_management/services/rollups.py
+
+import logging
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import router, transaction
+from django.db.models import Count, Exists, Max, Min, OuterRef, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from data_management.models import DailyTransactionRollup, Member, Transaction
+from .partitions import add_months
+
+logger = logging.getLogger(__name__)
+
+DEPOSIT_EVENTS = ['Deposit', 'Manual Deposit']
+
+ROLLUP_FIELDS = [
+    'transaction_count', 'amount', 'user_count',
+    'new_member_transaction_count', 'new_member_amount', 'new_member_user_count',
+]
+
+
+def local_day(value):
+    """Calendar day of a stored datetime, as the reports' date filters see it"""
+    if timezone.is_aware(value):
+        value = value.astimezone(timezone.get_current_timezone())
+    return value.date()
+
+
+def rollups_ready(using=None):
+    """
+    True once the tenant's rollups (the current tenant's by default) have
+    been built, or there is nothing to roll up yet. Until then reports
+    compute from the transactions and imports leave the rollup table alone,
+    so it never holds a partial history.
+    """
+    using = using or router.db_for_read(DailyTransactionRollup)
+    return (
+        DailyTransactionRollup.objects.using(using).exists()
+        or not Transaction.objects.using(using).exists()
+    )
+
+
+def _day_ranges(days):
+    """Merge sorted days into (first, last) runs of consecutive days"""
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+
+def _in_days(days):
+    """Q selecting transactions processed on one of ``days`` (index-friendly ranges, not a cast)"""
+    return reduce(or_, (
+        Q(process_date__gte=first, process_date__lt=last + timedelta(days=1)) for first, last in _day_ranges(days)
+    ))
+
+
+def compute_daily_rollups(using, days):
+    """
+    Unsaved DailyTransactionRollup rows for ``days`` computed from the
+    transactions: two grouped queries (per event, and all deposits), the
+    new-member split coming from a lookup of each username's join date.
+    """
+    days = sorted(set(days))
+    if not days:
+        return []
+
+    new_member = Member.objects.using(using).filter(
+        username=OuterRef('username'), join_date__date=OuterRef('day')
+    )
+    transactions = Transaction.objects.using(using).filter(_in_days(days)).annotate(
+        day=TruncDate('process_date'), is_new=Exists(new_member)
+    )
+    totals = {
+        'transaction_count': Count('id'),
+        'amount_total': Sum('amount'),  # 'amount' would clash with the column
+        'user_count': Count('username', distinct=True),
+        'new_member_transaction_count': Count('id', filter=Q(is_new=True)),
+        'new_member_amount': Sum('amount', filter=Q(is_new=True)),
+        'new_member_user_count': Count('username', distinct=True, filter=Q(is_new=True)),
+    }
+
+    rows = list(transactions.values('day', 'event').annotate(**totals).order_by())
+    rows += [
+        dict(row, event=DailyTransactionRollup.ALL_DEPOSITS)
+        for row in transactions.filter(event__in=DEPOSIT_EVENTS).values('day').annotate(**totals).order_by()
+    ]
+    wanted = set(days)
+    return [
+        DailyTransactionRollup(amount=row.pop('amount_total') or 0, **dict(
+            row, new_member_amount=row['new_member_amount'] or 0
+        ))
+        for row in rows if row['day'] in wanted
+    ]
+
+
+def refresh_daily_rollups(using, days):
+    """
+    Recompute the rollup rows of ``days`` (e.g. the days an import wrote
+    to). Writers check rollups_ready() before they change anything and
+    only refresh when it was True. Rows are upserted on (day, event), so
+    concurrent refreshes of the same day (e.g. two imports finishing
+    together) do not collide. Returns the number of rows written.
+    """
+    days = sorted(set(days))
+    if not days:
+        return 0
+    rollups = DailyTransactionRollup.objects.using(using)
+    with transaction.atomic(using=using):
+        rows = compute_daily_rollups(using, days)
+        rollups.bulk_create(
+            rows, update_conflicts=True, unique_fields=['day', 'event'], update_fields=ROLLUP_FIELDS + ['updated_at']
+        )
+        # Events the days no longer have (e.g. an update moved their rows away)
+        current = {(row.day, row.event) for row in rows}
+        gone = [
+            pk for pk, day, event in rollups.filter(day__in=days).values_list('pk', 'day', 'event')
+            if (day, event) not in current
+        ]
+        rollups.filter(pk__in=gone).delete()
+    logger.debug(f"Refreshed {len(rows)} daily rollups on {using} for {len(days)} days")
+    return len(rows)
+
+
+def rebuild_daily_rollups(using, months=1):
+    """
+    Rebuild every rollup row from the transactions, ``months`` months of
+    process dates per query. Returns the number of rows written.
+    """
+    span = Transaction.objects.using(using).aggregate(first=Min('process_date'), last=Max('process_date'))
+    written = 0
+    with transaction.atomic(using=using):
+        DailyTransactionRollup.objects.using(using).all().delete()
+        day = local_day(span['first']) if span['first'] else None
+        while day is not None and day <= local_day(span['last']):
+            end = min(local_day(span['last']), add_months(day, months) - timedelta(days=1))
+            rows = compute_daily_rollups(using, [day + timedelta(days=n) for n in range((end - day).days + 1)])
+            DailyTransactionRollup.objects.using(using).bulk_create(rows)
+            written += len(rows)
+            day = end + timedelta(days=1)
+    logger.info(f"Rebuilt {written} daily rollups on {using}")
+    return written
+
+
+def daily_rollups(start_date, end_date, using=None):
+    """
+    {(day, event): DailyTransactionRollup} from ``start_date`` to
+    ``end_date`` inclusive. A day and event without transactions has no
+    row; ``rollup_for`` stands in a zero one.
+    """
+    using = using or router.db_for_read(DailyTransactionRollup)
+    return {
+        (rollup.day, rollup.event): rollup
+        for rollup in DailyTransactionRollup.objects.using(using).filter(day__range=(start_date, end_date))
+    }
+
+
+def computed_daily_rollups(start_date, end_date, using=None):
+    """
+    The same {(day, event): DailyTransactionRollup} as ``daily_rollups``,
+    computed from the transactions (two grouped queries for the whole
+    range), for tenants whose rollups are not built yet
+    """
+    using = using or router.db_for_read(Transaction)
+    days = [start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)]
+    return {(rollup.day, rollup.event): rollup for rollup in compute_daily_rollups(using, days)}
+
+
+def rollup_for(rollups, day, event):
+    return rollups.get((day, event)) or DailyTransactionRollup(day=day, event=event)
+
+
+def member_signups(start_date, end_date, using=None):
+    """{day: members who joined that day} from ``start_date`` to ``end_date`` inclusive (one query)"""
+    using = using or router.db_for_read(Member)
+    joined = Member.objects.using(using).filter(
+        join_date__gte=start_date, join_date__lt=end_date + timedelta(days=1)
+    ).annotate(day=TruncDate('join_date')).values('day').annotate(count=Count('id')).order_by()
+    return {row['day']: row['count'] for row in joined}
@@ -0,0 +1,514 @@
+# data_management/services/staging_import.py
+
+import csv
+import logging
+import os
+
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from data_management.models import Member, Transaction
+from .error_files import ErrorFile
+from .import_service import (
+    DUPLICATE_ERROR, DUPLICATE_SKIP, DUPLICATE_UPDATE, EVENT_LOOKUP, TRANSACTION_REQUIRED_FIELDS,
+    json_safe, store_error_log,
+)
+from .member_stats import member_stats_ready, refresh_member_stats
+from .partitions import is_partitioned, lock_transaction_keys
+from .readers import detect_encoding
+from .rollups import refresh_daily_rollups, rollups_ready
+
+logger = logging.getLogger(__name__)
+
+FETCH_SIZE = 10000  # rejected rows read per round trip from the server-side cursor
+
+# Day-first export dates (DD-MM-YYYY or DD/MM/YYYY, optional HH:MM[:SS]);
+# ISO dates are turned day-first first. This is narrower than the
+# pd.to_datetime parsing in BulkImporter: month names, two-digit years and
+# the like are rejected as invalid dates instead of being guessed.
+DATE_PATTERN = r'^(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?$'
+ISO_DATE_PATTERN = r'^(\d{4})-(\d{1,2})-(\d{1,2})'
+
+
+def _date_parts_sql(value):
+    """SQL matching a raw date against DATE_PATTERN: text[] of its parts, or NULL"""
+    return f"regexp_match(regexp_replace(btrim({value}), '{ISO_DATE_PATTERN}', '\\3-\\2-\\1'), '{DATE_PATTERN}')"
+
+
+def _timestamp_sql(parts):
+    """
+    SQL building a timestamp from ``_date_parts_sql`` output. Out-of-range
+    parts give NULL instead of raising, so one bad value cannot abort the
+    whole statement.
+    """
+    return f"""CASE
+        WHEN {parts} IS NULL THEN NULL
+        WHEN {parts}[3]::int < 1 OR {parts}[2]::int NOT BETWEEN 1 AND 12 THEN NULL
+        WHEN {parts}[1]::int NOT BETWEEN 1 AND extract(
+             day FROM make_date({parts}[3]::int, {parts}[2]::int, 1) + interval '1 month - 1 day')::int THEN NULL
+        WHEN coalesce({parts}[4], '0')::int > 23 OR coalesce({parts}[5], '0')::int > 59
+             OR coalesce({parts}[6], '0')::int > 59 THEN NULL
+        ELSE make_timestamp({parts}[3]::int, {parts}[2]::int, {parts}[1]::int, coalesce({parts}[4], '0')::int,
+                            coalesce({parts}[5], '0')::int, coalesce({parts}[6], '0')::float8)
+    END"""
+
+
+def staging_supported(db_alias, file_type, file_path):
+    """The staging path needs PostgreSQL and a transaction CSV"""
+    return (
+        connections[db_alias].vendor == 'postgresql'
+        and file_type == 'transaction'
+        and os.path.splitext(file_path)[1].lower() == '.csv'
+    )
+
+
+class _CopySource:
+    """
+    File-like wrapper handed to COPY FROM STDIN. Blank lines are dropped,
+    as pandas does, so staged line numbers match the Python importer's.
+    """
+
+    def __init__(self, f):
+        self._lines = (line for line in f if line.strip())
+        self._buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            data, self._buffer = self._buffer, ''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class StagingImporter:
+    """
+    Transaction import that lets PostgreSQL do the work: the raw CSV is
+    COPYed into an unlogged staging table, parsed, normalized and checked
+    for duplicates with set-based SQL, and the valid rows are moved into
+    data_management_transaction with a single INSERT ... SELECT.
+
+    Exposes the same result API as BulkImporter (counts, ``summary``,
+    ``checkpoint_state``, ``write_error_log``) so job_service can treat
+    both alike. Error messages follow BulkImporter's wording, but dates are
+    only read in the formats DATE_PATTERN accepts.
+    """
+
+    file_type = 'transaction'
+
+    def __init__(self, db_alias, name, duplicate_mode=DUPLICATE_ERROR, error_path=None, on_progress=None):
+        """
+        Args:
+            db_alias: Tenant database alias
+            name: Unique suffix for the staging tables (e.g. the job id)
+            duplicate_mode: 'error', 'skip' or 'update' (see DUPLICATE_MODES)
+            error_path: Where rejected rows are written (gzip CSV)
+            on_progress: Optional callable(phase) invoked between phases,
+                outside any transaction, so a job can record a heartbeat
+        """
+        self.db_alias = db_alias
+        self.connection = connections[db_alias]
+        self.duplicate_mode = duplicate_mode
+        self.error_file = ErrorFile(error_path) if error_path else None
+        self.on_progress = on_progress
+
+        self.columns = []  # CSV header, set by run()
+        self.raw_table = f"import_stage_{name}_raw"
+        self.parsed_table = f"import_stage_{name}_parsed"
+
+        self.total_rows = 0
+        self.inserted_count = 0
+        self.updated_count = 0
+        self.skipped_count = 0
+        self.error_count = 0
+        self.first_record = None
+        self.last_record = None
+        self.first_error = None
+        self.last_error = None
+
+    # ------------------------------------------------------------------
+    # Result API shared with BulkImporter
+    # ------------------------------------------------------------------
+
+    @property
+    def success_count(self):
+        return self.inserted_count + self.updated_count
+
+    @property
+    def rows_processed(self):
+        return self.total_rows
+
+    def checkpoint_state(self):
+        return {
+            'row': self.total_rows + 1,
+            'inserted': self.inserted_count,
+            'updated': self.updated_count,
+            'skipped': self.skipped_count,
+            'failed': self.error_count,
+            'first_record': self.first_record,
+            'last_record': self.last_record,
+            'first_error': self.first_error,
+            'last_error': self.last_error,
+        }
+
+    def summary(self):
+        return {
+            'record_count': self.success_count,
+            'error_count': self.error_count,
+            'duplicate_mode': self.duplicate_mode,
+            'inserted_count': self.inserted_count,
+            'updated_count': self.updated_count,
+            'skipped_count': self.skipped_count,
+            'first_record': self.first_record,
+            'last_record': self.last_record,
+            'first_error': self.first_error,
+            'last_error': self.last_error,
+            'staging': True,
+        }
+
+    def write_error_log(self, tenant_id, upload_time):
+        return store_error_log(
+            self.db_alias, tenant_id, upload_time, self.file_type,
+            self.error_file.file_path, self.error_count, self.success_count
+        )
+
+    # ------------------------------------------------------------------
+    # Import
+    # ------------------------------------------------------------------
+
+    def run(self, file_path, on_committed=None):
+        """
+        Import ``file_path``. Only the final INSERT runs in a transaction;
+        ``on_committed(importer)`` is called inside it so a job can save
+        its results atomically with the data.
+        """
+        encoding = detect_encoding(file_path)
+        with open(file_path, 'r', encoding=encoding, newline='') as f:
+            header = next(csv.reader([f.readline()]), [])
+        if not header:
+            raise ValueError('CSV file is empty')
+        self.columns = [column.strip() for column in header]
+
+        try:
+            with self.connection.cursor() as cursor:
+                self._drop_tables(cursor)
+                self._copy(cursor, file_path, encoding)
+                self._progress('copied')
+                self._parse(cursor)
+                self._progress('validated')
+                self._count(cursor)
+                self._extract_errors()
+                self._extract_records(cursor)
+                self._progress('errors extracted')
+
+                with transaction.atomic(using=self.db_alias):
+                    maintain_rollups = rollups_ready(self.db_alias)
+                    maintain_member_stats = member_stats_ready(self.db_alias)
+                    days = self._written_days(cursor)
+                    self._move_rows(cursor)
+                    if maintain_rollups:
+                        refresh_daily_rollups(self.db_alias, days)
+                    if maintain_member_stats:
+                        refresh_member_stats(self.db_alias, self._written_usernames(cursor))
+                    if on_committed:
+                        on_committed(self)
+        finally:
+            with self.connection.cursor() as cursor:
+                self._drop_tables(cursor)
+
+        logger.info(
+            f"Staged import into {self.db_alias}: {self.total_rows} rows, {self.inserted_count} inserted, "
+            f"{self.updated_count} updated, {self.skipped_count} skipped, {self.error_count} failed"
+        )
+        return self
+
+    def _progress(self, phase):
+        logger.debug(f"Staged import {self.raw_table}: {phase}")
+        if self.on_progress:
+            self.on_progress(phase)
+
+    def _drop_tables(self, cursor):
+        for table in (self.parsed_table, self.raw_table):
+            cursor.execute(f"DROP TABLE IF EXISTS {self._quote(table)}")
+
+    def _quote(self, name):
+        return self.connection.ops.quote_name(name)
+
+    def _raw_column(self, field):
+        """SQL for the raw text of CSV column ``field`` (NULL if the file lacks it)"""
+        if field in self.columns:
+            return f"c{self.columns.index(field)}"
+        return "NULL::text"
+
+    def _copy(self, cursor, file_path, encoding):
+        # Every CSV column lands as text; line is the 1-based data row, so
+        # line + 1 is the file line BulkImporter reports
+        column_defs = ', '.join(f"c{i} text" for i in range(len(self.columns)))
+        column_list = ', '.join(f"c{i}" for i in range(len(self.columns)))
+        cursor.execute(
+            f"CREATE UNLOGGED TABLE {self._quote(self.raw_table)} (line bigserial PRIMARY KEY, {column_defs})"
+        )
+        with open(file_path, 'r', encoding=encoding, newline='') as f:
+            cursor.copy_expert(
+                f"COPY {self._quote(self.raw_table)} ({column_list}) FROM STDIN WITH (FORMAT csv, HEADER true)",
+                _CopySource(f)
+            )
+
+    def _parse(self, cursor):
+        """
+        Parse and validate every staged row in one statement. ``reason``
+        holds the first failed check in BulkImporter's order; valid rows
+        get typed columns and a duplicate rank on the natural key.
+        """
+        username = self._raw_column('USERNAME')
+        event = self._raw_column('EVENT')
+        amount = self._raw_column('AMOUNT')
+        create_date = self._raw_column('CREATE DATE')
+        process_date = self._raw_column('PROCESS DATE')
+        process_by = self._raw_column('PROCESS BY')
+
+        missing_checks = '\n'.join(
+            f"WHEN nullif(btrim({self._raw_column(field)}), '') IS NULL THEN 'Missing field: {field}'"
+            for field in TRANSACTION_REQUIRED_FIELDS
+        )
+        events = ', '.join(f"('{key}', '{value}')" for key, value in EVENT_LOOKUP.items())
+        username_length = Transaction._meta.get_field('username').max_length
+        process_by_length = Transaction._meta.get_field('process_by').max_length
+        # numeric(max_digits, decimal_places): the largest amount the column holds
+        amount_field = Transaction._meta.get_field('amount')
+        amount_limit = 10 ** (amount_field.max_digits - amount_field.decimal_places)
+
+        # Valid rows are ranked on the natural key: rank 1 is written, later
+        # repeats are duplicates ('update' keeps the last one instead)
+        rank_order = 'DESC' if self.duplicate_mode == DUPLICATE_UPDATE else 'ASC'
+        target = self._quote(Transaction._meta.db_table)
+
+        # MATERIALIZED keeps the planner from inlining the CTEs, which would
+        # repeat the date parsing in every CASE branch, sort key and join
+        cursor.execute(f"""
+            CREATE UNLOGGED TABLE {self._quote(self.parsed_table)} AS
+            WITH typed AS MATERIALIZED (
+                SELECT r.*,
+                       r.line + 1 AS row_number,
+                       btrim({username}) AS username,
+                       e.event,
+                       regexp_replace(btrim({amount}, '"'), '[^0-9.]', '', 'g') AS amount_text,
+                       {_date_parts_sql(create_date)} AS create_parts,
+                       {_date_parts_sql(process_date)} AS process_parts,
+                       {process_by} AS process_by
+                FROM {self._quote(self.raw_table)} r
+                LEFT JOIN (VALUES {events}) AS e(key, event) ON e.key = lower(btrim({event}))
+            ),
+            dated AS MATERIALIZED (
+                SELECT typed.*,
+                       {_timestamp_sql('create_parts')} AS create_local,
+                       {_timestamp_sql('process_parts')} AS process_local
+                FROM typed
+            ),
+            checked AS MATERIALIZED (
+                SELECT dated.*,
+                       CASE
+                           {missing_checks}
+                           WHEN create_local IS NULL THEN 'Invalid CREATE DATE: ' || {create_date}
+                           WHEN process_local IS NULL THEN 'Invalid PROCESS DATE: ' || {process_date}
+                           WHEN create_local::time = '00:00:00' THEN 'Missing time in CREATE DATE'
+                           WHEN process_local::time = '00:00:00' THEN 'Missing time in PROCESS DATE'
+                           WHEN event IS NULL THEN 'Invalid event: ' || btrim({event})
+                           WHEN amount_text !~ '^([0-9]+([.][0-9]*)?|[.][0-9]+)$'
+                               THEN 'Invalid amount: ' || btrim({amount}, '"')
+                           WHEN round(amount_text::numeric, {amount_field.decimal_places}) >= {amount_limit}
+                               THEN 'Amount out of range: ' || btrim({amount}, '"')
+                           WHEN length(username) > {username_length}
+                               THEN 'value too long for type character varying({username_length})'
+                           WHEN length(process_by) > {process_by_length}
+                               THEN 'value too long for type character varying({process_by_length})'
+                       END AS reason
+                FROM dated
+            ),
+            valid AS MATERIALIZED (
+                SELECT checked.*,
+                       CASE WHEN reason IS NULL THEN create_local AT TIME ZONE %(tz)s END AS create_date,
+                       CASE WHEN reason IS NULL THEN process_local AT TIME ZONE %(tz)s END AS process_date,
+                       CASE WHEN reason IS NULL
+                            THEN round(amount_text::numeric, {amount_field.decimal_places}) END AS amount
+                FROM checked
+            )
+            SELECT v.*,
+                   CASE WHEN v.reason IS NULL THEN row_number() OVER (
+                       PARTITION BY v.username, v.event, v.create_date, v.amount
+                       ORDER BY v.row_number {rank_order}
+                   ) END AS key_rank,
+                   t.id IS NOT NULL AS in_db
+            FROM valid v
+            LEFT JOIN {target} t
+                ON v.reason IS NULL
+               AND t.username = v.username AND t.event = v.event
+               AND t.create_date = v.create_date AND t.amount = v.amount
+        """, {'tz': timezone.get_current_timezone_name()})
+
+        if self.duplicate_mode == DUPLICATE_ERROR:
+            # Mirrors the unique constraint the row-by-row insert would hit
+            cursor.execute(f"""
+                UPDATE {self._quote(self.parsed_table)}
+                SET reason = CASE WHEN in_db THEN 'Duplicate transaction: already imported'
+                                  ELSE 'Duplicate transaction: repeated earlier in the file' END
+                WHERE reason IS NULL AND (in_db OR key_rank > 1)
+            """)
+        cursor.execute(f"ANALYZE {self._quote(self.parsed_table)}")
+
+    def _count(self, cursor):
+        cursor.execute(f"""
+            SELECT count(*),
+                   count(*) FILTER (WHERE reason IS NOT NULL),
+                   count(*) FILTER (WHERE reason IS NULL AND key_rank = 1 AND NOT in_db),
+                   count(*) FILTER (WHERE reason IS NULL AND key_rank = 1 AND in_db),
+                   count(*) FILTER (WHERE reason IS NULL AND (key_rank > 1 OR in_db))
+            FROM {self._quote(self.parsed_table)}
+        """)
+        total, failed, new_rows, existing_rows, duplicates = cursor.fetchone()
+        self.total_rows = total
+        self.error_count = failed
+        self.inserted_count = new_rows
+        if self.duplicate_mode == DUPLICATE_UPDATE:
+            self.updated_count = existing_rows
+            self.skipped_count = duplicates - existing_rows
+        else:
+            self.skipped_count = duplicates
+
+    def _row_data(self, raw_values):
+        return json_safe(dict(zip(self.columns, raw_values)))
+
+    def _extract_errors(self):
+        """Stream rejected rows, in file order, from a server-side cursor into the error file"""
+        if not self.error_count or not self.error_file:
+            return
+        raw_columns = ', '.join(f"c{i}" for i in range(len(self.columns)))
+        with transaction.atomic(using=self.db_alias):
+            cursor = self.connection.chunked_cursor()
+            try:
+                cursor.execute(f"""
+                    SELECT row_number, reason, {raw_columns}
+                    FROM {self._quote(self.parsed_table)}
+                    WHERE reason IS NOT NULL
+                    ORDER BY row_number
+                """)
+                while True:
+                    rows = cursor.fetchmany(FETCH_SIZE)
+                    if not rows:
+                        break
+                    errors = [
+                        {'row': row[0], 'error': row[1], 'data': self._row_data(row[2:])}
+                        for row in rows
+                    ]
+                    self.error_file.write(errors)
+                    if self.first_error is None:
+                        self.first_error = errors[0]
+                    self.last_error = errors[-1]
+            finally:
+                cursor.close()
+
+    def _extract_records(self, cursor):
+        """First and last written rows, for the upload summary"""
+        raw_columns = ', '.join(f"c{i}" for i in range(len(self.columns)))
+        for direction, attribute in (('ASC', 'first_record'), ('DESC', 'last_record')):
+            cursor.execute(f"""
+                SELECT {raw_columns}
+                FROM {self._quote(self.parsed_table)}
+                WHERE reason IS NULL AND key_rank = 1 AND NOT (in_db AND %(skip_existing)s)
+                ORDER BY row_number {direction}
+                LIMIT 1
+            """, {'skip_existing': self.duplicate_mode != DUPLICATE_UPDATE})
+            row = cursor.fetchone()
+            setattr(self, attribute, self._row_data(row) if row else None)
+
+    def _written_days(self, cursor):
+        """Days the move adds rows to or, in 'update' mode, moves existing rows away from"""
+        parsed = self._quote(self.parsed_table)
+        if self.duplicate_mode != DUPLICATE_UPDATE:
+            cursor.execute(f"""
+                SELECT DISTINCT process_date::date FROM {parsed} WHERE reason IS NULL AND key_rank = 1 AND NOT in_db
+            """)
+        else:
+            cursor.execute(f"""
+                SELECT process_date::date FROM {parsed} WHERE reason IS NULL AND key_rank = 1
+                UNION
+                SELECT t.process_date::date
+                FROM {self._quote(Transaction._meta.db_table)} t
+                JOIN {parsed} p
+                  ON p.reason IS NULL AND p.key_rank = 1 AND p.in_db
+                 AND t.username = p.username AND t.event = p.event
+                 AND t.create_date = p.create_date AND t.amount = p.amount
+            """)
+        return [row[0] for row in cursor.fetchall()]
+
+    def _written_usernames(self, cursor):
+        """Users the move adds or (in 'update' mode) rewrites transactions of"""
+        cursor.execute(f"""
+            SELECT DISTINCT username FROM {self._quote(self.parsed_table)}
+            WHERE reason IS NULL AND key_rank = 1 AND NOT (in_db AND %(skip_existing)s)
+        """, {'skip_existing': self.duplicate_mode != DUPLICATE_UPDATE})
+        return [row[0] for row in cursor.fetchall()]
+
+    def _move_rows(self, cursor):
+        """Single INSERT ... SELECT of the valid rows into the transaction table"""
+        target = self._quote(Transaction._meta.db_table)
+        partitioned = is_partitioned(self.db_alias)
+        if partitioned:
+            # in_db was read before the lock; another writer may have added
+            # one of the new keys since. Fail like the unique constraint would
+            lock_transaction_keys(self.db_alias)
+            cursor.execute(f"""
+                SELECT EXISTS (
+                    SELECT 1 FROM {self._quote(self.parsed_table)} p
+                    JOIN {target} t
+                        ON t.username = p.username AND t.event = p.event
+                       AND t.create_date = p.create_date AND t.amount = p.amount
+                    WHERE p.reason IS NULL AND p.key_rank = 1 AND NOT p.in_db
+                )
+            """)
+            if cursor.fetchone()[0]:
+                raise IntegrityError('Duplicate transaction: imported concurrently by another job')
+        codes = ', '.join(f"('{event}', {code})" for event, code in Transaction.EVENT_CODES.items())
+        # Compact keys come along: the member with the username (if already
+        # imported) and the event's code
+        select = f"""
+            INSERT INTO {target} (username, event, amount, create_date, process_date, process_by, member_id,
+                                  event_code)
+            SELECT p.username, p.event, p.amount, p.create_date, p.process_date, coalesce(p.process_by, ''), m.id,
+                   c.code
+            FROM {self._quote(self.parsed_table)} p
+            LEFT JOIN {self._quote(Member._meta.db_table)} m ON m.username = p.username
+            LEFT JOIN (VALUES {codes}) AS c(event, code) ON c.event = p.event
+            WHERE p.reason IS NULL AND p.key_rank = 1
+        """
+        if self.duplicate_mode == DUPLICATE_UPDATE and partitioned:
+            # No unique index on the natural key to upsert against; in_db
+            # already tells the existing rows apart. Changing process_date
+            # moves a row to its new partition.
+            cursor.execute(f"""
+                UPDATE {target} t
+                SET process_date = p.process_date, process_by = coalesce(p.process_by, ''),
+                    member_id = coalesce(t.member_id, m.id), event_code = c.code
+                FROM {self._quote(self.parsed_table)} p
+                LEFT JOIN {self._quote(Member._meta.db_table)} m ON m.username = p.username
+                LEFT JOIN (VALUES {codes}) AS c(event, code) ON c.event = p.event
+                WHERE p.reason IS NULL AND p.key_rank = 1 AND p.in_db
+                  AND t.username = p.username AND t.event = p.event
+                  AND t.create_date = p.create_date AND t.amount = p.amount
+            """)
+            cursor.execute(select + " AND NOT p.in_db")
+        elif self.duplicate_mode == DUPLICATE_UPDATE:
+            cursor.execute(select + f"""
+                ON CONFLICT (username, event, create_date, amount)
+                DO UPDATE SET process_date = EXCLUDED.process_date, process_by = EXCLUDED.process_by,
+                              member_id = coalesce({target}.member_id, EXCLUDED.member_id),
+                              event_code = EXCLUDED.event_code
+            """)
+        elif self.duplicate_mode == DUPLICATE_SKIP:
+            cursor.execute(select + " AND NOT p.in_db ON CONFLICT DO NOTHING")
+        else:
+            cursor.execute(select + " AND NOT p.in_db")
@@ -0,0 +1,99 @@
+# data_management/services/upload_registry.py
+
+import hashlib
+import logging
+import os
+
+from django.db import DatabaseError
+
+from data_management.models import UploadRecord
+
+logger = logging.getLogger(__name__)
+
+PREFIX_CANDIDATES = 20      # largest earlier uploads checked as a prefix of a new CSV
+HASH_BLOCK = 1024 * 1024
+
+
+def _prefix_digests(file_path, sizes):
+    """
+    SHA-256 of the first ``size`` bytes of the file for every size in
+    ``sizes``, computed in a single pass. Sizes that do not end on a line
+    break are left out, so a match always covers whole rows.
+    """
+    digests = {}
+    digest = hashlib.sha256()
+    position = 0
+    with open(file_path, 'rb') as f:
+        for size in sorted(sizes):
+            last_block = b''
+            while position < size:
+                block = f.read(min(HASH_BLOCK, size - position))
+                if not block:
+                    return digests
+                digest.update(block)
+                position += len(block)
+                last_block = block
+            if last_block.endswith(b'\n'):
+                digests[size] = digest.copy().hexdigest()
+    return digests
+
+
+def find_previous_upload(db_alias, tenant_id, file_type, file_path, file_hash):
+    """
+    Look the file up in the tenant's upload registry before it is parsed.
+
+    Returns (record, identical): the UploadRecord of a byte-identical
+    earlier upload with identical=True, or of the largest earlier CSV this
+    one starts with (an append-only export) with identical=False, or
+    (None, False).
+    """
+    records = UploadRecord.objects.using(db_alias).filter(tenant_id=tenant_id or 'default', file_type=file_type)
+
+    record = records.filter(file_hash=file_hash).first()
+    if record is not None:
+        return record, True
+
+    if os.path.splitext(file_path)[1].lower() != '.csv':
+        return None, False  # only plain CSV can grow by appending rows
+
+    candidates = list(
+        records.filter(file_size__lt=os.path.getsize(file_path)).order_by('-file_size')[:PREFIX_CANDIDATES]
+    )
+    if not candidates:
+        return None, False
+
+    digests = _prefix_digests(file_path, {candidate.file_size for candidate in candidates})
+    for candidate in candidates:
+        if digests.get(candidate.file_size) == candidate.file_hash:
+            return candidate, False
+    return None, False
+
+
+def record_upload(job, db_alias):
+    """
+    Register a completed job's file so later uploads of the same content
+    can be recognised. A job whose every row failed is not registered, so
+    the file can be uploaded again once the cause is fixed. A registry
+    failure is logged, never raised: the rows are already committed.
+    """
+    if not job.file_hash:
+        return None
+    if job.rows_failed >= job.rows_processed:
+        logger.info(f"Import job {job.pk}: no row of {job.file_name} was imported; not registering it")
+        return None
+    try:
+        record, _ = UploadRecord.objects.using(db_alias).update_or_create(
+            tenant_id=job.tenant_id or 'default',
+            file_type=job.file_type,
+            file_hash=job.file_hash,
+            defaults={
+                'file_size': job.file_size,
+                'row_count': job.skip_rows + job.rows_processed,
+                'import_job': job,
+                'error_log_id': job.error_log_id,
+            }
+        )
+    except DatabaseError:
+        logger.exception(f"Import job {job.pk}: could not add {job.file_name} to the upload registry")
+        return None
+    return record
@@ -0,0 +1,146 @@
+# data_management/tasks.py
+
+import logging
+from celery import chord, shared_task
+
+from tenants.context import set_current_db, clear_current_db
+from .services.drop_directory import ingest_drop_directory
+from .services.import_service import get_import_config
+from .services.job_service import run_import_job
+from .services.member_stats import refresh_recent_windows
+from .services.parallel_import import (
+    fail_partitioned_job, finish_partitioned_job, import_partition, start_partitioned_job,
+)
+from .services.partitions import DEFAULT_MONTHS_AHEAD, create_transaction_partitions, is_partitioned
+
+logger = logging.getLogger('data_management')
+
+# Large imports run far longer than the global CELERY_TASK_TIME_LIMIT
+IMPORT_TIME_LIMIT = get_import_config().get('TASK_TIME_LIMIT', 4 * 3600)
+
+
+@shared_task(bind=True, soft_time_limit=IMPORT_TIME_LIMIT, time_limit=IMPORT_TIME_LIMIT + 300)
+def process_import_job(self, job_id, db_alias):
+    """
+    Run a member/transaction upload in the background.
+    db_alias is passed explicitly so the worker writes to the tenant DB
+    the upload came from.
+    """
+    logger.info(f"[CELERY] Starting import job {job_id} on {db_alias}")
+    set_current_db(db_alias)
+    try:
+        job = run_import_job(job_id, db_alias)
+        return f"Import job {job_id} {job.status}"
+    finally:
+        clear_current_db()
+
+
+@shared_task(bind=True)
+def process_partitioned_import_job(self, job_id, db_alias):
+    """
+    Split a large CSV import into byte-range partitions and fan them out
+    as import_partition_task calls; finish_partitioned_import_task merges
+    their results once all of them have run. A partition task that dies
+    (time limit, lost worker) means the merge never runs, so
+    fail_partitioned_import_task marks the job failed instead.
+    """
+    logger.info(f"[CELERY] Partitioning import job {job_id} on {db_alias}")
+    partitions = start_partitioned_job(job_id, db_alias)
+    if partitions is None:
+        return f"Import job {job_id} not started"
+
+    chord(
+        import_partition_task.s(job_id, db_alias, partition) for partition in partitions
+    )(finish_partitioned_import_task.s(job_id, db_alias).on_error(fail_partitioned_import_task.s(job_id, db_alias)))
+    return f"Import job {job_id} split into {len(partitions)} partitions"
+
+
+@shared_task(bind=True, soft_time_limit=IMPORT_TIME_LIMIT, time_limit=IMPORT_TIME_LIMIT + 300)
+def import_partition_task(self, job_id, db_alias, partition):
+    """Import one byte range of a partitioned job"""
+    set_current_db(db_alias)
+    try:
+        return import_partition(job_id, db_alias, partition)
+    finally:
+        clear_current_db()
+
+
+@shared_task(bind=True)
+def finish_partitioned_import_task(self, results, job_id, db_alias):
+    """Chord callback: merge partition error logs and counts into the job"""
+    set_current_db(db_alias)
+    try:
+        job = finish_partitioned_job(job_id, db_alias, results)
+        return f"Import job {job_id} {job.status}"
+    finally:
+        clear_current_db()
+
+
+@shared_task  # not bound: Celery only passes (request, exc, traceback) to unbound error callbacks
+def fail_partitioned_import_task(request, exc, traceback, job_id, db_alias):
+    """Chord error callback: a partition task failed without returning a result"""
+    fail_partitioned_job(job_id, db_alias, f"A partition task failed: {exc}")
+
+
+@shared_task(bind=True, soft_time_limit=IMPORT_TIME_LIMIT, time_limit=IMPORT_TIME_LIMIT + 300)
+def ingest_drop_directories_task(self, tenant_id=None):
+    """
+    Import new export files from every tenant's drop directory (or one
+    tenant's). Meant for a periodic django-celery-beat schedule, e.g.
+    every 5 minutes.
+    """
+    from tenants.models import Tenant
+
+    tenants = Tenant.objects.using('default').filter(is_active=True)
+    if tenant_id:
+        tenants = tenants.filter(tenant_id=tenant_id)
+
+    imported = 0
+    for tenant in tenants:
+        set_current_db(tenant.db_alias)
+        try:
+            imported += len(ingest_drop_directory(tenant))
+        except Exception:
+            logger.exception(f"[CELERY] Drop directory ingestion failed for {tenant.tenant_id}")
+        finally:
+            clear_current_db()
+    return f"Imported {imported} dropped files"
+
+
+@shared_task(bind=True)
+def create_transaction_partitions_task(self, months_ahead=DEFAULT_MONTHS_AHEAD):
+    """
+    Keep the upcoming monthly transaction partitions of every partitioned
+    tenant ready, so imports never land in the default partition. Meant
+    for a daily django-celery-beat schedule; detaching and archiving old
+    months stays a manual manage_transaction_partitions run.
+    """
+    from tenants.models import Tenant
+
+    created = 0
+    for tenant in Tenant.objects.using('default').filter(is_active=True):
+        try:
+            if is_partitioned(tenant.db_alias):
+                created += len(create_transaction_partitions(tenant.db_alias, months_ahead=months_ahead))
+        except Exception:
+            logger.exception(f"[CELERY] Creating transaction partitions failed for {tenant.tenant_id}")
+    return f"Created {created} transaction partitions"
+
+
+@shared_task(bind=True)
+def refresh_member_stats_windows_task(self):
+    """
+    Move the recent (last 30 days) figures of every tenant's member stats
+    to end today, recomputing only users with activity in their old
+    window. Meant for a daily django-celery-beat schedule shortly after
+    midnight.
+    """
+    from tenants.models import Tenant
+
+    refreshed = 0
+    for tenant in Tenant.objects.using('default').filter(is_active=True):
+        try:
+            refreshed += refresh_recent_windows(tenant.db_alias)
+        except Exception:
+            logger.exception(f"[CELERY] Refreshing member stats windows failed for {tenant.tenant_id}")
+    return f"Refreshed member stats of {refreshed} users"
@@ -1,3 +1,465 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+import tracemalloc
+from decimal import Decimal
 
-# Create your tests here.
+import openpyxl
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from .models import ChunkedUpload, ImportJob, Transaction
+from .services.error_files import ErrorFile, ErrorLogRows
+from .services.compact import event_codes, event_filter
+from .services.import_service import STANDARD_EVENTS, BulkImporter
+from .services.member_stats import _stats
+from .services import parallel_import
+from .services.staging_import import _CopySource
+from .services.upload_registry import _prefix_digests, record_upload
+from .services.ingest_service import iter_ndjson, normalize_record
+from .services.drop_directory import drop_directory, pending_drop_files
+from .services.batch_service import _zip_members
+from .services.partitions import PARTITION_PATTERN, add_months, partition_name
+from .services.phones import normalize_phone
+from .services.rollups import _day_ranges, rollup_for
+from .services.readers import (
+    detect_encoding, iter_csv_chunks, iter_csv_range_chunks, iter_file_chunks, iter_xlsx_chunks
+)
+
+TRANSACTION_HEADER = 'USERNAME,EVENT,AMOUNT,CREATE DATE,PROCESS DATE,PROCESS BY\n'
+
+
+def write_transaction_csv(path, rows):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(TRANSACTION_HEADER)
+        for i in range(rows):
+            stamp = f"{(i % 28) + 1:02d}-09-2025 {(i % 23) + 1:02d}:{i % 60:02d}:{(i // 60) % 60:02d}"
+            f.write(f'user{i},Deposit,"{(i % 1000) * 1000:,}.00",{stamp},{stamp},system\n')
+
+
+class StreamingReaderTests(SimpleTestCase):
+    """Chunked CSV reading for large uploads (no database access)"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _peak_memory(self, path, chunksize):
+        importer = BulkImporter('default', 'transaction')
+        tracemalloc.start()
+        try:
+            rows = 0
+            for chunk in iter_csv_chunks(path, chunksize=chunksize):
+                rows += len(importer.validate_dataframe(chunk))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return rows, peak
+
+    def test_peak_memory_does_not_grow_with_file_size(self):
+        small_path = os.path.join(self.tmp_dir, 'small.csv')
+        large_path = os.path.join(self.tmp_dir, 'large.csv')
+        write_transaction_csv(small_path, 10000)
+        write_transaction_csv(large_path, 60000)
+
+        small_rows, small_peak = self._peak_memory(small_path, chunksize=2000)
+        large_rows, large_peak = self._peak_memory(large_path, chunksize=2000)
+
+        self.assertEqual(small_rows, 10000)
+        self.assertEqual(large_rows, 60000)
+        # Six times the rows must not need meaningfully more memory
+        self.assertLess(large_peak, small_peak * 1.5)
+
+    def test_row_numbers_continue_across_chunks(self):
+        path = os.path.join(self.tmp_dir, 'numbers.csv')
+        write_transaction_csv(path, 25)
+
+        importer = BulkImporter('default', 'transaction')
+        row_numbers = []
+        for chunk in iter_csv_chunks(path, chunksize=10):
+            row_numbers.extend(row_number for row_number, _, _ in importer.validate_dataframe(chunk))
+
+        self.assertEqual(row_numbers, list(range(2, 27)))
+
+    def test_latin1_fallback(self):
+        path = os.path.join(self.tmp_dir, 'latin1.csv')
+        with open(path, 'wb') as f:
+            f.write(TRANSACTION_HEADER.encode('latin-1'))
+            f.write('josé,Deposit,100,01-09-2025 10:00:00,01-09-2025 10:00:00,system\n'.encode('latin-1'))
+
+        self.assertEqual(detect_encoding(path), 'latin-1')
+        chunk = next(iter_csv_chunks(path))
+        self.assertEqual(chunk.iloc[0]['USERNAME'], 'josé')
+
+    def test_empty_file(self):
+        path = os.path.join(self.tmp_dir, 'empty.csv')
+        open(path, 'wb').close()
+
+        with self.assertRaisesMessage(ValueError, 'CSV file is empty'):
+            list(iter_csv_chunks(path))
+
+
+class XlsxReaderTests(SimpleTestCase):
+    """Read-only XLSX streaming feeds the same validation as CSV"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'transactions.xlsx')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _write_workbook(self, rows):
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(TRANSACTION_HEADER.strip().split(','))
+        for row in rows:
+            sheet.append(row)
+        workbook.save(self.path)
+
+    def test_native_cells_validate_like_csv(self):
+        stamp = datetime.datetime(2025, 9, 3, 10, 15, 0)
+        self._write_workbook([
+            ['alice', 'Deposit', 1500.5, stamp, stamp, 'system'],
+            ['bob', 'Withdraw', 200, '03-09-2025 11:00:00', '03-09-2025 11:00:00', 'system'],
+            [None, None, None, None, None, None],
+            ['carol', 'Deposit', 'abc', stamp, stamp, 'system'],
+        ])
+
+        importer = BulkImporter('default', 'transaction')
+        valid = []
+        for chunk in iter_file_chunks(self.path, chunksize=2):
+            valid.extend(importer.validate_dataframe(chunk))
+
+        self.assertEqual([row_number for row_number, _, _ in valid], [2, 3])
+        alice, bob = valid[0][2], valid[1][2]
+        self.assertEqual(alice.amount, Decimal('1500.50'))
+        self.assertEqual(bob.amount, Decimal('200'))
+        # 3 September, not 9 March
+        self.assertEqual((alice.create_date.month, alice.create_date.day), (9, 3))
+        self.assertEqual([error['row'] for error in importer.errors], [5])
+
+    def test_empty_workbook(self):
+        openpyxl.Workbook().save(self.path)
+
+        with self.assertRaisesMessage(ValueError, 'Excel file is empty'):
+            list(iter_xlsx_chunks(self.path))
+
+
+class ErrorFileTests(SimpleTestCase):
+    """Failed rows are streamed to a compressed file instead of memory/session"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'errors.csv.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _errors(self, rows):
+        return [{'row': row, 'error': f'Invalid amount: {row}', 'data': {'USERNAME': f'user{row}'}} for row in rows]
+
+    def test_pages_across_appended_writes(self):
+        error_file = ErrorFile(self.path)
+        error_file.write(self._errors(range(2, 60)))
+        error_file.write(self._errors(range(60, 130)))
+
+        rows = ErrorLogRows(self.path, 128)
+        page = rows[50:53]
+        self.assertEqual([entry['row'] for entry in page], ['52', '53', '54'])
+        self.assertEqual(page[0]['data'], "{'USERNAME': 'user52'}")
+        self.assertEqual(len(rows[120:200]), 8)
+
+    def test_truncate_drops_rows_after_checkpoint(self):
+        error_file = ErrorFile(self.path)
+        error_file.write(self._errors([2, 5, 9]))
+        error_file.write(self._errors([12, 15]))
+
+        self.assertEqual(error_file.truncate(10), 3)
+        self.assertEqual([entry['row'] for entry in ErrorLogRows(self.path, 3)[0:10]], ['2', '5', '9'])
+
+    def test_importer_keeps_only_unflushed_errors_in_memory(self):
+        importer = BulkImporter('default', 'transaction', error_path=self.path)
+        importer.add_error(3, 'Invalid amount: x', {})
+        importer.add_error(8, 'Invalid amount: y', {})
+        importer._checkpoint(5)
+
+        self.assertEqual(importer.error_count, 2)
+        self.assertEqual([error['row'] for error in importer.errors], [8])
+        self.assertEqual(importer.summary()['first_error']['row'], 3)
+        self.assertEqual(importer.checkpoint_state()['failed'], 1)
+
+
+class PartitionPlanTests(SimpleTestCase):
+    """Byte-range partitions for the parallel import"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'history.csv')
+        write_transaction_csv(self.path, 5000)
+        self._min_bytes = parallel_import.MIN_PARTITION_BYTES
+        parallel_import.MIN_PARTITION_BYTES = 1024
+
+    def tearDown(self):
+        parallel_import.MIN_PARTITION_BYTES = self._min_bytes
+        shutil.rmtree(self.tmp_dir)
+
+    def test_partitions_cover_every_row_once(self):
+        partitions = parallel_import.plan_partitions(self.path, 4)
+        self.assertEqual(len(partitions), 4)
+        self.assertEqual(partitions[-1]['end'], os.path.getsize(self.path))
+
+        usernames = []
+        for partition in partitions:
+            for chunk in iter_csv_range_chunks(self.path, partition['start'], partition['end'],
+                                               partition['encoding'], chunksize=700):
+                usernames.extend(chunk['USERNAME'])
+        self.assertEqual(usernames, [f'user{i}' for i in range(5000)])
+
+    def test_small_file_is_not_split(self):
+        parallel_import.MIN_PARTITION_BYTES = self._min_bytes
+        self.assertEqual(len(parallel_import.plan_partitions(self.path, 8)), 1)
+
+    def test_stalled_partitioned_job_can_be_rerun(self):
+        stalled = ImportJob(partitions=4, status=ImportJob.Status.RUNNING,
+                            heartbeat_at=timezone.now() - ImportJob.STALE_AFTER * 2)
+        self.assertTrue(stalled.is_resumable)
+        running = ImportJob(partitions=4, status=ImportJob.Status.RUNNING, heartbeat_at=timezone.now())
+        self.assertFalse(running.is_resumable)
+
+
+class StagingCopySourceTests(SimpleTestCase):
+    """The COPY feed for the PostgreSQL staging import"""
+
+    def test_blank_lines_are_dropped(self):
+        source = _CopySource(io.StringIO('a,b\n\n1,2\n   \n3,4\n'))
+        data = ''
+        while True:
+            block = source.read(3)
+            if not block:
+                break
+            data += block
+        self.assertEqual(data, 'a,b\n1,2\n3,4\n')
+
+
+class UploadRegistryTests(SimpleTestCase):
+    """Prefix hashing used to recognise append-only re-exports"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'export.csv')
+        write_transaction_csv(self.path, 50)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_prefix_digests_match_hash_of_earlier_file(self):
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        first_rows = content[:content.index(b'user20,')]
+        sizes = {len(first_rows), len(first_rows) - 3, len(content)}
+
+        digests = _prefix_digests(self.path, sizes)
+
+        self.assertEqual(digests[len(first_rows)], hashlib.sha256(first_rows).hexdigest())
+        self.assertEqual(digests[len(content)], hashlib.sha256(content).hexdigest())
+        # Not on a line break, so never treated as a matching prefix
+        self.assertNotIn(len(first_rows) - 3, digests)
+
+    def test_job_without_imported_rows_is_not_registered(self):
+        job = ImportJob(file_hash='0' * 64, file_name='export.csv', rows_processed=50, rows_failed=50)
+        self.assertIsNone(record_upload(job, 'default'))  # returns before touching the database
+
+
+class IngestRecordTests(SimpleTestCase):
+    """JSON records mapped onto the CSV columns the importer validates"""
+
+    def test_transaction_record_is_spelled_like_the_export(self):
+        row = normalize_record('transaction', {
+            'username': 'user1', 'event': 'deposit', 'amount': 150.5,
+            'create_date': '2025-02-01T10:00:00', 'process_date': '01-02-2025 10:01:00', 'process_by': 'bo',
+        })
+        self.assertEqual(row['AMOUNT'], '150.5')
+        self.assertEqual(row['CREATE DATE'], '01-02-2025 10:00:00')
+        self.assertEqual(row['PROCESS DATE'], '01-02-2025 10:01:00')
+
+    def test_csv_header_names_and_optional_member_fields(self):
+        row = normalize_record('member', {'Username': 'user1', 'name': 'A', 'handphone': '0812',
+                                          'join_date': '05-01-2025 08:00:00'})
+        self.assertEqual(row['Username'], 'user1')
+        self.assertEqual(row['Email'], '')
+        self.assertEqual(row['Referral'], '')
+
+    def test_ndjson_lines(self):
+        records = list(iter_ndjson([b'{"username": "a"}\n', b'\n', b'{oops\n', b'[1]\n']))
+        self.assertEqual(records[0], {'username': 'a'})
+        self.assertIsInstance(records[1], ValueError)
+        self.assertEqual(records[2], [1])
+        with self.assertRaises(ValueError):
+            normalize_record('transaction', records[2])
+
+
+class DropDirectoryTests(SimpleTestCase):
+    """Which dropped export files are picked up, and in what order"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.tmp_dir)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tmp_dir)
+
+    def _drop(self, file_type, name, age):
+        directory = os.path.join(drop_directory('pukul.com'), file_type)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        write_transaction_csv(path, 1)
+        modified = time.time() - age
+        os.utime(path, (modified, modified))
+        return path
+
+    def test_settled_files_in_arrival_order(self):
+        second = self._drop('transaction', 'a.csv', age=100)
+        first = self._drop('member', 'z.xlsx', age=200)
+        self._drop('transaction', 'still_writing.csv', age=0)
+        self._drop('transaction', '.partial.csv', age=300)
+        self._drop('transaction', 'notes.txt', age=300)
+
+        self.assertEqual(
+            pending_drop_files('pukul.com', settle_seconds=30),
+            [('member', first), ('transaction', second)]
+        )
+
+
+class BatchZipTests(SimpleTestCase):
+    """Which members of an uploaded zip become import jobs"""
+
+    def test_importable_members_in_name_order(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('april/day02.csv', 'USERNAME\nb\n')
+            archive.writestr('april/day01.CSV', 'USERNAME\na\n')
+            archive.writestr('april/members.xlsx', b'')
+            archive.writestr('__MACOSX/april/._day01.csv', b'')
+            archive.writestr('april/.hidden.csv', b'')
+            archive.writestr('readme.txt', b'')
+            archive.writestr('empty/', b'')
+
+        with zipfile.ZipFile(buffer) as archive:
+            members = _zip_members(archive)
+            self.assertEqual([member.name for member in members], ['day01.CSV', 'day02.csv', 'members.xlsx'])
+            self.assertEqual(b''.join(members[1].chunks()), b'USERNAME\nb\n')
+
+
+class ChunkedUploadPartTests(SimpleTestCase):
+    """Part layout of a chunked upload"""
+
+    def test_parts_cover_the_file(self):
+        upload = ChunkedUpload(file_size=1000, chunk_size=300, received_parts=[3, 0])
+        self.assertEqual(upload.part_count, 4)
+        self.assertEqual([upload.part_size(number) for number in range(4)], [300, 300, 300, 100])
+        self.assertEqual(upload.missing_parts, [1, 2])
+        self.assertFalse(upload.is_complete)
+
+        upload.received_parts = [0, 1, 2, 3]
+        self.assertTrue(upload.is_complete)
+
+    def test_exact_multiple(self):
+        upload = ChunkedUpload(file_size=600, chunk_size=300)
+        self.assertEqual(upload.part_count, 2)
+        self.assertEqual(upload.part_size(1), 300)
+
+
+class TransactionPartitionTests(SimpleTestCase):
+    """Monthly partition naming (no database access)"""
+
+    def test_months_roll_over_years(self):
+        self.assertEqual(add_months(datetime.date(2025, 11, 1), 3), datetime.date(2026, 2, 1))
+        self.assertEqual(add_months(datetime.date(2025, 1, 1), -1), datetime.date(2024, 12, 1))
+
+    def test_names_sort_and_parse(self):
+        name = partition_name(datetime.date(2026, 3, 1))
+        self.assertEqual(name, 'data_management_transaction_p202603')
+        self.assertEqual(PARTITION_PATTERN.search(name).groups(), ('2026', '03'))
+        self.assertIsNone(PARTITION_PATTERN.search('data_management_transaction_default'))
+
+
+class PhoneNormalizationTests(SimpleTestCase):
+    """E.164 phone numbers for Member.phone_e164"""
+
+    def test_export_formats_of_one_number_agree(self):
+        for raw in ['081234567890', '+62 812-3456-7890', '6281234567890', '81234567890', '0062 81234567890',
+                    81234567890, 81234567890.0]:
+            self.assertEqual(normalize_phone(raw, ['ID']), '+6281234567890', raw)
+
+    def test_first_matching_country_wins(self):
+        self.assertEqual(normalize_phone('91234567', ['ID', 'SG']), '+6591234567')
+        self.assertEqual(normalize_phone('6591234567', ['SG']), '+6591234567')
+        self.assertEqual(normalize_phone('0123456789', ['MY', 'ID']), '+60123456789')
+
+    def test_unreadable_numbers(self):
+        for raw in [None, '', '-', '12345', '+123', float('nan')]:
+            self.assertEqual(normalize_phone(raw, ['ID', 'SG']), '', raw)
+
+
+class CompactTransactionKeyTests(SimpleTestCase):
+    """Event codes standing in for Transaction.event"""
+
+    def test_every_standard_event_has_a_distinct_code(self):
+        self.assertEqual(set(Transaction.EVENT_CODES), set(STANDARD_EVENTS))
+        self.assertEqual(len(set(event_codes(STANDARD_EVENTS))), len(STANDARD_EVENTS))
+
+    def test_filter_follows_the_mode(self):
+        self.assertEqual(event_filter(['Deposit', 'Manual Deposit'], compact=True).children,
+                         [('event_code__in', [1, 2])])
+        self.assertEqual(event_filter(['Withdraw'], compact=False).children, [('event__in', ['Withdraw'])])
+
+    def test_parsed_transactions_carry_their_code(self):
+        transaction = BulkImporter.build_transaction({
+            'USERNAME': 'user1', 'EVENT': 'manual withdraw ', 'AMOUNT': '1,000', 'CREATE DATE': '01-03-2025 10:00:00',
+            'PROCESS DATE': '01-03-2025 11:00:00', 'PROCESS BY': 'op',
+        })
+        self.assertEqual(transaction.event, 'Manual Withdraw')
+        self.assertEqual(transaction.event_code, Transaction.EVENT_CODES['Manual Withdraw'])
+        self.assertIsNone(transaction.member_id)  # linked when the batch is written
+
+
+class DailyRollupTests(SimpleTestCase):
+    """Day handling of the daily transaction rollups (no database access)"""
+
+    def test_consecutive_days_merge_into_ranges(self):
+        days = [datetime.date(2026, 1, 30), datetime.date(2026, 1, 31), datetime.date(2026, 2, 1),
+                datetime.date(2026, 2, 5)]
+        self.assertEqual(_day_ranges(days), [[days[0], days[2]], [days[3], days[3]]])
+
+    def test_missing_rollup_reads_as_zero(self):
+        day = datetime.date(2026, 2, 1)
+        rollup = rollup_for({}, day, 'Deposit')
+        self.assertEqual((rollup.day, rollup.event), (day, 'Deposit'))
+        self.assertEqual((rollup.transaction_count, rollup.amount or 0, rollup.user_count), (0, 0, 0))
+
+
+class MemberActivityStatsTests(SimpleTestCase):
+    """Building stats rows from the grouped query (no database access)"""
+
+    def test_missing_amounts_read_as_zero(self):
+        window_end = datetime.date(2026, 2, 1)
+        stats = _stats({
+            'username': 'alice', 'first_deposit': None, 'last_deposit': None, 'last_withdrawal': None,
+            'last_activity': datetime.datetime(2026, 1, 3, 10), 'deposit_count': 0, 'deposit_total': None,
+            'largest_deposit': None, 'withdrawal_count': 1, 'withdrawal_total': Decimal('5.00'),
+            'largest_withdrawal': Decimal('5.00'), 'recent_deposit_count': 0, 'recent_deposit_total': None,
+            'recent_withdrawal_count': 1, 'recent_withdrawal_total': Decimal('5.00'),
+        }, window_end)
+        self.assertEqual((stats.deposit_total, stats.largest_deposit, stats.recent_deposit_total), (0, 0, 0))
+        self.assertIsNone(stats.last_deposit)
+        self.assertEqual((stats.withdrawal_total, stats.window_end), (Decimal('5.00'), window_end))
@@ -7,10 +7,19 @@ urlpatterns = [
     path('upload/', views.upload_file, name='upload_file'),
     #path('upload/success/', views.upload_success, name='upload_success'),
     path('upload/summary/', views.upload_summary, name='upload_summary'),
+    path('upload/jobs/<int:job_id>/status/', views.import_job_status, name='import_job_status'),
+    path('upload/jobs/<int:job_id>/resume/', views.resume_import, name='resume_import'),
+    path('upload/chunked/', views.chunked_upload_start, name='chunked_upload_start'),
+    path('upload/chunked/<uuid:upload_id>/', views.chunked_upload_status, name='chunked_upload_status'),
+    path('upload/chunked/<uuid:upload_id>/parts/<int:number>/', views.chunked_upload_part, name='chunked_upload_part'),
+    path('upload/chunked/<uuid:upload_id>/complete/', views.chunked_upload_complete, name='chunked_upload_complete'),
+    path('upload/batch/', views.upload_batch, name='upload_batch'),
+    path('upload/batch/<int:batch_id>/', views.batch_summary, name='batch_summary'),
     path('download/errors/', views.download_errors, name='download_errors'),
     path('error-logs/', views.error_logs_list, name='error_logs_list'),
     # Remove tenant_id from these URLs since it's already captured in main urls.py
     path('error-logs/download/<int:log_id>/', views.download_log, name='download_log'),
     path('error-logs/delete/<int:log_id>/', views.delete_log, name='delete_log'),
     path('error-logs/bulk-delete/', views.bulk_delete_logs, name='bulk_delete_logs'),
+    path('api/ingest/<str:file_type>/', views.ingest_api, name='ingest_api'),
 ]
\ No newline at end of file
@@ -1,12 +1,69 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Sum
+from django.db import connections
+from django.db.models import Case, CharField, Count, Sum, Value, When
+from django.db.models.functions import TruncDate
 from datetime import timedelta
 from django.utils import timezone
 import calendar
 from data_management.models import Transaction, Member
+from data_management.services.rollups import daily_rollups, rollup_for, rollups_ready
 from django.template.response import TemplateResponse
-from collections import Counter, defaultdict
+from collections import defaultdict
+
+# Deposits per user and day: (bucket, first count in it)
+FREQUENCY_BUCKETS = [('1_time', 1), ('2_times', 2), ('3_times', 3), ('4_times', 4), ('5_9_times', 5),
+                     ('10_plus_times', 10)]
+# Member age on the deposit day in days: (bucket, youngest age in it).
+# Any other age, including a join date after the deposit, is the last one
+AGE_BUCKETS = [('day_0', 0), ('day_1_7', 1), ('day_8_14', 8), ('day_15_30', 15), ('day_31_60', 31),
+               ('day_61_90', 61), ('day_91_180', 91), ('day_180_plus', 181)]
+
+
+def _depositor_segments(deposits):
+    """
+    {(day, bucket): depositors} of ``deposits`` for the frequency and age
+    buckets, and {day: depositors}. Each depositor's deposits per day are
+    counted in one grouped query, joined to their member and counted per
+    bucket around it, so only the bucket counts leave the database.
+    Depositors without a member have no age bucket.
+    """
+    frequency = Case(
+        *[When(deposits__gte=first, then=Value(name)) for name, first in reversed(FREQUENCY_BUCKETS)],
+        output_field=CharField(),
+    )
+    depositor_days = deposits.annotate(day=TruncDate('process_date')).values('day', 'username').annotate(
+        deposits=Count('id')
+    ).annotate(frequency=frequency).order_by().values('day', 'username', 'frequency')
+    sql, params = depositor_days.query.get_compiler(depositor_days.db).as_sql()
+
+    age = "d.day - CAST(m.join_date AS date)"
+    oldest = AGE_BUCKETS[-1][0]
+    age_buckets = ' '.join(
+        f"WHEN {age} < {AGE_BUCKETS[n + 1][1]} THEN '{name}'" for n, (name, _) in enumerate(AGE_BUCKETS[:-1])
+    )
+    connection = connections[depositor_days.db]
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT d.day, d.frequency,
+                   CASE WHEN m.join_date IS NULL THEN NULL WHEN {age} < 0 THEN '{oldest}' {age_buckets}
+                        ELSE '{oldest}' END,
+                   COUNT(*)
+            FROM ({sql}) AS d
+            LEFT JOIN {connection.ops.quote_name(Member._meta.db_table)} m ON m.username = d.username
+            GROUP BY 1, 2, 3
+        """, params)
+        rows = cursor.fetchall()
+
+    segments = defaultdict(int)
+    depositors = defaultdict(int)
+    for day, frequency, age, count in rows:
+        segments[(day, frequency)] += count
+        if age is not None:
+            segments[(day, age)] += count
+        depositors[day] += count
+    return segments, depositors
+
 
 @login_required
 def report_daily_general_transaction_summary_view(request, tenant_id):
@@ -30,126 +87,61 @@ def report_daily_general_transaction_summary_view(request, tenant_id):
         end_date = timezone.datetime.strptime(end_date_str, '%Y-%m-%d').date()
 
 
-    # Pre-fetch all unique depositor usernames for the entire date range to optimize member queries
-    all_deposits = Transaction.objects.filter(
-        process_date__date__range=(start_date, end_date),
-        event__in=['Deposit']
-    )
-    all_depositor_usernames = set(all_deposits.values_list('username', flat=True).distinct())
-    
-    # Fetch all relevant members at once with proper error handling
-    depositor_members = {}
-    if all_depositor_usernames:
-        members_qs = Member.objects.filter(username__in=all_depositor_usernames).select_related()
-        depositor_members = {m.username: m for m in members_qs}
-        
+    day_range = {'process_date__gte': start_date, 'process_date__lt': end_date + timedelta(days=1)}
+    segments, unique_depositors = _depositor_segments(Transaction.objects.filter(event__in=['Deposit'], **day_range))
+
     def get_percentage(count, total):
         return (count / total) * 100 if total > 0 else 0
 
+    def buckets(current_date, names, total):
+        return {
+            name: {'count': segments[(current_date, name)],
+                   'percent': get_percentage(segments[(current_date, name)], total)}
+            for name in names
+        }
+
+    # Daily totals come from the rollups once the tenant's are built, else
+    # from one grouped query for the whole range
+    rollups = day_totals = None
+    if rollups_ready():
+        rollups = daily_rollups(start_date, end_date)
+    else:
+        day_totals = {
+            (row['day'], row['event']): row
+            for row in Transaction.objects.filter(event__in=['Deposit', 'Withdraw'], **day_range).annotate(
+                day=TruncDate('process_date')
+            ).values('day', 'event').annotate(count=Count('id'), total=Sum('amount')).order_by()
+        }
+
     report_data = []
     current_date = start_date
     
     while current_date <= end_date:
-        # Get daily transactions
-        daily_deposits = Transaction.objects.filter(
-            process_date__date=current_date,
-            event__in=['Deposit']
-        )
-        daily_withdrawals = Transaction.objects.filter(
-            process_date__date=current_date,
-            event__in=['Withdraw']
-        )
-        
-        
-        unique_depositor_usernames = list(daily_deposits.values_list('username', flat=True).distinct())
-        total_unique_depositors = len(unique_depositor_usernames)
-
-        # --- Calculate Deposit Frequency ---
+        total_unique_depositors = unique_depositors[current_date]
+
+        # --- Deposit frequency and depositor age, bucketed by _depositor_segments ---
         deposit_frequency_data = {}
-        if total_unique_depositors > 0:
-            deposit_counts = Counter(daily_deposits.values_list('username', flat=True))
-            freq_1 = sum(1 for count in deposit_counts.values() if count == 1)
-            freq_2 = sum(1 for count in deposit_counts.values() if count == 2)
-            freq_3 = sum(1 for count in deposit_counts.values() if count == 3)
-            freq_4 = sum(1 for count in deposit_counts.values() if count == 4)
-            freq_5_9 = sum(1 for count in deposit_counts.values() if 5 <= count <= 9)
-            freq_10_plus = sum(1 for count in deposit_counts.values() if count >= 10)
-            
-            deposit_frequency_data = {
-                '1_time': {'count': freq_1, 'percent': get_percentage(freq_1, total_unique_depositors)},
-                '2_times': {'count': freq_2, 'percent': get_percentage(freq_2, total_unique_depositors)},
-                '3_times': {'count': freq_3, 'percent': get_percentage(freq_3, total_unique_depositors)},
-                '4_times': {'count': freq_4, 'percent': get_percentage(freq_4, total_unique_depositors)},
-                '5_9_times': {'count': freq_5_9, 'percent': get_percentage(freq_5_9, total_unique_depositors)},
-                '10_plus_times': {'count': freq_10_plus, 'percent': get_percentage(freq_10_plus, total_unique_depositors)},
-            }
-
-        # --- Calculate Depositor Age Segmentation with better debugging ---
         depositor_age_data = {}
-        age_counts = defaultdict(int)  # Use defaultdict to avoid KeyError
-        
-        if unique_depositor_usernames:
-            members_found = 0
-            members_with_join_date = 0
-            
-            for username in unique_depositor_usernames:
-                member = depositor_members.get(username)
-                if member:
-                    members_found += 1
-                    if member.join_date:
-                        members_with_join_date += 1
-                        # Handle both datetime and date objects
-                        if hasattr(member.join_date, 'date'):
-                            join_date = member.join_date.date()
-                        else:
-                            join_date = member.join_date
-                            
-                        member_age_days = (current_date - join_date).days
-                        
-                        # Debug print for first few members
-                        if members_with_join_date <= 3:
-                            print(f"DEBUG: Username {username}, join_date: {join_date}, age_days: {member_age_days}")
-                        
-                        if member_age_days == 0: 
-                            age_counts['day_0'] += 1
-                        elif 1 <= member_age_days <= 7: 
-                            age_counts['day_1_7'] += 1
-                        elif 8 <= member_age_days <= 14: 
-                            age_counts['day_8_14'] += 1
-                        elif 15 <= member_age_days <= 30: 
-                            age_counts['day_15_30'] += 1
-                        elif 31 <= member_age_days <= 60: 
-                            age_counts['day_31_60'] += 1
-                        elif 61 <= member_age_days <= 90: 
-                            age_counts['day_61_90'] += 1
-                        elif 91 <= member_age_days <= 180: 
-                            age_counts['day_91_180'] += 1
-                        else: 
-                            age_counts['day_180_plus'] += 1
-                    else:
-                        print(f"DEBUG: Member {username} has no join_date")
-                else:
-                    print(f"DEBUG: No member found for username {username}")
-            
-
-            
-            depositor_age_data = {
-                'day_0': {'count': age_counts['day_0'], 'percent': get_percentage(age_counts['day_0'], total_unique_depositors)},
-                'day_1_7': {'count': age_counts['day_1_7'], 'percent': get_percentage(age_counts['day_1_7'], total_unique_depositors)},
-                'day_8_14': {'count': age_counts['day_8_14'], 'percent': get_percentage(age_counts['day_8_14'], total_unique_depositors)},
-                'day_15_30': {'count': age_counts['day_15_30'], 'percent': get_percentage(age_counts['day_15_30'], total_unique_depositors)},
-                'day_31_60': {'count': age_counts['day_31_60'], 'percent': get_percentage(age_counts['day_31_60'], total_unique_depositors)},
-                'day_61_90': {'count': age_counts['day_61_90'], 'percent': get_percentage(age_counts['day_61_90'], total_unique_depositors)},
-                'day_91_180': {'count': age_counts['day_91_180'], 'percent': get_percentage(age_counts['day_91_180'], total_unique_depositors)},
-                'day_180_plus': {'count': age_counts['day_180_plus'], 'percent': get_percentage(age_counts['day_180_plus'], total_unique_depositors)},
-            }
+        if total_unique_depositors > 0:
+            deposit_frequency_data = buckets(
+                current_date, [name for name, _ in FREQUENCY_BUCKETS], total_unique_depositors
+            )
+            # Depositors without a member (or join date) count towards the
+            # total but no age segment
+            depositor_age_data = buckets(current_date, [name for name, _ in AGE_BUCKETS], total_unique_depositors)
 
         # --- Calculate other metrics ---
-        total_deposit_value = daily_deposits.aggregate(total=Sum('amount'))['total'] or 0
-        total_deposit_transactions = daily_deposits.count()
+        if rollups is not None:
+            total_deposit_value = rollup_for(rollups, current_date, 'Deposit').amount or 0
+            total_deposit_transactions = rollup_for(rollups, current_date, 'Deposit').transaction_count
+            total_withdrawal_value = rollup_for(rollups, current_date, 'Withdraw').amount or 0
+        else:
+            deposits = day_totals.get((current_date, 'Deposit'), {})
+            total_deposit_value = deposits.get('total') or 0
+            total_deposit_transactions = deposits.get('count', 0)
+            total_withdrawal_value = day_totals.get((current_date, 'Withdraw'), {}).get('total') or 0
         average_deposit_amount = (total_deposit_value / total_deposit_transactions) if total_deposit_transactions > 0 else 0
-        
-        total_withdrawal_value = daily_withdrawals.aggregate(total=Sum('amount'))['total'] or 0
+
         withdrawal_to_deposit_ration = (total_withdrawal_value / total_deposit_value) if total_withdrawal_value > 0 else float('inf')
 
         report_data.append({
@@ -167,9 +159,6 @@ def report_daily_general_transaction_summary_view(request, tenant_id):
         current_date += timedelta(days=1)
 
 
-    #if report_data:
-    #    print(f"First item depositor_age_segmentation: {report_data[0]['depositor_age_segmentation']}")
-    
     context = {
         'members': report_data,  # Changed from 'report_data' to 'members' to match template
         'start_date': start_date.strftime('%Y-%m-%d'),
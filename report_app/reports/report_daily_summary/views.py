@@ -1,12 +1,58 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Sum
 from datetime import timedelta
 from django.utils import timezone
 import calendar
-from data_management.models import Transaction, Member
+from data_management.models import DailyTransactionRollup
+from data_management.services.rollups import (
+    computed_daily_rollups, daily_rollups, member_signups, rollup_for, rollups_ready,
+)
 from django.template.response import TemplateResponse
 
+
+def _day_from_rollups(current_date, rollups, signups):
+    """One day of the report from its (stored or computed) rollup rows"""
+    depo = rollup_for(rollups, current_date, 'Deposit')
+    manual = rollup_for(rollups, current_date, 'Manual Deposit')
+    wd = rollup_for(rollups, current_date, 'Withdraw')
+    manual_wd = rollup_for(rollups, current_date, 'Manual Withdraw')
+    deposits = rollup_for(rollups, current_date, DailyTransactionRollup.ALL_DEPOSITS)
+
+    # Sums of no rows read 0, as Sum(...) or 0 does
+    depo_value = depo.amount or 0
+    manual_value = manual.amount or 0
+    wd_value = wd.amount or 0
+    manual_wd_value = manual_wd.amount or 0
+    return {
+        'date': current_date,
+        'day': calendar.day_name[current_date.weekday()],
+        'depo_trx': depo.transaction_count,
+        'manual_trx': manual.transaction_count,
+        'total_trx': depo.transaction_count + manual.transaction_count,
+        'depo_value': depo_value,
+        'manual_value': manual_value,
+        'total_value': depo_value + manual_value,
+        'wd_trx': wd.transaction_count,
+        'manual_wd_trx': manual_wd.transaction_count,
+        'total_wd': wd.transaction_count + manual_wd.transaction_count,
+        'wd_value': wd_value,
+        'manual_wd_value': manual_wd_value,
+        'total_wd_value': wd_value + manual_wd_value,
+        'active_players': deposits.user_count,
+        'new_member': signups.get(current_date, 0),
+        'new_member_deposited': deposits.new_member_user_count,
+        'old_player': max(0, deposits.user_count - deposits.new_member_user_count),
+        'new_member_depo_value': depo.new_member_amount or 0,
+        'new_member_manual_depo_value': manual.new_member_amount or 0,
+        'new_member_wd_value': wd.new_member_amount or 0,
+        'new_member_manual_wd_value': manual_wd.new_member_amount or 0,
+        'old_member_depo_value': (depo.amount - depo.new_member_amount) or 0,
+        'old_member_manual_depo_value': (manual.amount - manual.new_member_amount) or 0,
+        'old_member_wd_value': (wd.amount - wd.new_member_amount) or 0,
+        'old_member_manual_wd_value': (manual_wd.amount - manual_wd.new_member_amount) or 0,
+    }
+
+
 @login_required
 def report_daily_summary_view(request, tenant_id):
     """
@@ -30,129 +76,20 @@ def report_daily_summary_view(request, tenant_id):
         start_date = timezone.datetime.strptime(start_date, '%Y-%m-%d').date()
         end_date = timezone.datetime.strptime(end_date, '%Y-%m-%d').date()
 
+    # Once the tenant's daily rollups are built each day is read from a few
+    # rollup rows; until then the same rows are computed from the
+    # transactions for the whole range at once
+    if rollups_ready():
+        rollups = daily_rollups(start_date, end_date)
+    else:
+        rollups = computed_daily_rollups(start_date, end_date)
+    signups = member_signups(start_date, end_date)
+
     # Prepare data for the selected date range
     dashboard_data = []
     current_date = start_date
     while current_date <= end_date:
-        # These queries automatically use the correct tenant's database
-        day_transactions = Transaction.objects.filter(process_date__date=current_date)
-        
-        # FIXED: Get new member usernames for the current date
-        new_member_usernames = set(
-            Member.objects.filter(join_date__date=current_date).values_list('username', flat=True)
-        )
-        
-        # Debug print (remove this in production)
-        # print(f"Date: {current_date}, New members: {new_member_usernames}")
-        
-        # Section: Total Form Depo
-        depo_trx = day_transactions.filter(event='Deposit').count()
-        manual_trx = day_transactions.filter(event='Manual Deposit').count()
-        total_trx = depo_trx + manual_trx
-        
-        # Section: Total Coin Depo
-        depo_value = day_transactions.filter(event='Deposit').aggregate(total=Sum('amount'))['total'] or 0
-        manual_value = day_transactions.filter(event='Manual Deposit').aggregate(total=Sum('amount'))['total'] or 0
-        total_value = depo_value + manual_value
-        
-        # Section: Total Form WD
-        wd_trx = day_transactions.filter(event='Withdraw').count()
-        manual_wd_trx = day_transactions.filter(event='Manual Withdraw').count()
-        total_wd = wd_trx + manual_wd_trx
-        
-        # Section: Total Coin WD
-        wd_value = day_transactions.filter(event='Withdraw').aggregate(total=Sum('amount'))['total'] or 0
-        manual_wd_value = day_transactions.filter(event='Manual Withdraw').aggregate(total=Sum('amount'))['total'] or 0
-        total_wd_value = wd_value + manual_wd_value
-        
-        # Section: Other Index
-        active_players = day_transactions.filter(event__in=['Deposit', 'Manual Deposit']).values('username').distinct().count()
-        
-        # New Metrics
-        new_members = len(new_member_usernames)
-        
-        new_member_deposited_count = day_transactions.filter(
-            event__in=['Deposit', 'Manual Deposit'],
-            username__in=new_member_usernames
-        ).values('username').distinct().count()
-        
-        old_player = max(0, active_players - new_member_deposited_count)
-        
-        # FIXED: New Member Deposits and Withdrawals
-        new_member_depo_value = day_transactions.filter(
-            event='Deposit', 
-            username__in=new_member_usernames
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        new_member_manual_depo_value = day_transactions.filter(
-            event='Manual Deposit', 
-            username__in=new_member_usernames
-        ).aggregate(total=Sum('amount'))['total'] or 0
-
-        new_member_wd_value = day_transactions.filter(
-            event='Withdraw', 
-            username__in=new_member_usernames
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        new_member_manual_wd_value = day_transactions.filter(
-            event='Manual Withdraw', 
-            username__in=new_member_usernames
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # FIXED: Old Member Deposits and Withdrawals (using exclude)
-        old_member_depo_value = day_transactions.filter(
-            event='Deposit'
-        ).exclude(
-            username__in=new_member_usernames
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        old_member_manual_depo_value = day_transactions.filter(
-            event='Manual Deposit'
-        ).exclude(
-            username__in=new_member_usernames
-        ).aggregate(total=Sum('amount'))['total'] or 0
-
-        old_member_wd_value = day_transactions.filter(
-            event='Withdraw'
-        ).exclude(
-            username__in=new_member_usernames
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        old_member_manual_wd_value = day_transactions.filter(
-            event='Manual Withdraw'
-        ).exclude(
-            username__in=new_member_usernames
-        ).aggregate(total=Sum('amount'))['total'] or 0
-
-        dashboard_data.append({
-            'date': current_date,
-            'day': calendar.day_name[current_date.weekday()],
-            'depo_trx': depo_trx,
-            'manual_trx': manual_trx,
-            'total_trx': total_trx,
-            'depo_value': depo_value,
-            'manual_value': manual_value,
-            'total_value': total_value,
-            'wd_trx': wd_trx,
-            'manual_wd_trx': manual_wd_trx,
-            'total_wd': total_wd,
-            'wd_value': wd_value,
-            'manual_wd_value': manual_wd_value,
-            'total_wd_value': total_wd_value,
-            'active_players': active_players,
-            'new_member': new_members,
-            'new_member_deposited': new_member_deposited_count,
-            'old_player': old_player,
-            # FIXED NEW METRICS
-            'new_member_depo_value': new_member_depo_value,
-            'new_member_manual_depo_value': new_member_manual_depo_value,
-            'new_member_wd_value': new_member_wd_value,
-            'new_member_manual_wd_value': new_member_manual_wd_value,
-            'old_member_depo_value': old_member_depo_value,
-            'old_member_manual_depo_value': old_member_manual_depo_value,
-            'old_member_wd_value': old_member_wd_value,
-            'old_member_manual_wd_value': old_member_manual_wd_value,
-        })
+        dashboard_data.append(_day_from_rollups(current_date, rollups, signups))
         current_date += timedelta(days=1)
 
     context = {
@@ -5,7 +5,9 @@ from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.db.models import Count
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db import router
 from data_management.models import Member
+from data_management.services.phones import normalize_phone, tenant_phone_countries
 from django.template.response import TemplateResponse
 from django.http import HttpResponseBadRequest
 from django.utils import timezone
@@ -49,29 +51,32 @@ def report_duplicated_phone_number_view(request):
             start_date_str = start_date.strftime('%Y-%m-%d')
             end_date_str = end_date.strftime('%Y-%m-%d')
 
-        base_queryset = base_queryset.filter(join_date__date__range=[start_date, end_date])
+        base_queryset = base_queryset.filter(join_date__gte=start_date, join_date__lt=end_date + timedelta(days=1))
 
+    # Numbers are compared in E.164, so one phone written in different
+    # formats counts as one; members whose number could not be read are left out
+    duplicate_phones_qs = base_queryset.exclude(phone_e164='')
     if phone_number_query:
-        members_with_phone = base_queryset.filter(handphone=phone_number_query).order_by('username')
-        if members_with_phone.count() > 1:
-            duplicate_phone_data.append({
-                'handphone': phone_number_query,
-                'users': list(members_with_phone),
-                'user_count': members_with_phone.count(),
-            })
-    else:
-        duplicate_phones_qs = base_queryset.values('handphone').annotate(
-            user_count=Count('username')
-        ).filter(user_count__gt=1).order_by('handphone')
-
-        for phone in duplicate_phones_qs:
-            handphone = phone['handphone']
-            users = base_queryset.filter(handphone=handphone).order_by('username')
-            duplicate_phone_data.append({
-                'handphone': handphone,
-                'users': list(users),
-                'user_count': phone['user_count'],
-            })
+        countries = tenant_phone_countries(router.db_for_read(Member))
+        duplicate_phones_qs = duplicate_phones_qs.filter(phone_e164=normalize_phone(phone_number_query, countries))
+    duplicate_phones_qs = duplicate_phones_qs.values('phone_e164').annotate(
+        user_count=Count('username')
+    ).filter(user_count__gt=1).order_by('phone_e164')
+
+    # Members of every duplicated number in one query rather than one per number
+    users_by_phone = {}
+    users = base_queryset.filter(
+        phone_e164__in=duplicate_phones_qs.values('phone_e164')
+    ).order_by('phone_e164', 'username')
+    for user in users:
+        users_by_phone.setdefault(user.phone_e164, []).append(user)
+
+    for phone in duplicate_phones_qs:
+        duplicate_phone_data.append({
+            'handphone': phone['phone_e164'],
+            'users': users_by_phone.get(phone['phone_e164'], []),
+            'user_count': phone['user_count'],
+        })
 
     # Pagination for the list of duplicate phone numbers
     paginator = Paginator(duplicate_phone_data, 20)
@@ -2,10 +2,9 @@
 
 from django.contrib.auth.decorators import login_required
 from django.template.response import TemplateResponse
-from data_management.models import Transaction, Member
 from django.utils import timezone
 from datetime import datetime, timedelta
-from django.db.models import Max, Count
+from data_management.services.member_stats import inactive_members
 import csv
 import io
 
@@ -37,58 +36,19 @@ def report_inactive_depositors_view(request):
                 # Calculate inactive cutoff date
                 inactive_cutoff = timezone.now() - timedelta(days=inactive_days)
                 
-                # Find members with deposits in the period
-                depositors = Transaction.objects.filter(
-                    event__in=['Deposit', 'Manual Deposit'],
-                    process_date__date__gte=dep_start,
-                    process_date__date__lte=dep_end
-                ).values('username').distinct()
-                
-                depositor_usernames = [d['username'] for d in depositors]
-                
-                # For each depositor, check their last activity
-                for username in depositor_usernames:
-                    # Get member details
-                    try:
-                        member = Member.objects.get(username=username)
-                    except Member.DoesNotExist:
-                        continue
-                    
-                    # Get last transaction date (any type)
-                    last_activity = Transaction.objects.filter(
-                        username=username
-                    ).aggregate(
-                        last_date=Max('process_date')
-                    )['last_date']
-                    
-                    # Check if inactive
-                    if last_activity and last_activity < inactive_cutoff:
-                        # Get deposit stats in period
-                        dep_stats = Transaction.objects.filter(
-                            username=username,
-                            event__in=['Deposit', 'Manual Deposit'],
-                            process_date__date__gte=dep_start,
-                            process_date__date__lte=dep_end
-                        ).aggregate(
-                            total_deposits=Count('id'),
-                            last_dep=Max('process_date')
-                        )
-                        
-                        days_inactive = (timezone.now() - last_activity).days
-                        
-                        results.append({
-                            'username': username,
-                            'name': member.name,
-                            'handphone': member.handphone,
-                            'join_date': member.join_date,
-                            'total_deposits': dep_stats['total_deposits'],
-                            'last_deposit': dep_stats['last_dep'],
-                            'last_activity': last_activity,
-                            'days_inactive': days_inactive
-                        })
-                
-                # Sort by days inactive (most inactive first)
-                results.sort(key=lambda x: x['days_inactive'], reverse=True)
+                # Members with deposits in the period who have been inactive
+                # since the cutoff, least recently active first (one query)
+                for member in inactive_members(['Deposit', 'Manual Deposit'], dep_start, dep_end, inactive_cutoff):
+                    results.append({
+                        'username': member['username'],
+                        'name': member['name'],
+                        'handphone': member['handphone'],
+                        'join_date': member['join_date'],
+                        'total_deposits': member['window_count'],
+                        'last_deposit': member['last_in_window'],
+                        'last_activity': member['last_activity'],
+                        'days_inactive': (timezone.now() - member['last_activity']).days
+                    })
                 
                 # Summary stats
                 summary = {
@@ -1,9 +1,8 @@
 from django.contrib.auth.decorators import login_required
 from django.template.response import TemplateResponse
-from data_management.models import Transaction, Member
 from django.utils import timezone
 from datetime import datetime, timedelta
-from django.db.models import Max, Count
+from data_management.services.member_stats import inactive_members
 import csv
 import io
 
@@ -35,58 +34,19 @@ def report_inactive_withdrawers_view(request):
                 # Calculate inactive cutoff date
                 inactive_cutoff = timezone.now() - timedelta(days=inactive_days)
                 
-                # Find members with withdrawals in the period
-                withdrawers = Transaction.objects.filter(
-                    event__in=['Withdraw', 'Manual Withdraw'],
-                    process_date__date__gte=wd_start,
-                    process_date__date__lte=wd_end
-                ).values('username').distinct()
-                
-                withdrawer_usernames = [w['username'] for w in withdrawers]
-                
-                # For each withdrawer, check their last activity
-                for username in withdrawer_usernames:
-                    # Get member details
-                    try:
-                        member = Member.objects.get(username=username)
-                    except Member.DoesNotExist:
-                        continue
-                    
-                    # Get last transaction date (any type)
-                    last_activity = Transaction.objects.filter(
-                        username=username
-                    ).aggregate(
-                        last_date=Max('process_date')
-                    )['last_date']
-                    
-                    # Check if inactive
-                    if last_activity and last_activity < inactive_cutoff:
-                        # Get withdrawal stats in period
-                        wd_stats = Transaction.objects.filter(
-                            username=username,
-                            event__in=['Withdraw', 'Manual Withdraw'],
-                            process_date__date__gte=wd_start,
-                            process_date__date__lte=wd_end
-                        ).aggregate(
-                            total_withdrawals=Count('id'),
-                            last_wd=Max('process_date')
-                        )
-                        
-                        days_inactive = (timezone.now() - last_activity).days
-                        
-                        results.append({
-                            'username': username,
-                            'name': member.name,
-                            'handphone': member.handphone,
-                            'join_date': member.join_date,
-                            'total_withdrawals': wd_stats['total_withdrawals'],
-                            'last_withdrawal': wd_stats['last_wd'],
-                            'last_activity': last_activity,
-                            'days_inactive': days_inactive
-                        })
-                
-                # Sort by days inactive (most inactive first)
-                results.sort(key=lambda x: x['days_inactive'], reverse=True)
+                # Members with withdrawals in the period who have been inactive
+                # since the cutoff, least recently active first (one query)
+                for member in inactive_members(['Withdraw', 'Manual Withdraw'], wd_start, wd_end, inactive_cutoff):
+                    results.append({
+                        'username': member['username'],
+                        'name': member['name'],
+                        'handphone': member['handphone'],
+                        'join_date': member['join_date'],
+                        'total_withdrawals': member['window_count'],
+                        'last_withdrawal': member['last_in_window'],
+                        'last_activity': member['last_activity'],
+                        'days_inactive': (timezone.now() - member['last_activity']).days
+                    })
                 
                 # Summary stats
                 summary = {
@@ -41,8 +41,8 @@ def report_new_member_deposit_activity_view(request):
                 # Step 1: Get all members registered in the first date range
                 members_by_date = defaultdict(list)
                 members = Member.objects.filter(
-                    join_date__date__gte=reg_start,
-                    join_date__date__lte=reg_end
+                    join_date__gte=reg_start,
+                    join_date__lt=reg_end + timedelta(days=1)
                 ).order_by('join_date')
                 
                 for member in members:
@@ -72,7 +72,7 @@ def report_new_member_deposit_activity_view(request):
                             deposits = Transaction.objects.filter(
                                 username__in=usernames,
                                 event='Deposit',  # Only 'Deposit', not 'Manual Deposit'
-                                process_date__date=dep_date
+                                process_date__gte=dep_date, process_date__lt=dep_date + timedelta(days=1)
                             )
                             
                             # Calculate metrics
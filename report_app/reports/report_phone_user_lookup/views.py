@@ -2,11 +2,51 @@
 
 from django.contrib.auth.decorators import login_required
 from django.template.response import TemplateResponse
+from django.db import router
 from django.utils import timezone
 from data_management.models import Member
+from data_management.services.phones import normalize_phone, tenant_phone_countries
 import csv
 import io
-import re
+
+
+def _lookup_phones(phone_numbers):
+    """
+    One result per input number, in input order. Numbers are normalized to
+    E.164 with the tenant's countries, so any export format matches, and
+    looked up with a single indexed query on phone_e164.
+    """
+    countries = tenant_phone_countries(router.db_for_read(Member))
+    normalized_phones = [normalize_phone(phone, countries) for phone in phone_numbers]
+
+    members = Member.objects.filter(
+        phone_e164__in={phone for phone in normalized_phones if phone}
+    ).values("username", "name", "handphone", "phone_e164", "join_date")
+    member_dict = {m["phone_e164"]: m for m in members}
+
+    results = []
+    for original_phone, normalized_phone in zip(phone_numbers, normalized_phones):
+        member = member_dict.get(normalized_phone) if normalized_phone else None
+        if member:
+            results.append({
+                "search_phone": original_phone,
+                "username": member["username"],
+                "name": member["name"],
+                "handphone": member["phone_e164"],
+                "join_date": member["join_date"],
+                "status": "Found"
+            })
+        else:
+            results.append({
+                "search_phone": original_phone,
+                "username": "Not Found",
+                "name": "Not Found",
+                "handphone": original_phone,
+                "join_date": None,
+                "status": "Not Found"
+            })
+    return results
+
 
 @login_required
 def report_phone_user_lookup_view(request):
@@ -25,65 +65,7 @@ def report_phone_user_lookup_view(request):
             if len(phone_numbers) > 2000:
                 error_message = "Error: Input exceeds 2000 phone numbers. Please limit to 2000 per request."
             else:
-                # Normalize phone numbers for search
-                normalized_phones = []
-                phone_mapping = {}  # Map normalized to original
-                
-                for phone in phone_numbers:
-                    # Remove all non-digit characters
-                    digits_only = re.sub(r'\D', '', phone)
-                    
-                    # Handle different formats
-                    if digits_only.startswith('65') and len(digits_only) == 10:
-                        normalized = digits_only[2:]  # Remove country code
-                    else:
-                        normalized = digits_only
-                    
-                    normalized_phones.append(normalized)
-                    phone_mapping[normalized] = phone  # Store original format
-                
-                # Search in database
-                members = Member.objects.filter(
-                    handphone__in=normalized_phones
-                ).values("username", "name", "handphone", "join_date")
-                
-                # Create lookup dictionary
-                member_dict = {}
-                for m in members:
-                    # Normalize the database phone too
-                    db_phone = re.sub(r'\D', '', m["handphone"] or "")
-                    if db_phone.startswith('65') and len(db_phone) == 10:
-                        db_phone = db_phone[2:]
-                    member_dict[db_phone] = m
-                
-                # Build results maintaining input order
-                for normalized_phone in normalized_phones:
-                    original_phone = phone_mapping[normalized_phone]
-                    
-                    if normalized_phone in member_dict:
-                        member = member_dict[normalized_phone]
-                        # Format phone number for display
-                        display_phone = member["handphone"]
-                        if display_phone and not display_phone.startswith("+"):
-                            display_phone = f"+65{display_phone}" if display_phone.isdigit() and len(display_phone) == 8 else display_phone
-                        
-                        results.append({
-                            "search_phone": original_phone,
-                            "username": member["username"],
-                            "name": member["name"],
-                            "handphone": display_phone,
-                            "join_date": member["join_date"],
-                            "status": "Found"
-                        })
-                    else:
-                        results.append({
-                            "search_phone": original_phone,
-                            "username": "Not Found",
-                            "name": "Not Found",
-                            "handphone": original_phone,
-                            "join_date": None,
-                            "status": "Not Found"
-                        })
+                results = _lookup_phones(phone_numbers)
         else:
             error_message = "Please enter phone numbers to look up."
 
@@ -96,57 +78,7 @@ def report_phone_user_lookup_view(request):
             if len(phone_numbers) > 2000:
                 error_message = "Error: Input exceeds 2000 phone numbers. Please limit to 2000 per request."
             else:
-                # Same logic as above
-                normalized_phones = []
-                phone_mapping = {}
-                
-                for phone in phone_numbers:
-                    digits_only = re.sub(r'\D', '', phone)
-                    if digits_only.startswith('65') and len(digits_only) == 10:
-                        normalized = digits_only[2:]
-                    else:
-                        normalized = digits_only
-                    
-                    normalized_phones.append(normalized)
-                    phone_mapping[normalized] = phone
-                
-                members = Member.objects.filter(
-                    handphone__in=normalized_phones
-                ).values("username", "name", "handphone", "join_date")
-                
-                member_dict = {}
-                for m in members:
-                    db_phone = re.sub(r'\D', '', m["handphone"] or "")
-                    if db_phone.startswith('65') and len(db_phone) == 10:
-                        db_phone = db_phone[2:]
-                    member_dict[db_phone] = m
-                
-                for normalized_phone in normalized_phones:
-                    original_phone = phone_mapping[normalized_phone]
-                    
-                    if normalized_phone in member_dict:
-                        member = member_dict[normalized_phone]
-                        display_phone = member["handphone"]
-                        if display_phone and not display_phone.startswith("+"):
-                            display_phone = f"+65{display_phone}" if display_phone.isdigit() and len(display_phone) == 8 else display_phone
-                        
-                        results.append({
-                            "search_phone": original_phone,
-                            "username": member["username"],
-                            "name": member["name"],
-                            "handphone": display_phone,
-                            "join_date": member["join_date"],
-                            "status": "Found"
-                        })
-                    else:
-                        results.append({
-                            "search_phone": original_phone,
-                            "username": "Not Found",
-                            "name": "Not Found",
-                            "handphone": original_phone,
-                            "join_date": None,
-                            "status": "Not Found"
-                        })
+                results = _lookup_phones(phone_numbers)
         else:
             error_message = "Please enter phone numbers to look up."
 
@@ -2,10 +2,12 @@ import csv
 import io
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Max, Sum, Q
+from django.db.models import Count, Max, Sum
 from django.utils import timezone
 from django.http import HttpResponseBadRequest
 from data_management.models import Transaction
+from data_management.services.compact import compact_ready, event_filter, top_users
+from data_management.services.member_stats import last_activity as last_activity_of
 from django.template.response import TemplateResponse
 from datetime import timedelta
 
@@ -34,29 +36,47 @@ def report_top_deposit_users_view(request):
     except ValueError:
         return HttpResponseBadRequest("Invalid date or top_n format. Use YYYY-MM-DD for dates and a positive integer for top_n.")
 
+    # Group and filter on the compact member id and event code once every
+    # transaction carries them; usernames otherwise
+    compact = compact_ready()
+    user_field = 'member' if compact else 'username'
+
     relevant_transactions = Transaction.objects.filter(
-        Q(event__in=['Deposit', 'Manual Deposit', 'Withdraw', 'Manual Withdraw']),
-        process_date__date__range=[start_date, end_date]
+        event_filter(['Deposit', 'Manual Deposit', 'Withdraw', 'Manual Withdraw'], compact),
+        process_date__gte=start_date, process_date__lt=end_date + timedelta(days=1)
     )
 
-    top_deposit_usernames = relevant_transactions.filter(event__in=['Deposit', 'Manual Deposit']).values('username').annotate(
-        total_deposits=Sum('amount')
-    ).order_by('-total_deposits')[:top_n].values_list('username', flat=True)
+    top_deposit_users = top_users(relevant_transactions.filter(event_filter(['Deposit', 'Manual Deposit'], compact)), top_n, compact)
 
-    top_users_data = {}
-    for username in top_deposit_usernames:
-        user_transactions = relevant_transactions.filter(username=username)
+    # Period figures of all top users in one grouped query, last activity
+    # (lifetime) from the member stats
+    deposits = event_filter(['Deposit', 'Manual Deposit'], compact)
+    withdrawals = event_filter(['Withdraw', 'Manual Withdraw'], compact)
+    period_stats = {
+        row[user_field]: row
+        for row in relevant_transactions.filter(
+            **{f'{user_field}__in': [user for user, _ in top_deposit_users]}
+        ).values(user_field).annotate(
+            total_deposits=Sum('amount', filter=deposits),
+            total_withdrawals=Sum('amount', filter=withdrawals),
+            deposit_frequency=Count('id', filter=deposits),
+            manual_deposits=Sum('amount', filter=event_filter(['Manual Deposit'], compact)),
+            manual_withdrawals=Sum('amount', filter=event_filter(['Manual Withdraw'], compact)),
+            largest_deposit=Max('amount', filter=deposits),
+        ).order_by()
+    }
+    last_activities = last_activity_of([username for _, username in top_deposit_users])
 
-        total_deposits = user_transactions.filter(event__in=['Deposit', 'Manual Deposit']).aggregate(sum=Sum('amount'))['sum'] or 0
-        total_withdrawals = user_transactions.filter(event__in=['Withdraw', 'Manual Withdraw']).aggregate(sum=Sum('amount'))['sum'] or 0
-        deposit_frequency = user_transactions.filter(event__in=['Deposit', 'Manual Deposit']).count()
-        
-        manual_deposits = user_transactions.filter(event='Manual Deposit').aggregate(sum=Sum('amount'))['sum'] or 0
-        manual_withdrawals = user_transactions.filter(event='Manual Withdraw').aggregate(sum=Sum('amount'))['sum'] or 0
-        
-        largest_deposit = user_transactions.filter(event__in=['Deposit', 'Manual Deposit']).aggregate(max=Max('amount'))['max'] or 0
-        
-        last_activity = Transaction.objects.filter(username=username).aggregate(max=Max('process_date'))['max']
+    top_users_data = {}
+    for user, username in top_deposit_users:
+        stats = period_stats[user]
+        total_deposits = stats['total_deposits'] or 0
+        total_withdrawals = stats['total_withdrawals'] or 0
+        deposit_frequency = stats['deposit_frequency']
+        manual_deposits = stats['manual_deposits'] or 0
+        manual_withdrawals = stats['manual_withdrawals'] or 0
+        largest_deposit = stats['largest_deposit'] or 0
+        last_activity = last_activities.get(username)
 
         inactive_days = (today - last_activity.date()).days if last_activity else None
         
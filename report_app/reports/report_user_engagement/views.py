@@ -31,51 +31,42 @@ def report_user_engagement_view(request):
     if start_date > end_date:
         return HttpResponseBadRequest("Start date cannot be after end date.")
 
-    # Get all users who had a transaction within the date range
-    active_users = Transaction.objects.filter(
-        process_date__date__range=[start_date, end_date]
+    # One grouped query per page: every active user's period sums and last
+    # activity, ordered most inactive first (ties by username so pages
+    # are stable) and sliced by the paginator with LIMIT/OFFSET. The
+    # paginator's count drops the aggregates: SELECT COUNT(*) over the
+    # distinct usernames.
+    user_engagement_data = Transaction.objects.filter(
+        process_date__gte=start_date, process_date__lt=end_date + timedelta(days=1)
     ).values('username').annotate(
-        last_activity=Max('process_date__date')
-    )
+        last_activity=Max('process_date__date'),
+        sum_deposit=Sum('amount', filter=Q(event='Deposit')),
+        sum_manual_deposit=Sum('amount', filter=Q(event='Manual Deposit')),
+        sum_withdraw=Sum('amount', filter=Q(event='Withdraw')),
+        sum_manual_withdraw=Sum('amount', filter=Q(event='Manual Withdraw'))
+    ).order_by('last_activity', 'username')
 
-    user_engagement_data = []
-    for user_data in active_users:
-        username = user_data['username']
-        last_activity = user_data['last_activity']
-        days_since_last_activity = (today - last_activity).days
-
-        user_transactions = Transaction.objects.filter(
-            username=username,
-            process_date__date__range=[start_date, end_date]
-        ).aggregate(
-            sum_deposit=Sum('amount', filter=Q(event='Deposit')),
-            sum_manual_deposit=Sum('amount', filter=Q(event='Manual Deposit')),
-            sum_withdraw=Sum('amount', filter=Q(event='Withdraw')),
-            sum_manual_withdraw=Sum('amount', filter=Q(event='Manual Withdraw'))
-        )
-        
+    def engagement_row(user_data):
         # Calculate totals
-        total_deposits = (user_transactions['sum_deposit'] or 0) + (user_transactions['sum_manual_deposit'] or 0)
-        total_withdrawals = (user_transactions['sum_withdraw'] or 0) + (user_transactions['sum_manual_withdraw'] or 0)
-
-        user_engagement_data.append({
-            'username': username,
-            'last_activity': last_activity,
-            'sum_deposit': user_transactions['sum_deposit'] or 0,
-            'sum_manual_deposit': user_transactions['sum_manual_deposit'] or 0,
-            'total_deposits': total_deposits,
-            'sum_withdraw': user_transactions['sum_withdraw'] or 0,
-            'sum_manual_withdraw': user_transactions['sum_manual_withdraw'] or 0,
-            'total_withdrawals': total_withdrawals,
-            'days_since_last_activity': days_since_last_activity,
-        })
+        sum_deposit = user_data['sum_deposit'] or 0
+        sum_manual_deposit = user_data['sum_manual_deposit'] or 0
+        sum_withdraw = user_data['sum_withdraw'] or 0
+        sum_manual_withdraw = user_data['sum_manual_withdraw'] or 0
+        return {
+            'username': user_data['username'],
+            'last_activity': user_data['last_activity'],
+            'sum_deposit': sum_deposit,
+            'sum_manual_deposit': sum_manual_deposit,
+            'total_deposits': sum_deposit + sum_manual_deposit,
+            'sum_withdraw': sum_withdraw,
+            'sum_manual_withdraw': sum_manual_withdraw,
+            'total_withdrawals': sum_withdraw + sum_manual_withdraw,
+            'days_since_last_activity': (today - user_data['last_activity']).days,
+        }
 
-    # Sort by days_since_last_activity from largest to smallest (most inactive first)
-    user_engagement_data.sort(key=lambda x: x['days_since_last_activity'], reverse=True)
+    paginator = Paginator(user_engagement_data, 500)
+    total_users_count = paginator.count
 
-    # Get total count before pagination
-    total_users_count = len(user_engagement_data)
-    
     # Handle POST request for export
     if request.method == 'POST' and request.POST.get('_export', '').lower() == 'csv':
         csv_content = io.StringIO()
@@ -91,7 +82,7 @@ def report_user_engagement_view(request):
             'Last Activity', 
             'Days Since Last Activity'
         ])
-        for user in user_engagement_data:
+        for user in map(engagement_row, user_engagement_data.iterator()):
             writer.writerow([
                 user['username'],
                 user['sum_deposit'],
@@ -106,11 +97,11 @@ def report_user_engagement_view(request):
         csv_data = csv_content.getvalue()
         csv_content.close()
         
-        paginator = Paginator(user_engagement_data, 500)
         try:
             paginated_users = paginator.page(page)
         except (PageNotAnInteger, EmptyPage):
             paginated_users = paginator.page(1)
+        paginated_users.object_list = [engagement_row(user_data) for user_data in paginated_users]
         
         context = {
             'user_engagement_data': paginated_users,
@@ -125,13 +116,13 @@ def report_user_engagement_view(request):
         return TemplateResponse(request, 'report_app/reports/report_user_engagement/view.html', context)
     
     # Setup pagination for normal GET request
-    paginator = Paginator(user_engagement_data, 500)
     try:
         paginated_users = paginator.page(page)
     except PageNotAnInteger:
         paginated_users = paginator.page(1)
     except EmptyPage:
         paginated_users = paginator.page(paginator.num_pages)
+    paginated_users.object_list = [engagement_row(user_data) for user_data in paginated_users]
 
     # Render the template for a normal GET request
     context = {
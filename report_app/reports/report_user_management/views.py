@@ -3,6 +3,8 @@ from django.shortcuts import redirect
 from django.template.response import TemplateResponse
 from django.contrib import messages
 from data_management.models import Member
+from data_management.services.phones import normalize_phone, tenant_phone_countries
+from data_management.services.rollups import local_day, refresh_daily_rollups, rollups_ready
 from django.utils import timezone
 
 @login_required
@@ -25,6 +27,9 @@ def report_user_management_view(request):
         try:
             member = Member.objects.get(username=username)
             member.delete()
+            if rollups_ready(member._state.db):
+                # Their transactions on the join day no longer count as a new member's
+                refresh_daily_rollups(member._state.db, [local_day(member.join_date)])
             success_message = f"User '{username}' deleted successfully."
             print("Delete successful")
         except Member.DoesNotExist:
@@ -42,6 +47,7 @@ def report_user_management_view(request):
             member = Member.objects.get(username=username)
             member.name = request.POST.get('name', member.name)
             member.handphone = request.POST.get('handphone', member.handphone)
+            member.phone_e164 = normalize_phone(member.handphone, tenant_phone_countries(member._state.db))
             member.email = request.POST.get('email', member.email)
             member.referral = request.POST.get('referral', member.referral)
             member.save()
@@ -70,9 +76,7 @@ def report_user_management_view(request):
                 print(f"Found {members.count()} members in database")
                 
                 for member in members:
-                    handphone = member.handphone
-                    if handphone and not handphone.startswith("+"):
-                        handphone = f"+65{handphone}" if handphone.isdigit() and len(handphone) == 8 else handphone
+                    handphone = member.phone_e164 or member.handphone
                     
                     results.append({
                         "username": member.username,
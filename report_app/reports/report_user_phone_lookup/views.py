@@ -23,7 +23,7 @@ def report_user_phone_lookup_view(request):
                 error_message = "Error: Input exceeds 2000 usernames. Please limit to 2000 per request."
             else:
                 # ADD join_date to the query
-                members = Member.objects.filter(username__in=usernames).values("username", "name", "handphone", "join_date")
+                members = Member.objects.filter(username__in=usernames).values("username", "name", "handphone", "phone_e164", "join_date")
                 member_dict = {m["username"]: m for m in members}
                 for username in usernames:
                     member = member_dict.get(username, {
@@ -32,9 +32,8 @@ def report_user_phone_lookup_view(request):
                         "handphone": "Not Found",
                         "join_date": None  # ADD this
                     })
-                    handphone = member["handphone"]
-                    if handphone and not handphone.startswith("+"):
-                        handphone = f"+65{handphone}" if handphone.isdigit() and len(handphone) == 8 else handphone
+                    # Normalized on import; the raw value when it could not be read
+                    handphone = member.get("phone_e164") or member["handphone"]
                     results.append({
                         "username": username,
                         "name": member["name"],
@@ -53,7 +52,7 @@ def report_user_phone_lookup_view(request):
                 error_message = "Error: Input exceeds 2000 usernames. Please limit to 2000 per request."
             else:
                 # ADD join_date to the query
-                members = Member.objects.filter(username__in=usernames).values("username", "name", "handphone", "join_date")
+                members = Member.objects.filter(username__in=usernames).values("username", "name", "handphone", "phone_e164", "join_date")
                 member_dict = {m["username"]: m for m in members}
                 for username in usernames:
                     member = member_dict.get(username, {
@@ -62,9 +61,8 @@ def report_user_phone_lookup_view(request):
                         "handphone": "Not Found",
                         "join_date": None  # ADD this
                     })
-                    handphone = member["handphone"]
-                    if handphone and not handphone.startswith("+"):
-                        handphone = f"+65{handphone}" if handphone.isdigit() and len(handphone) == 8 else handphone
+                    # Normalized on import; the raw value when it could not be read
+                    handphone = member.get("phone_e164") or member["handphone"]
                     results.append({
                         "username": username,
                         "name": member["name"],
@@ -4,10 +4,15 @@ from django.core.management import call_command
 from tenants.models import Tenant # Your existing Tenant model
 
 class Command(BaseCommand):
-    help = 'Runs migrations for the whatsapp_messaging app on all tenant databases.'
+    help = 'Runs migrations for the whatsapp_messaging app (or the given apps) on all tenant databases.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('app_labels', nargs='*', default=['whatsapp_messaging'],
+                            help='Apps to migrate (default: whatsapp_messaging), e.g. data_management')
 
     def handle(self, *args, **options):
-        self.stdout.write(self.style.SUCCESS("--- Starting multi-tenant migration for 'whatsapp_messaging' ---"))
+        app_labels = options['app_labels']
+        self.stdout.write(self.style.SUCCESS(f"--- Starting multi-tenant migration for {', '.join(app_labels)} ---"))
 
         # Since you only have two specific databases, we'll iterate directly over them.
         # This bypasses any issues with the dynamic name generation.
@@ -20,7 +25,8 @@ class Command(BaseCommand):
             try:
                 # Note: The `management` and `commands` folders must both have a __init__.py file
                 # to be recognized as a Python package by Django.
-                call_command('migrate', 'whatsapp_messaging', database=tenant_db_alias, verbosity=0)
+                for app_label in app_labels:
+                    call_command('migrate', app_label, database=tenant_db_alias, verbosity=0)
                 self.stdout.write(self.style.SUCCESS(f"Migration for '{tenant_db_alias}' successful."))
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"Error migrating '{tenant_db_alias}': {e}"))